@@ -0,0 +1,235 @@
+"""
+Benchmark suite for ExcelManager.
+
+Generates synthetic payment_records.xlsx ledgers of the requested sizes in a temporary
+directory, times every public operation on each of them and writes a JSON report that
+can be compared with an earlier run.
+
+    python benchmarks/bench_excel_manager.py --sizes 1000 10000 --output bench.json
+    python benchmarks/bench_excel_manager.py --sizes 1000 10000 --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data")))
+
+import openpyxl
+from openpyxl import Workbook
+
+from excel_manager import ExcelManager, HEADERS
+from models import Payment
+
+TASK_TYPES = [
+    "Mediation - Labour Dispute", "Mediation - Commercial Dispute", "Mediation - Consumer Dispute",
+    "Mediation - Rental Dispute", "Mediation - Family Dispute", "Expert Opinion Report",
+]
+VAT_RATES = [0, 10, 20]
+
+def make_payment(rng, number):
+    """
+    Returns a Payment with realistic field values, computed the same way the GUI does.
+    """
+    tariff_fee = round(rng.uniform(500, 25000), 2)
+    gross_fee = round(tariff_fee * rng.uniform(1.0, 1.5), 2)
+    vat_rate = rng.choice(VAT_RATES)
+    vat_amount = gross_fee * (vat_rate / 100)
+    net_fee = gross_fee - vat_amount
+    submission_date = date(2020, 1, 1) + timedelta(days=rng.randrange(5 * 365))
+    invoice_date = submission_date + timedelta(days=rng.randrange(60))
+
+    return Payment(
+        f"INV-{number:07d}", rng.choice(TASK_TYPES), tariff_fee, gross_fee, vat_rate,
+        vat_amount, net_fee, f"Case {rng.randrange(1, 100000)}/{submission_date.year} - Client {rng.randrange(1, 5000)}",
+        submission_date.strftime("%d.%m.%Y"), invoice_date.strftime("%d.%m.%Y"),
+        "Paid" if rng.random() < 0.7 else "Pending"
+    )
+
+def generate_ledger(file_path, size, seed=0):
+    """
+    Writes a synthetic ledger with `size` payments using openpyxl's write-only mode,
+    then lets ExcelManager build its summary sidecar so runs start from a steady state.
+    """
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title="Payment Records")
+    ws.append(HEADERS)
+
+    for number in range(size):
+        ws.append(make_payment(rng, number).to_list())
+
+    wb.save(file_path)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ExcelManager(file_path).load_summary()
+
+def copy_ledger(source_dir, target_dir):
+    """
+    Copies the pristine ledger into a fresh directory with its sidecars and lock file (which holds the
+    write version), keeping mtimes, so the copy's summary sidecar is still valid and cold runs do not rebuild it.
+    """
+    if os.path.exists(target_dir):
+        shutil.rmtree(target_dir)
+    shutil.copytree(source_dir, target_dir)
+    return os.path.join(target_dir, "payment_records.xlsx")
+
+def operations(size):
+    """
+    Returns {name: callable(manager, run)} for every public ExcelManager operation.
+    `run` is 0 for the cold call and 1 for the warm call, so writes use distinct invoices.
+    """
+    rng = random.Random(size)
+
+    return {
+        "add_payment": lambda excel, run: excel.add_payment(make_payment(rng, size + run).to_list()),
+        "search_payment": lambda excel, run: excel.search_payment(f"INV-{rng.randrange(size):07d}"),
+        "update_payment_status": lambda excel, run: excel.update_payment_status(f"INV-{rng.randrange(size):07d}", "Paid"),
+        "analyze_payments": lambda excel, run: excel.analyze_payments(),
+        "group_payments": lambda excel, run: excel.group_payments(["month", "status"]),
+        "adjust_excel_formatting": lambda excel, run: excel.adjust_excel_formatting(),
+        "highlight_payments": lambda excel, run: excel.highlight_payments(),
+        "generate_payment_chart": lambda excel, run: excel.generate_payment_chart(),
+        "get_all_payments": lambda excel, run: excel.get_all_payments(),
+    }
+
+def time_operation(file_path, operation, journal):
+    """
+    Returns (cold seconds, warm seconds): the first call on a new ExcelManager, then a repeat call.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        excel = ExcelManager(file_path, journal=journal)
+
+        start = time.perf_counter()
+        operation(excel, 0)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        operation(excel, 1)
+        warm = time.perf_counter() - start
+
+    return cold, warm
+
+def peak_memory(file_path, operation, journal):
+    """
+    Returns the peak traced Python memory (MB) of a cold call.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        try:
+            excel = ExcelManager(file_path, journal=journal)
+            operation(excel, 0)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return peak / (1024 * 1024)
+
+def run(sizes, journal=True, memory=True, only=None):
+    """
+    Runs the suite and returns the report dict.
+    """
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "openpyxl": openpyxl.__version__,
+            "platform": platform.platform(),
+            "journal": journal,
+        },
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="pra_bench_") as tmp_dir:
+        for size in sizes:
+            pristine_dir = os.path.join(tmp_dir, f"ledger_{size}")
+            os.makedirs(pristine_dir)
+
+            start = time.perf_counter()
+            generate_ledger(os.path.join(pristine_dir, "payment_records.xlsx"), size)
+            print(f"📦 Generated {size:,} rows in {time.perf_counter() - start:.2f}s "
+                  f"({os.path.getsize(os.path.join(pristine_dir, 'payment_records.xlsx')) / 1024:,.0f} KB)")
+
+            for name, operation in operations(size).items():
+                if only and name not in only:
+                    continue
+
+                work_dir = os.path.join(tmp_dir, "work")
+                cold, warm = time_operation(copy_ledger(pristine_dir, work_dir), operation, journal)
+                result = {"size": size, "operation": name, "cold_s": round(cold, 6), "warm_s": round(warm, 6)}
+
+                if memory:
+                    result["peak_mb"] = round(peak_memory(copy_ledger(pristine_dir, work_dir), operation, journal), 3)
+
+                report["results"].append(result)
+                print(f"  {name:<25} cold {cold:9.4f}s  warm {warm:9.4f}s"
+                      + (f"  peak {result['peak_mb']:9.1f} MB" if memory else ""))
+
+            shutil.rmtree(pristine_dir)
+
+    return report
+
+def compare(report, baseline, tolerance):
+    """
+    Prints the change against a baseline report and returns the number of regressions
+    (cold or warm time slower than baseline by more than `tolerance`, e.g. 0.2 = 20%).
+    """
+    previous = {(r["size"], r["operation"]): r for r in baseline["results"]}
+    regressions = 0
+
+    print(f"\n📊 Comparison with baseline from {baseline['meta'].get('timestamp', '?')}:")
+    for result in report["results"]:
+        old = previous.get((result["size"], result["operation"]))
+        if old is None:
+            continue
+
+        changes = []
+        for metric in ("cold_s", "warm_s", "peak_mb"):
+            if metric in result and old.get(metric):
+                ratio = result[metric] / old[metric]
+                changes.append(f"{metric} x{ratio:.2f}")
+                # Sub-5ms differences are timer noise, not regressions
+                if metric != "peak_mb" and ratio > 1 + tolerance and result[metric] - old[metric] > 0.005:
+                    regressions += 1
+                    changes[-1] += " ⚠️"
+
+        print(f"  {result['size']:>9,} {result['operation']:<25} " + "  ".join(changes))
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ExcelManager on synthetic ledgers.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="ledger sizes to generate (e.g. 1000 10000 100000 1000000)")
+    parser.add_argument("--only", nargs="+", help="run only these operations")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="compare against an earlier JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging (default 0.2)")
+    parser.add_argument("--no-journal", action="store_true", help="save the workbook on every write")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory pass")
+    args = parser.parse_args()
+
+    report = run(args.sizes, journal=not args.no_journal, memory=not args.no_memory, only=args.only)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import re
+
+# Chart views: name -> title. Every view is computed from the running summary or the grouped
+# totals (group_payments), so drawing or exporting a chart never rescans the payment rows.
+CHART_VIEWS = {
+    "status": "Paid vs Pending Payments",
+    "monthly": "Monthly Net Fees",
+    "task_type": "Net Fees by Task Type",
+}
+CHART_SHEET = "Payment Chart"
+STATUS_COLORS = {"Paid": "green", "Pending": "red"}
+
+def chart_data(storage, view):
+    """
+    Returns the table behind a chart view as {"headers": [...], "rows": [[label, value, ...]]},
+    using only JSON types so it can be compared with (and stored as) the last exported chart.
+    `storage` is any manager returned by storage.create_manager.
+    """
+    if view == "status":
+        total_paid, total_pending = storage.get_payment_counts()
+        return {"headers": ["Status", "Count"], "rows": [["Paid", total_paid], ["Pending", total_pending]]}
+
+    if view not in CHART_VIEWS:
+        raise ValueError(f"Unknown chart view: {view!r} (expected one of {', '.join(CHART_VIEWS)})")
+
+    key = "month" if view == "monthly" else "task_type"
+    statuses = list(STATUS_COLORS)
+    table = {}
+    for label, status, _, _, _, _, net in storage.group_payments([key, "status"]):
+        label = "(blank)" if label in (None, "") else str(label)
+        values = table.setdefault(label, [0.0] * len(statuses))
+        if status in statuses:
+            values[statuses.index(status)] += net
+
+    rows = [[label, *(round(value, 2) for value in values)] for label, values in table.items()]  # Whole kuruş
+    if view == "task_type":
+        rows.sort(key=lambda row: (-sum(row[1:]), row[0]))  # Largest first
+
+    return {"headers": ["Month" if view == "monthly" else "Task Type", *statuses], "rows": rows}
+
+def has_data(data):
+    """
+    Returns True if a chart view has anything to draw.
+    """
+    return any(value for row in data["rows"] for value in row[1:])
+
+def draw_chart(figure, view, data):
+    """
+    Draws a chart view on a matplotlib Figure, replacing what was drawn before,
+    so one figure can be reused for every chart of the session.
+    """
+    figure.clear()
+    ax = figure.add_subplot()
+    labels = [row[0] for row in data["rows"]]
+
+    if view == "status":
+        sizes = [row[1] for row in data["rows"]]
+        colors = [STATUS_COLORS[label] for label in labels]
+        ax.pie(sizes, labels=labels, autopct="%1.1f%%", colors=colors, startangle=90)
+    elif view == "monthly":
+        for idx, status in enumerate(data["headers"][1:], start=1):
+            ax.plot(labels, [row[idx] for row in data["rows"]], marker="o", color=STATUS_COLORS[status], label=status)
+        ax.tick_params(axis="x", labelrotation=45)
+        ax.set_ylabel("Net Fee (TL)")
+        ax.legend()
+    else:
+        left = [0.0] * len(labels)
+        for idx, status in enumerate(data["headers"][1:], start=1):
+            values = [row[idx] for row in data["rows"]]
+            ax.barh(labels, values, left=left, color=STATUS_COLORS[status], label=status)
+            left = [offset + value for offset, value in zip(left, values)]
+        ax.invert_yaxis()  # Largest task type on top
+        ax.set_xlabel("Net Fee (TL)")
+        ax.legend()
+
+    ax.set_title(CHART_VIEWS[view])
+    figure.tight_layout()
+
+def write_chart_sheet(wb, charts):
+    """
+    Replaces the Payment Chart sheet of a workbook with one data table and chart per view
+    ({view: chart_data(...)}), keeping the sheet's position. Extra copies left by earlier
+    versions ("Payment Chart1", ...) are removed, so repeated runs never add sheets.
+    The sheet is written row by row, so this also works on write-only workbooks (exports).
+    """
+    # Chart classes are only needed here
+    from openpyxl.chart import BarChart, LineChart, PieChart, Reference
+    from openpyxl.chart.layout import Layout, ManualLayout
+
+    position = None
+    for name in list(wb.sheetnames):
+        if re.fullmatch(re.escape(CHART_SHEET) + r"\d*", name):
+            if position is None:
+                position = wb.sheetnames.index(name)
+            wb.remove(wb[name])
+
+    chart_sheet = wb.create_sheet(title=CHART_SHEET, index=position)
+    first_row = 1
+    next_row = 1  # Next row to be appended
+
+    for view, data in charts.items():
+        if not data["rows"]:
+            continue  # e.g. no dated payments for the monthly view
+
+        # Data table for the chart, in columns A-C
+        while next_row < first_row:
+            chart_sheet.append([])
+            next_row += 1
+        for values in [[CHART_VIEWS[view]], data["headers"], *data["rows"]]:
+            chart_sheet.append(values)
+            next_row += 1
+
+        header_row = first_row + 1
+        last_row = header_row + len(data["rows"])
+        labels = Reference(chart_sheet, min_col=1, min_row=header_row + 1, max_row=last_row)
+
+        if view == "status":
+            chart = PieChart()
+            chart.add_data(Reference(chart_sheet, min_col=2, min_row=header_row + 1, max_row=last_row), titles_from_data=False)
+            chart.style = 2
+            chart.layout = Layout(manualLayout=ManualLayout(x=0.1, y=0.07, w=0.8, h=0.8))
+        else:
+            chart = LineChart() if view == "monthly" else BarChart()
+            if view == "task_type":
+                chart.type = "bar"
+                chart.grouping = "stacked"
+                chart.overlap = 100
+            chart.add_data(Reference(chart_sheet, min_col=2, max_col=len(data["headers"]),
+                                     min_row=header_row, max_row=last_row), titles_from_data=True)
+            chart.y_axis.title = "Net Fee (TL)"
+
+        chart.set_categories(labels)
+        chart.title = CHART_VIEWS[view]
+        chart_sheet.add_chart(chart, f"E{first_row}")
+
+        first_row = max(last_row + 3, first_row + 18)  # Leave room for the chart (about 15 rows high)
+
+    return chart_sheet
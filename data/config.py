@@ -0,0 +1,48 @@
+import os
+
+# Folder where the payment records are stored (the user's Documents folder by default)
+RECORDS_DIR = os.path.expanduser(os.environ.get("PRA_RECORDS_DIR", "~/Documents/PRA_Records"))
+
+# Storage backend used by the GUI and the console menu:
+#   "excel"  -> payment_records.xlsx is the database (default)
+#   "sqlite" -> payment_records.db is the database, exported to payment_records.xlsx on request
+STORAGE_BACKEND = os.environ.get("PRA_BACKEND", "excel")
+
+EXCEL_FILE_NAME = "payment_records.xlsx"
+SQLITE_FILE_NAME = "payment_records.db"
+
+# Partitioning of the Excel backend:
+#   "none" -> every payment is kept in payment_records.xlsx (default)
+#   "year" -> one payment_records_<year>.xlsx per invoice year, listed in the manifest file;
+#             an existing payment_records.xlsx is split on first use
+PARTITION_SCHEME = os.environ.get("PRA_PARTITION", "none")
+MANIFEST_FILE_NAME = "payment_records.manifest.json"
+
+# Per-ledger totals remembered by the consolidated report (consolidation.py), keyed by file version
+CONSOLIDATION_CACHE_FILE = "consolidation_cache.json"
+
+# Append-only journal for adds and status changes (folded into the Excel file by compaction)
+JOURNAL_ENABLED = os.environ.get("PRA_JOURNAL", "1") != "0"
+JOURNAL_COMPACT_THRESHOLD = 100  # Compact after this many journal entries
+
+# Writes to a ledger take an exclusive lock on payment_records.lock (see locking.py), so several
+# GUIs can share one ledger. A write waits at most this many seconds for another writer.
+LOCK_TIMEOUT = float(os.environ.get("PRA_LOCK_TIMEOUT", "30"))
+
+# Headless HTTP/JSON service (service.py). It has no authentication, so it only listens on localhost.
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = int(os.environ.get("PRA_SERVICE_PORT", "8765"))
+SERVICE_MAX_BATCH = 500  # Most write requests coalesced into one save
+SERVICE_REFRESH_SECONDS = 2.0  # How often an idle service checks for changes made by other programs
+
+# Diagnostics: every storage operation is timed in-process (see instrumentation.py).
+# Set PRA_METRICS_LOG to a file path to also append each operation to a JSON lines file,
+# and PRA_PROFILE=1 to capture a cProfile .prof file per operation in PROFILE_DIR.
+METRICS_LOG = os.environ.get("PRA_METRICS_LOG") or None
+PROFILE_ENABLED = os.environ.get("PRA_PROFILE", "0") == "1"
+PROFILE_DIR = os.path.join(RECORDS_DIR, "profiles")
+METRICS_DUMP_FILE = os.path.join(RECORDS_DIR, "metrics.jsonl")
+
+# PRA_STARTUP_TIMING=1 (or gui.py --startup-timing) prints the time spent in imports, building the
+# main window and opening the ledger, then exits; useful to measure the packaged app's cold start
+STARTUP_TIMING = os.environ.get("PRA_STARTUP_TIMING", "0") == "1"
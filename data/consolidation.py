@@ -0,0 +1,200 @@
+import os
+import sys
+import glob
+import json
+import argparse
+import zipfile
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+import config
+from instrumentation import instrumented, metrics
+from excel_manager import ExcelManager, HEADERS
+from locking import ledger_version
+
+def ledger_signature(file_path):
+    """
+    Returns [mtime, size, journal size, version] of a ledger, the same version check ExcelManager uses.
+    """
+    stat = os.stat(file_path)
+    journal_path = os.path.splitext(file_path)[0] + ".journal"
+    journal_size = os.path.getsize(journal_path) if os.path.exists(journal_path) else 0
+    return [stat.st_mtime_ns, stat.st_size, journal_size, ledger_version(file_path)]
+
+def ledger_totals(file_path, start=None, end=None, field="invoice_date"):
+    """
+    Computes the per-status totals of one ledger. Runs in a worker process, so it only takes
+    and returns plain values. The ledger is opened read-only: a pending journal is merged in memory
+    and the summary sidecar is used only if it matches, so nothing is written to the ledger's folder.
+    Returns (totals, signature of the version read).
+    """
+    signature = ledger_signature(file_path)  # Taken first, so a write during the scan invalidates the result
+    manager = ExcelManager(file_path, read_only=True)
+    return manager.payment_totals(start, end, field), signature
+
+def is_ledger(file_path):
+    """
+    Returns True if a file is a payment ledger: an Excel workbook whose first row holds the ledger headers.
+    Only the header row is read, and nothing (not even a lock file) is written.
+    """
+    try:
+        wb = load_workbook(file_path, read_only=True)
+    except (OSError, KeyError, zipfile.BadZipFile, InvalidFileException):
+        return False
+
+    try:
+        header = next(wb.active.iter_rows(max_row=1, max_col=len(HEADERS), values_only=True), ())
+    finally:
+        wb.close()
+    return [str(value).strip() if value is not None else "" for value in header] == HEADERS
+
+def find_ledgers(paths):
+    """
+    Expands folders to the ledgers they contain (payment_records*.xlsx, e.g. yearly partitions).
+    Backups left by partitioning, temporary save files and Excel lock files are skipped.
+    Missing files raise FileNotFoundError.
+    """
+    base, ext = os.path.splitext(config.EXCEL_FILE_NAME)
+    ledgers = []
+    for path in paths:
+        if os.path.isdir(path):
+            ledgers.extend(
+                file_path for file_path in sorted(glob.glob(os.path.join(path, f"{glob.escape(base)}*{ext}")))
+                if not file_path.endswith((".pre-partition.xlsx", ".tmp.xlsx"))
+            )
+        elif os.path.exists(path):
+            ledgers.append(path)
+        else:
+            raise FileNotFoundError(f"Ledger not found: {path}")
+
+    return list(dict.fromkeys(os.path.abspath(file_path) for file_path in ledgers))
+
+class LedgerCache:
+    """
+    This class keeps the totals of every ledger and period already aggregated, in a JSON file.
+    An entry is used only while the ledger's signature (see ledger_signature) is unchanged.
+    """
+
+    def __init__(self, file_path=None):
+        self.file_path = file_path or os.path.join(config.RECORDS_DIR, config.CONSOLIDATION_CACHE_FILE)
+        try:
+            with open(self.file_path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}  # Missing or unreadable cache, every ledger is parsed again
+
+    @staticmethod
+    def _key(file_path, start, end, field):
+        return json.dumps([file_path, start and start.date().isoformat(), end and end.date().isoformat(), field])
+
+    def get(self, file_path, start, end, field):
+        """
+        Returns the cached totals of a ledger, or None if the ledger changed since.
+        """
+        entry = self.entries.get(self._key(file_path, start, end, field))
+        if entry is None or entry["signature"] != ledger_signature(file_path):
+            return None
+        return entry["totals"]
+
+    def put(self, file_path, start, end, field, totals, signature):
+        self.entries[self._key(file_path, start, end, field)] = {"signature": signature, "totals": totals}
+
+    def save(self):
+        """
+        Writes the cache atomically; entries of ledgers that no longer exist are dropped.
+        """
+        self.entries = {key: entry for key, entry in self.entries.items() if os.path.exists(json.loads(key)[0])}
+        os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.file_path)
+
+@instrumented
+def consolidate_ledgers(paths, start=None, end=None, field="invoice_date", workers=None, cache=None):
+    """
+    Aggregates the Paid/Pending totals of many ledgers into one report.
+    Ledgers that changed since the last run are parsed in parallel, one worker process per
+    CPU core (or `workers`); unchanged ledgers are answered from the cache.
+    Files that are not payment ledgers (see is_ledger) are left out and listed under "skipped".
+    Returns {"ledgers": {path: totals}, "total": count, "statuses": {status: {"count", "net", "gross"}},
+    "parsed": number of ledgers parsed, "cached": number served from the cache, "skipped": [path]}.
+    """
+    ledgers = find_ledgers(paths)
+    start, end = ExcelManager._date_range(start, end)
+    cache = cache or LedgerCache()
+
+    results = {}
+    stale = []
+    skipped = []
+    for file_path in ledgers:
+        totals = cache.get(file_path, start, end, field)
+        if totals is not None:
+            results[file_path] = totals
+        elif is_ledger(file_path):  # Checked before a worker opens it
+            stale.append(file_path)
+        else:
+            skipped.append(file_path)
+    ledgers = [file_path for file_path in ledgers if file_path not in skipped]
+
+    workers = min(workers or os.cpu_count() or 1, len(stale))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(functools.partial(ledger_totals, start=start, end=end, field=field), stale))
+    else:
+        parsed = [ledger_totals(file_path, start, end, field) for file_path in stale]  # Not worth a pool
+
+    for file_path, (totals, signature) in zip(stale, parsed):
+        results[file_path] = totals
+        cache.put(file_path, start, end, field, totals, signature)
+    if stale:
+        cache.save()
+
+    report = {"ledgers": {file_path: results[file_path] for file_path in ledgers}, "total": 0, "statuses": {}, "parsed": len(stale), "cached": len(ledgers) - len(stale), "skipped": skipped}
+    for totals in results.values():
+        report["total"] += totals["total"]
+        for status, status_totals in totals["statuses"].items():
+            merged = report["statuses"].setdefault(status, {"count": 0, "net": 0, "gross": 0})
+            for name in merged:
+                merged[name] += status_totals[name]
+
+    metrics.add_rows(report["total"])
+    return report
+
+def print_report(report):
+    """
+    Prints a consolidated report: one line per ledger, then the combined totals.
+    """
+    print(f"\n📊 Consolidated report ({len(report['ledgers'])} ledgers, "
+          f"{report['parsed']} parsed, {report['cached']} unchanged)")
+    print(f"{'Ledger':<40}{'Payments':>10}{'Paid':>8}{'Pending':>9}{'Net Paid (TL)':>16}{'Net Pending (TL)':>18}")
+
+    for file_path, totals in list(report["ledgers"].items()) + [("TOTAL", report)]:
+        paid = totals["statuses"].get("Paid", {"count": 0, "net": 0})
+        pending = totals["statuses"].get("Pending", {"count": 0, "net": 0})
+        print(f"{os.path.basename(file_path)[:39]:<40}{totals['total']:>10}{paid['count']:>8}{pending['count']:>9}"
+              f"{paid['net']:>16,.2f}{pending['net']:>18,.2f}")
+
+    for file_path in report["skipped"]:
+        print(f"⚠️ Skipped {file_path}: not a payment ledger")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consolidated Paid/Pending totals over several ledgers.")
+    parser.add_argument("paths", nargs="+", help="Ledger files or folders containing ledgers")
+    parser.add_argument("--start", help="First date to include (DD.MM.YYYY)")
+    parser.add_argument("--end", help="Last date to include (DD.MM.YYYY)")
+    parser.add_argument("--field", default="invoice_date", choices=["invoice_date", "submission_date"])
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU core)")
+    args = parser.parse_args(argv)
+
+    try:
+        print_report(consolidate_ledgers(args.paths, args.start, args.end, args.field, args.workers))
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
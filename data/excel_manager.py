@@ -1,32 +1,109 @@
 import os
+import json
+import threading
+import time
+import bisect
+import itertools
+from copy import copy, deepcopy
+from datetime import datetime
 from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.chart import PieChart, Reference
-from openpyxl.chart.layout import Layout, ManualLayout
+from openpyxl.styles import Alignment, PatternFill, NamedStyle
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from openpyxl.formatting.rule import CellIsRule
+
+import config
+from instrumentation import instrumented, metrics, phase
+from models import DATE_COLUMNS, Payment, PaymentBatch, as_row, format_date, normalize_dates, parse_date
+from search_index import SearchIndex
+from payment_table import PaymentTable
+from charts import CHART_VIEWS, chart_data, has_data, write_chart_sheet
+from importer import PaymentImport
+from vat import plan_changes
+from locking import LedgerLock, exclusive, ledger_version
+
+# Column headers of the Payment Records sheet
+HEADERS = [
+    "Invoice No", "Task Type", "Tariff Fee", "Gross Fee (TL)", "VAT (%)",
+    "VAT Amount (TL)", "Net Fee (TL)", "Case Details", "Submission Date",
+    "Invoice Date", "Payment Status"
+]
+
+# Shared named styles used by adjust_excel_formatting (one style record instead of one per cell)
+CURRENCY_STYLE = "PRA Currency"
+TEXT_STYLE = "PRA Text"
+DATE_STYLE = "PRA Date"
+DATE_FORMAT = "DD.MM.YYYY"
+CURRENCY_COLUMNS = [2, 3, 5, 6]  # Tariff Fee, Gross Fee, VAT Amount, Net Fee
+
+# Payment Status highlight colours
+PAID_COLOR = "C6E0B4"  # Light green
+PENDING_COLOR = "F4CCCC"  # Light red
+
+# Date fields that can be queried, and their column positions
+DATE_FIELDS = {"submission_date": 8, "invoice_date": 9}
 
 class ExcelManager:
     """
     This class handles the creation and management of an Excel file for tracking payments.
     """
 
-    def __init__(self, file_path=None):
+    def __init__(self, file_path=None, journal=None, read_only=False):
         """
         Constructor for the ExcelManager class.
         Ensures the correct file path is used and creates the Excel file if missing.
+        With `journal` enabled (config.JOURNAL_ENABLED by default), adds and status changes are
+        appended to a journal file and folded into the Excel file by compact().
+        Every write holds the ledger's lock (see locking.py), so several processes can share one file.
+        With `read_only`, nothing is ever written next to the ledger (no file, lock, sidecar or save),
+        e.g. for reports over other offices' ledgers; writes raise PermissionError.
         """
-        base_dir = os.path.expanduser("~/Documents/PRA_Records")  # Save records in the user's Documents folder
+        if file_path is None:
+            file_path = os.path.join(config.RECORDS_DIR, config.EXCEL_FILE_NAME)
 
-        if not os.path.exists(base_dir):
+        base_dir = os.path.dirname(os.path.abspath(file_path))
+
+        if not os.path.exists(base_dir) and not read_only:
             os.makedirs(base_dir)  # Create the directory if it does not exist
 
-        self.file_path = os.path.join(base_dir, "payment_records.xlsx")  # Set the file path
-        print(f"✅ EXCEL FILE IS SAVED AT: {self.file_path}")
+        self.file_path = file_path  # Set the file path
+        self.journal_path = os.path.splitext(file_path)[0] + ".journal"
+        self.journal_enabled = config.JOURNAL_ENABLED if journal is None else journal
+        self.read_only = read_only
+        self.lock = LedgerLock(file_path)
+        if read_only:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"Ledger not found: {file_path}")
+        else:
+            print(f"✅ EXCEL FILE IS SAVED AT: {self.file_path}")
+
+        # In-memory cache: the parsed workbook and its records are kept until the file changes on disk
+        self._wb = None
+        self._records = None
+        self._index = None  # Invoice No -> Excel row number
+        self._date_indexes = {}  # Date field -> sorted [(date, record position)]
+        self._search_index = None  # Task Type / Case Details words -> record positions
+        self._table = None  # Columnar NumPy copy of the records for grouped analytics
+        self._signature = None
+        self._file_id = None  # Inode of the Excel file the cached workbook was read from (or saved to)
+        self._journal_offset = 0  # Journal bytes already applied to the cached workbook
+        self._summary = None  # Running Paid/Pending totals, persisted in a sidecar JSON file
+        self._summary_signature = None
+        self._view = None  # Last sorted/filtered row list served by get_payments_page
+        self.cache_hits = 0
+        self.cache_misses = 0
 
         # 🛠 ** New added control.**: If the file does not exist, creat it automatically
         if not os.path.exists(self.file_path):
-            print("⚠️ Excel file not found, creating a new one...")
-            self.create_excel_file()
+            with self.lock:  # Another process may be creating the same ledger
+                if not os.path.exists(self.file_path):
+                    print("⚠️ Excel file not found, creating a new one...")
+                    self.create_excel_file()
+
+        # A journal left by an earlier session (or another running one) is not compacted here: it is
+        # replayed when the workbook is loaded and folded in at the threshold or by compact() on exit
     
+    @exclusive
     def create_excel_file(self):
         """
         Creates a new Excel file and initializes the headers.
@@ -35,290 +112,1216 @@ class ExcelManager:
         ws = wb.active
         ws.title = "Payment Records"
 
-        # Define headers for the Excel file
-        headers = [
-            "Invoice No", "Task Type", "Tariff Fee", "Gross Fee (TL)", "VAT (%)",
-            "VAT Amount (TL)", "Net Fee (TL)", "Case Details", "Submission Date",
-            "Invoice Date", "Payment Status"
-        ]
-        ws.append(headers)
+        ws.append(HEADERS)
+        self._install_status_rules(ws)  # New ledgers are highlighted by Excel from the start
 
         # Save the Excel file
         wb.save(self.file_path)
+        self.lock.bump()
+        self._write_summary({"total": 0, "statuses": {}})  # Empty ledger, nothing to scan
         print(f"✅ New Excel file created: {self.file_path}")
 
+    def _file_signature(self):
+        """
+        Returns (mtime, size, journal size, version) of the Excel file and its journal,
+        used to detect changes made outside this instance. The version is the write counter kept in
+        the lock file, so a write is noticed even where mtimes are too coarse to tell two saves apart.
+        The file id is left out, so a copy of the ledger with its sidecars (a backup) stays valid.
+        """
+        stat = os.stat(self.file_path)
+        journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        return stat.st_mtime_ns, stat.st_size, journal_size, ledger_version(self.file_path)
+
     def load_workbook(self):
         """
-        Loads the existing Excel file and returns the workbook object.
+        Returns the workbook object.
+        The parsed workbook is cached and only reloaded when the file's mtime or size changes.
+        When only the journal grew (another process added payments or changed statuses), just the
+        new journal entries are applied to the cached workbook instead of parsing the file again.
+        Writers call this while holding the lock, so they always modify the latest version.
+        """
+        signature = self._file_signature()
+
+        if self._wb is not None and signature == self._signature:
+            self.cache_hits += 1
+            return self._wb
+
+        # Same Excel file (not replaced by another process's save), only the journal grew
+        if (self._wb is not None and signature[:2] == self._signature[:2] and signature[2] >= self._journal_offset
+                and os.stat(self.file_path).st_ino == self._file_id):
+            self.cache_hits += 1
+            with phase("load"):
+                applied = self._replay_journal(self._wb.active, self._journal_offset)
+            if applied:
+                print(f"🔄 {applied} change(s) made by another user applied.")
+                self._reset_derived()
+            self._signature = signature
+            return self._wb
+
+        self.cache_misses += 1
+        with phase("load"):
+            self._file_id = os.stat(self.file_path).st_ino
+            self._wb = load_workbook(self.file_path)
+            self._replay_journal(self._wb.active)
+        self._reset_derived()
+        self._signature = signature
+        return self._wb
+
+    def _reset_derived(self):
+        """
+        Drops the records and indexes; they are rebuilt lazily from the cached workbook.
+        """
+        self._records = None
+        self._index = None
+        self._date_indexes = {}
+        self._search_index = None
+        self._table = None
+
+    def load_records(self):
+        """
+        Returns the cached list of payment rows (without the header row).
+        """
+        wb = self.load_workbook()
+
+        if self._records is None:
+            ws = wb.active
+            with phase("iterate"):
+                self._records = list(ws.iter_rows(min_row=2, max_row=ws.max_row, values_only=True))
+            metrics.add_rows(len(self._records))
+            self._index = None
+            self._date_indexes = {}
+            self._search_index = None
+            self._table = None
+
+        return self._records
+
+    @staticmethod
+    def _invoice_key(invoice_no):
+        """
+        Normalises an Invoice No for index lookups (cells may hold numbers or padded strings).
+        """
+        return str(invoice_no).strip() if invoice_no is not None else None
+
+    def load_index(self):
+        """
+        Returns the cached Invoice No -> Excel row number index.
+        If an invoice appears more than once, the first row wins (same as the old linear scan).
+        """
+        records = self.load_records()
+
+        if self._index is None:
+            index = {}
+            with phase("iterate"):
+                for row_idx, record in enumerate(records, start=2):
+                    key = self._invoice_key(record[0])
+                    if key is not None and key not in index:
+                        index[key] = row_idx
+            self._index = index
+
+        return self._index
+
+    @exclusive
+    def save_workbook(self, wb):
+        """
+        Saves the workbook and refreshes the cache signature so our own writes don't force a reload.
+        The file is written to a temporary path and swapped in, so a crash mid-save cannot corrupt it.
+        The in-memory workbook already contains every journal entry, so the journal is emptied.
+        The summary sidecar is rewritten so it stays valid for the new file version.
+        """
+        summary = self.load_summary()  # Validate against the file before it changes
+        tmp_path = os.path.splitext(self.file_path)[0] + ".tmp.xlsx"
+
+        with phase("save"):
+            wb.save(tmp_path)
+            os.replace(tmp_path, self.file_path)
+
+            if os.path.exists(self.journal_path):
+                open(self.journal_path, "w").close()  # Journal is now folded into the Excel file
+
+            self.lock.bump()
+            self._journal_offset = 0
+            self._file_id = os.stat(self.file_path).st_ino
+            self._signature = self._file_signature()
+            self._write_summary(summary)
+
+        metrics.add_bytes(self._signature[1])
+
+    def _read_journal(self, offset=0):
+        """
+        Returns (entries in write order, end offset) of the journal from byte `offset` on.
+        A torn last line (crash or another process mid-append) is ignored and left out of the
+        end offset, so a later read from there picks it up once it is complete.
+        """
+        if not os.path.exists(self.journal_path):
+            return [], 0
+
+        entries = []
+        end = offset
+        with open(self.journal_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                end += len(line)
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    pass
+
+        return entries, end
+
+    def _write_journal(self, entries):
+        """
+        Appends entries to the journal and flushes them to disk.
+        Much cheaper than re-saving the workbook; compact() folds them in later.
+        """
+        data = "".join(json.dumps(entry, default=self._json_default) + "\n" for entry in entries)
+
+        with phase("save"), open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.lock.bump()
+
+        metrics.add_bytes(len(data.encode("utf-8")))
+
+    @staticmethod
+    def _json_default(value):
+        """
+        Serialises date cells in journal entries as ISO text (parsed back on replay).
+        """
+        if isinstance(value, datetime):
+            return value.isoformat()
+        raise TypeError(f"Cannot store {type(value).__name__} in the journal")
+
+    @staticmethod
+    def _append_row(ws, row):
+        """
+        Appends a payment row and gives its date cells the DD.MM.YYYY number format.
+        """
+        cells = [Cell(ws, value=value) for value in row]  # ws.max_row would scan every cell
+        for idx in DATE_COLUMNS:
+            if isinstance(row[idx], datetime):
+                cells[idx].number_format = DATE_FORMAT
+        ws.append(cells)
+
+    def _replay_journal(self, ws, offset=0):
+        """
+        Applies the journal entries (from byte `offset` on) to a loaded worksheet and returns their number.
+        Replay is idempotent: adds of invoices already in the sheet are skipped,
+        so a journal left behind by an interrupted compaction is harmless.
+        """
+        entries, self._journal_offset = self._read_journal(offset)
+
+        if not entries:
+            return 0
+
+        rows = {}
+        for (cell,) in ws.iter_rows(min_row=2, max_col=1):
+            rows.setdefault(self._invoice_key(cell.value), cell.row)
+
+        # ws.max_row and ws.max_column scan every cell, so they are read once and the row count is kept here
+        last_row = ws.max_row
+        status_col = ws.max_column
+
+        for entry in entries:
+            if entry["op"] == "add":
+                key = self._invoice_key(entry["row"][0])
+                if key not in rows:
+                    self._append_row(ws, normalize_dates(entry["row"]))
+                    last_row += 1
+                    rows[key] = last_row
+            elif entry["op"] == "status":
+                key = self._invoice_key(entry["invoice_no"])
+                if key in rows:
+                    ws.cell(row=rows[key], column=status_col).value = entry["status"]
+
+        return len(entries)
+
+    def _journal_overlay(self):
+        """
+        Condenses the journal for streaming reads.
+        Returns ({invoice key: new status} for rows already in the file,
+        {invoice key: row} for rows added since the last compaction).
+        """
+        overrides = {}
+        added = {}
+
+        for entry in self._read_journal()[0]:
+            if entry["op"] == "add":
+                row = normalize_dates(entry["row"])
+                added.setdefault(self._invoice_key(row[0]), row)
+            elif entry["op"] == "status":
+                key = self._invoice_key(entry["invoice_no"])
+                if key in added:
+                    added[key][-1] = entry["status"]
+                else:
+                    overrides[key] = entry["status"]
+
+        return overrides, added
+
+    def _commit(self, entries):
+        """
+        Persists mutations already applied to the in-memory workbook.
+        Appends them to the journal (compacting once the threshold is reached),
+        or saves the workbook directly when journaling is disabled.
+        """
+        if not self.journal_enabled:
+            self.save_workbook(self._wb)
+            return
+
+        summary = self.load_summary()
+        self._write_journal(entries)
+        self._signature = self._file_signature()
+        self._journal_offset = self._signature[2]  # Written under the lock, so nothing else was appended
+        self._write_summary(summary)
+
+        if len(self._read_journal()[0]) >= config.JOURNAL_COMPACT_THRESHOLD:
+            self.compact()
+
+    @instrumented
+    @exclusive
+    def compact(self):
+        """
+        Folds the journal into the Excel file with a single save.
+        """
+        if not os.path.exists(self.journal_path) or os.path.getsize(self.journal_path) == 0:
+            return
+
+        self.save_workbook(self.load_workbook())
+        print("✅ Journal compacted into the Excel file.")
+
+    def _summary_path(self):
+        """
+        Returns the path of the summary sidecar file next to the Excel file.
+        """
+        return os.path.splitext(self.file_path)[0] + ".summary.json"
+
+    @staticmethod
+    def _amount(value):
+        """
+        Returns a numeric cell value, treating blanks and text as 0.
+        """
+        return value if isinstance(value, (int, float)) else 0
+
+    def _summary_add(self, summary, row, sign=1):
+        """
+        Adds (sign=1) or removes (sign=-1) one payment row from the running totals.
+        """
+        summary["total"] += sign
+        totals = summary["statuses"].setdefault(row[-1], {"count": 0, "net": 0, "gross": 0})
+        totals["count"] += sign
+        totals["net"] += sign * self._amount(row[6])  # Net Fee (Column G)
+        totals["gross"] += sign * self._amount(row[3])  # Gross Fee (Column D)
+
+    def build_summary(self):
+        """
+        Recomputes the summary totals with a full scan of the payment rows.
+        """
+        summary = {"total": 0, "statuses": {}}
+
+        for row in self.iter_payments():
+            self._summary_add(summary, row)
+
+        return summary
+
+    def load_summary(self):
+        """
+        Returns the running summary totals.
+        The sidecar file is trusted only if it was written for the current file version
+        (same mtime and size); otherwise the totals are rebuilt with one full scan.
+        """
+        signature = self._file_signature()
+
+        if self._summary is not None and self._summary_signature == signature:
+            return self._summary
+
+        summary = None
+        try:
+            with open(self._summary_path(), encoding="utf-8") as f:
+                stored = json.load(f)
+            if tuple(stored["signature"]) == signature:
+                summary = {"total": stored["total"], "statuses": stored["statuses"]}
+                for key in ("formatting", "chart"):  # Optional state of the formatting pass and chart sheet
+                    if key in stored:
+                        summary[key] = stored[key]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # Missing or unreadable sidecar, rebuild below
+
+        if summary is None:
+            if self.read_only:
+                summary = self.build_summary()  # Not stored: read-only callers never write the sidecar
+                self._summary, self._summary_signature = summary, signature
+                return summary
+            print("🔄 Payment summary is out of date, rebuilding...")
+            summary = self.build_summary()
+            self._write_summary(summary)
+
+        self._summary = summary
+        self._summary_signature = signature
+        return summary
+
+    def _write_summary(self, summary):
+        """
+        Persists the summary for the current file version (written atomically).
+        Readers rebuild it without the lock, so every writer uses its own temporary file.
+        """
+        signature = self._file_signature()
+        tmp_path = f"{self._summary_path()}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": list(signature), **summary}, f)
+        os.replace(tmp_path, self._summary_path())
+
+        self._summary = summary
+        self._summary_signature = signature
+
+    def invalidate_cache(self):
+        """
+        Drops the cached workbook and records; the next access reloads the file.
+        """
+        self._wb = None
+        self._reset_derived()
+        self._signature = None
+        self._journal_offset = 0
+        self._summary = None
+        self._summary_signature = None
+        self._view = None
+
+    def cache_stats(self):
+        """
+        Returns the cache hit/miss counters.
+        """
+        return {"hits": self.cache_hits, "misses": self.cache_misses}
+
+    def data_version(self):
+        """
+        Returns a value that changes whenever the ledger is written, by this or another process.
         """
-        return load_workbook(self.file_path)
+        return list(self._file_signature())
 
+    @instrumented
     def add_payment(self, payment_data):
         """
         Adds a new payment record to the Excel file.
+        Returns False without writing if the Invoice No already exists.
         """
-        wb = self.load_workbook()
-        ws = wb.active
-        ws.append(payment_data)  # Append new row
-        wb.save(self.file_path)
-        wb.close()
+        invoice_no, result = self.add_payments([payment_data])[0]
+
+        if result == "duplicate":
+            print(f"⚠️ Invoice No {invoice_no} already exists. Payment not added.")
+            return False
+
         print("✅ New payment record added.")
+        return True
 
-    def adjust_excel_formatting(self):
+    @instrumented
+    @exclusive
+    def add_payments(self, payments):
+        """
+        Adds many payment records with a single load and a single save (or journal append).
+        Accepts a PaymentBatch or an iterable of Payment objects or row lists. Returns a list of (invoice_no, result)
+        pairs in input order, where result is "added" or "duplicate".
+        Submission and Invoice Dates are stored as real dates (text such as DD.MM.YYYY is parsed).
+        """
+        summary = self.load_summary()
+        index = self.load_index()
+        records = self._records
+        ws = self._wb.active
+        results = []
+        entries = []
+
+        if isinstance(payments, PaymentBatch):
+            payments = payments.rows()  # Stored tuples, no Payment views needed
+
+        for payment in payments:
+            row = normalize_dates(as_row(payment))
+            key = self._invoice_key(row[0])
+
+            if key in index:
+                results.append((row[0], "duplicate"))
+                continue
+
+            self._append_row(ws, row)  # Append new row
+            records.append(tuple(row))
+            index[key] = len(records) + 1  # Header occupies row 1
+            for field, date_index in self._date_indexes.items():
+                value = row[DATE_FIELDS[field]]
+                if isinstance(value, datetime):
+                    bisect.insort(date_index, (value, len(records) - 1))
+            if self._search_index is not None:
+                self._search_index.add(len(records) - 1, row)
+            if self._table is not None:
+                self._table.append(row)
+            self._summary_add(summary, row)
+            entries.append({"op": "add", "row": row})
+            results.append((row[0], "added"))
+
+        metrics.add_rows(len(entries))
+        if entries:
+            self._commit(entries)
+
+        return results
+
+    @staticmethod
+    def _track_width(summary, col_idx, value):
+        """
+        Widens the stored column width statistics for a changed cell value.
+        """
+        formatting = summary.get("formatting")
+        if formatting is not None and value is not None:
+            widths = formatting["widths"]
+            widths[col_idx] = max(widths[col_idx], len(str(value)))
+
+    @staticmethod
+    def _register_styles(wb):
+        """
+        Adds the shared named styles to the workbook if they are not there yet.
+        """
+        alignment = Alignment(wrap_text=True, vertical="top", horizontal="left")
+
+        if CURRENCY_STYLE not in wb.named_styles:
+            wb.add_named_style(NamedStyle(name=CURRENCY_STYLE, number_format='#,##0.00 TL', alignment=alignment))
+        if TEXT_STYLE not in wb.named_styles:
+            wb.add_named_style(NamedStyle(name=TEXT_STYLE, alignment=alignment))
+        if DATE_STYLE not in wb.named_styles:
+            wb.add_named_style(NamedStyle(name=DATE_STYLE, number_format=DATE_FORMAT, alignment=alignment))
+
+    @instrumented
+    @exclusive
+    def adjust_excel_formatting(self, full=False):
         """
         Adjusts column widths and row heights dynamically.
         Ensures proper text wrapping and applies TL currency formatting.
+        Only rows added since the last pass are formatted (tracked by a row watermark kept in
+        the summary sidecar, together with per-column width statistics). A full pass runs when
+        `full` is True or when no formatting state is available (e.g. after an external edit).
         """
         wb = self.load_workbook()
         ws = wb.active
+        summary = self.load_summary()
+        formatting = summary.get("formatting")
+        status_idx = ws.max_column - 1
+
+        if full or formatting is None or len(formatting["widths"]) != ws.max_column or formatting["watermark"] > ws.max_row:
+            formatting = {"watermark": 0, "widths": [0] * ws.max_column}  # Format everything, header included
+            summary["formatting"] = formatting
+
+        first_row = formatting["watermark"] + 1
+        widths = formatting["widths"]
 
         # Task Type column letter (B sütunu)
         task_type_column_letter = "B"
 
-        # Adjust column widths based on content
-        for col in ws.columns:
-            max_length = 0
-            col_letter = col[0].column_letter  # Get the column letter (A, B, C...)
+        with phase("iterate"):
+            self._register_styles(wb)
 
-            for cell in col:
-                try:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                except:
-                    pass
+            # Apply TL format and adjust row heights dynamically
+            for row_idx, row in enumerate(ws.iter_rows(min_row=first_row, max_row=ws.max_row), start=first_row):
+                max_height = 15  # Default row height
+                for idx, cell in enumerate(row):
+                    value = cell.value
+                    if value is not None and value != "":
+                        widths[idx] = max(widths[idx], len(str(format_date(value))))
 
-            # Limit the column width to 30 characters, force wrapping
-            if col_letter == task_type_column_letter:
-                ws.column_dimensions[col_letter].width = 30  # Fixed width
-            else:
-                ws.column_dimensions[col_letter].width = max_length + 2  # Apply precise width
+                    if row_idx == 1:
+                        continue  # Header keeps its default style
 
-        # Apply TL format and adjust row heights dynamically
-        for row_idx, row in enumerate(ws.iter_rows(min_row=2, max_row=ws.max_row), start=2):
-            max_height = 15  # Default row height
-            for idx, cell in enumerate(row):
-                if idx in [2, 3, 5, 6]:  # Columns: Tariff Fee, Gross Fee, VAT Amount, Net Fee
-                    if isinstance(cell.value, (int, float)):
-                        cell.number_format = '#,##0.00 TL'  # Set currency format
-                        cell.value = float(cell.value)  # Ensure numeric format
+                    if idx in CURRENCY_COLUMNS and isinstance(value, (int, float)):
+                        cell.style = CURRENCY_STYLE  # Set currency format and text wrapping
+                        cell.value = float(value)  # Ensure numeric format
+                    elif idx in DATE_COLUMNS and isinstance(value, datetime):
+                        cell.style = DATE_STYLE  # Keep DD.MM.YYYY display
+                    elif idx == status_idx and cell.fill.fill_type:
+                        fill = copy(cell.fill)  # Keep status highlighting
+                        cell.style = TEXT_STYLE
+                        cell.fill = fill
+                    else:
+                        cell.style = TEXT_STYLE  # Force text wrapping
 
-                # Force text wrapping
-                cell.alignment = Alignment(wrap_text=True, vertical="top", horizontal="left")
+                    # Only for Task Type column (B)
+                    if cell.column_letter == task_type_column_letter:
+                        text_length = len(str(value)) if value else 0
+                        lines = (text_length // 30) + 1  # Wrap after 30 characters
+                        max_height = max(max_height, lines * 15)  # Adjust row height
 
-                # Only for Task Type column (B)
-                if cell.column_letter == task_type_column_letter:
-                    text_length = len(str(cell.value)) if cell.value else 0
-                    lines = (text_length // 30) + 1  # Wrap after 30 characters
-                    max_height = max(max_height, lines * 15)  # Adjust row height
+                if row_idx > 1:
+                    ws.row_dimensions[row_idx].height = max_height  # Apply final row height
 
-            ws.row_dimensions[row_idx].height = max_height  # Apply final row height
+            # Adjust column widths from the width statistics
+            for idx, max_length in enumerate(widths):
+                col_letter = get_column_letter(idx + 1)
 
-        wb.save(self.file_path)
-        wb.close()
-        print("✅ Excel formatting adjusted: column widths, row heights, and TL format applied!")
+                # Limit the column width to 30 characters, force wrapping
+                if col_letter == task_type_column_letter:
+                    ws.column_dimensions[col_letter].width = 30  # Fixed width
+                else:
+                    ws.column_dimensions[col_letter].width = max_length + 2  # Apply precise width
+
+        metrics.add_rows(max(0, ws.max_row - first_row + 1))
+        formatting["watermark"] = ws.max_row
 
+        self.save_workbook(wb)
+        self._records = None  # Numeric cells may have been normalised to float
+        print(f"✅ Excel formatting adjusted: {max(0, ws.max_row - first_row + 1)} row(s) formatted, column widths and TL format applied!")
+
+    @instrumented
     def update_payment_status(self, invoice_no, new_status):
         """
         Updates the payment status (Pending <-> Paid) in the Excel file.
         """
-        wb = self.load_workbook()
-        ws = wb.active
-        found = False
-
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
-            if row[0].value == invoice_no:
-                row[-1].value = new_status  # Update status in the last column
-                found = True
-                break
-
-        if found:
-            wb.save(self.file_path)
-            wb.close()
-            return True
-        else:
-            wb.close()
-            return False
+        return self.update_payment_statuses({invoice_no: new_status})[invoice_no] == "updated"
+
+    @instrumented
+    @exclusive
+    def update_payment_statuses(self, updates):
+        """
+        Updates many payment statuses with a single load and a single save (or journal append).
+        Takes a {invoice_no: new_status} mapping and returns {invoice_no: result},
+        where result is "updated" or "not found".
+        """
+        summary = self.load_summary()
+        index = self.load_index()
+        records = self._records
+        ws = self._wb.active
+        results = {}
+        entries = []
+
+        for invoice_no, new_status in updates.items():
+            row_idx = index.get(self._invoice_key(invoice_no))
 
+            if row_idx is None:
+                results[invoice_no] = "not found"
+                continue
 
+            record = records[row_idx - 2]
+            ws.cell(row=row_idx, column=len(record)).value = new_status  # Update status in the last column
+            records[row_idx - 2] = record[:-1] + (new_status,)
+            if self._search_index is not None:
+                self._search_index.update(row_idx - 2, records[row_idx - 2])
+            if self._table is not None:
+                self._table.set_status(row_idx - 2, new_status)
+            self._summary_add(summary, record, sign=-1)
+            self._summary_add(summary, records[row_idx - 2])
+            self._track_width(summary, len(record) - 1, new_status)
+            entries.append({"op": "status", "invoice_no": invoice_no, "status": new_status})
+            results[invoice_no] = "updated"
+
+        metrics.add_rows(len(entries))
+        if entries:
+            self._commit(entries)
+
+        return results
+
+    @staticmethod
+    def _write_only_row(ws, row):
+        """
+        Returns a row for a write-only sheet, with date cells carrying the DD.MM.YYYY format.
+        """
+        row = list(row)
+        for idx in DATE_COLUMNS:
+            if isinstance(row[idx], datetime):
+                cell = WriteOnlyCell(ws, value=row[idx])
+                cell.number_format = DATE_FORMAT
+                row[idx] = cell
+        return row
+
+    def _begin_rewrite(self):
+        """
+        Starts a write-only copy of the ledger for a bulk import: the existing rows are streamed into it.
+        Returns (workbook, sheet, summary, Invoice No keys already in the ledger). Rows are added with
+        _rewrite_row and the copy replaces the ledger with _finish_rewrite; the caller holds self.lock
+        throughout. Other sheets (the payment chart) are not carried over; cell styles apart from dates
+        are re-applied by the next formatting pass.
+        """
+        self.compact()  # Every payment must be in the file before it is streamed
+        summary = deepcopy(self.load_summary())
+        formatting = summary.pop("formatting", None)
+        summary.pop("chart", None)  # The chart sheet is not carried over
+        existing = set()
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title="Payment Records")
+        self._install_status_rules(ws)
+        if formatting is not None:
+            for idx, max_length in enumerate(formatting["widths"]):
+                col_letter = get_column_letter(idx + 1)
+                ws.column_dimensions[col_letter].width = 30 if col_letter == "B" else max_length + 2
+
+        with phase("iterate"):
+            source = load_workbook(self.file_path, read_only=True)
+            try:
+                rows = source.active.iter_rows(values_only=True)
+                ws.append(next(rows, None) or HEADERS)
+                for row in rows:
+                    if all(value is None for value in row):
+                        continue
+                    existing.add(self._invoice_key(row[0]))
+                    ws.append(self._write_only_row(ws, row))
+            finally:
+                source.close()
+
+        return wb, ws, summary, existing
+
+    def _rewrite_row(self, ws, summary, row):
+        """
+        Appends an imported payment row to a write-only copy started by _begin_rewrite.
+        """
+        ws.append(self._write_only_row(ws, row))
+        self._summary_add(summary, row)
+
+    def _finish_rewrite(self, wb, summary):
+        """
+        Saves a write-only copy started by _begin_rewrite in place of the ledger.
+        """
+        tmp_path = os.path.splitext(self.file_path)[0] + ".tmp.xlsx"
+        with phase("save"):
+            wb.save(tmp_path)
+            os.replace(tmp_path, self.file_path)
+        self.lock.bump()
+        metrics.add_bytes(os.path.getsize(self.file_path))
+
+        self.invalidate_cache()
+        self._write_summary(summary)  # Without formatting state, so the next pass formats every row
+
+    @instrumented
+    @exclusive
+    def import_payments(self, file_path, mapping=None, progress=None, cancel=None):
+        """
+        Imports payments from a CSV or xlsx file (see importer.py for the recognised columns).
+        The existing ledger and the import file are both streamed and the new ledger is written in
+        openpyxl's write-only mode, so memory use stays flat however many rows are imported.
+        Invoice Nos already in the ledger or repeated in the file are rejected, like invalid rows,
+        into a rejected-rows CSV report. `progress(text)` is called after every chunk.
+        Returns the import counts, or None if `cancel` (a threading.Event) was set; the ledger is
+        only replaced when the whole file has been read. See _begin_rewrite for what is carried over.
+        """
+        importer = PaymentImport(file_path, mapping)
+        wb, ws, summary, existing = self._begin_rewrite()
+
+        def is_duplicate(invoice_no):
+            return self._invoice_key(invoice_no) in existing
+
+        with phase("iterate"):
+            for chunk in importer.chunks(is_duplicate, progress, cancel):
+                for row in chunk:
+                    self._rewrite_row(ws, summary, row)
+                metrics.add_rows(len(chunk))
+
+        if cancel is not None and cancel.is_set():
+            ws.close()  # Finish the half-written sheet; openpyxl removes its temporary file at exit
+            print("⚠️ Import cancelled, the ledger was not changed.")
+            return None
+
+        self._finish_rewrite(wb, summary)
+
+        result = importer.result()
+        print(f"✅ Import finished: {importer.status()}.")
+        if result["report"]:
+            print(f"⚠️ Rejected rows written to {result['report']}")
+        return result
+
+    @instrumented
     def search_payment(self, invoice_no):
         """
         Searches for a payment by Invoice No in the Excel file.
-        Returns payment details if found, otherwise returns None.
+        Returns the payment row (a tuple) if found, otherwise returns None. See get_payment for a Payment.
         """
-        wb = self.load_workbook()
-        ws = wb.active
+        row_idx = self.load_index().get(self._invoice_key(invoice_no))
+
+        if row_idx is None:
+            return None  # Return None if not found
+
+        return self._records[row_idx - 2]  # Return the payment record
+
+    def get_payment(self, invoice_no):
+        """
+        Returns the payment with the given Invoice No as a Payment, or None if there is none.
+        """
+        row = self.search_payment(invoice_no)
+        return Payment.from_row(row) if row is not None else None
+
+    def load_search_index(self):
+        """
+        Returns the cached full-text index over Task Type and Case Details, keyed by record position.
+        Built with one pass over the cached records; add and update keep it current afterwards.
+        """
+        records = self.load_records()
 
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row, values_only=True):
-            if row[0] == invoice_no:
-                wb.close()
-                return row  # Return the payment record
+        if self._search_index is None:
+            search_index = SearchIndex()
+            with phase("iterate"):
+                for pos, record in enumerate(records):
+                    search_index.add(pos, record)
+            metrics.add_rows(len(records))
+            self._search_index = search_index
 
-        wb.close()
-        return None  # Return None if not found
+        return self._search_index
 
+    @instrumented
+    def search_payments(self, query, limit=20):
+        """
+        Full-text search over Task Type and Case Details (e.g. a client name or "kira").
+        Matching ignores case and Turkish letters, and words may be typed incompletely.
+        Returns a PaymentBatch of up to `limit` payments, best match first.
+        """
+        search_index = self.load_search_index()
+        rows = PaymentBatch(self._records[pos] for pos in search_index.search(query, limit))
+        metrics.add_rows(len(rows))
+        return rows
+
+    @instrumented
+    def iter_payments(self, status=None, task_type=None, where=None, limit=None):
+        """
+        Lazily yields payment rows (without the header row).
+        Uses the cached records when they are up to date; otherwise streams the file
+        in openpyxl's read-only mode so memory use does not grow with the ledger.
+        Optional filters: exact Payment Status, exact Task Type, a `where(row)` predicate,
+        and a maximum number of rows to yield.
+        """
+        if limit is not None and limit <= 0:
+            return
+
+        if self._records is not None and self._signature == self._file_signature():
+            self.cache_hits += 1
+            rows = iter(self._records)
+            wb = None
+        else:
+            with phase("load"):
+                wb = load_workbook(self.file_path, read_only=True)
+                rows = self._merge_journal(wb.active.iter_rows(min_row=2, values_only=True))
+
+        scanned = 0
+        fetch_seconds = 0.0  # Time spent producing rows, excluding the caller's work between them
+
+        try:
+            yielded = 0
+            while True:
+                start = time.perf_counter()
+                row = next(rows, None)
+                fetch_seconds += time.perf_counter() - start
+                if row is None:
+                    break
+
+                scanned += 1
+                if all(value is None for value in row):
+                    continue  # Skip blank rows left behind by manual edits
+                if status is not None and row[-1] != status:
+                    continue
+                if task_type is not None and row[1] != task_type:
+                    continue
+                if where is not None and not where(row):
+                    continue
+
+                yield row
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    break
+        finally:
+            metrics.add_phase("iterate", fetch_seconds)
+            metrics.add_rows(scanned)
+            if wb is not None:
+                wb.close()  # Read-only workbooks keep the file handle open until closed
+
+    def _merge_journal(self, rows):
+        """
+        Yields file rows with the journal applied on top (status changes, then added rows).
+        """
+        overrides, added = self._journal_overlay()
+
+        if not overrides and not added:
+            yield from rows
+            return
+
+        for row in rows:
+            key = self._invoice_key(row[0])
+            if key in overrides:
+                row = row[:-1] + (overrides[key],)
+            if key in added:
+                del added[key]  # Already compacted into the file
+            yield row
+
+        for row in added.values():
+            yield tuple(row)
+
+    @staticmethod
+    def _sort_key(value):
+        """
+        Sort key that orders mixed cell values: numbers, then text, then blanks.
+        """
+        if value is None:
+            return (2, "")
+        if isinstance(value, (int, float)):
+            return (0, value)
+        return (1, str(value).casefold())
+
+    @instrumented
+    def get_payments_page(self, offset=0, limit=100, sort_by=None, descending=False, status=None):
+        """
+        Returns (PaymentBatch, total) for one page of payments, for paged tables.
+        `sort_by` is a column index (see HEADERS) and `status` filters on Payment Status.
+        Unsorted pages of a ledger that is not loaded yet are streamed (only the rows up to the
+        page are read) and counted from the running summary, so a table opens without parsing the
+        whole workbook. The sorted/filtered view is built on first use and cached until the ledger
+        changes, so paging through it only costs the slice.
+        """
+        if sort_by is None and self._records is None:
+            summary = self.load_summary()
+            total = summary["total"] if status is None else summary["statuses"].get(status, {}).get("count", 0)
+            rows = itertools.islice(self.iter_payments(status, limit=offset + limit), offset, None)
+            return PaymentBatch(rows), total
+
+        records = self.load_records()
+        key = (id(records), self._signature, sort_by, descending, status)
+
+        if self._view is None or self._view[0] != key:
+            with phase("iterate"):
+                rows = [row for row in records if any(value is not None for value in row)]
+                if status is not None:
+                    rows = [row for row in rows if row[-1] == status]
+                if sort_by is not None:
+                    rows.sort(key=lambda row: self._sort_key(row[sort_by]), reverse=descending)
+            metrics.add_rows(len(records))
+            self._view = (key, rows)
+
+        rows = self._view[1]
+        return PaymentBatch(rows[offset:offset + limit]), len(rows)
+
+    @instrumented
     def list_payments(self):
         """
         Displays all recorded payments in the console.
         """
-        wb = self.load_workbook()
-        ws = wb.active
-
         print("\n📌 Recorded Payments:")
-        for row in ws.iter_rows(values_only=True):
+        print(tuple(HEADERS))
+        for row in self.iter_payments():
             print(row)
     
-    def analyze_payments(self):
+    @staticmethod
+    def _date_range(start, end):
         """
-        Analyzes payments and calculates total numbers of paid and pending invoices.
-        Also provides total net and gross fees.
+        Parses the bounds of a date range query; raises ValueError for text that is not a date.
+        """
+        bounds = []
+        for value in (start, end):
+            parsed = parse_date(value) if value is not None else None
+            if value is not None and parsed is None:
+                raise ValueError(f"Invalid date: {value!r} (expected DD.MM.YYYY)")
+            bounds.append(parsed)
+        return bounds
+
+    def load_date_index(self, field="invoice_date"):
+        """
+        Returns the cached date index for a date field: a list of (date, record position)
+        sorted by date. Text dates in older rows are parsed; rows without a valid date are left out.
+        New payments are inserted in order by add_payments.
+        """
+        records = self.load_records()
+
+        if field not in self._date_indexes:
+            col_idx = DATE_FIELDS[field]
+            with phase("iterate"):
+                date_index = []
+                for pos, record in enumerate(records):
+                    value = parse_date(record[col_idx])
+                    if value is not None:
+                        date_index.append((value, pos))
+                date_index.sort()
+            metrics.add_rows(len(records))
+            self._date_indexes[field] = date_index
+
+        return self._date_indexes[field]
+
+    @instrumented
+    def payments_between(self, start=None, end=None, field="invoice_date", status=None):
+        """
+        Returns the payments whose date field falls between start and end (inclusive, either may be None),
+        in date order. Uses binary search on the date index, so only matching rows are touched.
+        """
+        start_date, end_date = self._date_range(start, end)
+        date_index = self.load_date_index(field)
+        records = self._records
+        lo = bisect.bisect_left(date_index, (start_date,)) if start_date is not None else 0
+        hi = bisect.bisect_right(date_index, (end_date, len(records))) if end_date is not None else len(date_index)
+
+        rows = [records[pos] for _, pos in date_index[lo:hi]]
+        if status is not None:
+            rows = [row for row in rows if row[-1] == status]
+
+        metrics.add_rows(len(rows))
+        return PaymentBatch(rows)
+
+    def load_table(self):
+        """
+        Returns the cached columnar copy of the records (NumPy arrays, see PaymentTable).
+        Built once per file version; add and update keep it current afterwards.
+        """
+        records = self.load_records()
+
+        if self._table is None:
+            with phase("iterate"):
+                self._table = PaymentTable(records)
+            metrics.add_rows(len(records))
+
+        return self._table
+
+    @instrumented
+    def group_payments(self, by, status=None, start=None, end=None, field="invoice_date"):
+        """
+        Vectorised grouped totals over the whole ledger.
+        `by` is one key or a list of keys: "status", "task_type", "vat_rate", "month", "quarter" or "year"
+        (dates come from `field`). Optional filters: Payment Status and a start..end date range.
+        Returns a list of (*keys, count, tariff fee, gross fee, VAT amount, net fee) sorted by the keys,
+        e.g. group_payments(["month", "status"]) -> [("2024-01", "Paid", 12, ...), ...].
+        """
+        start_date, end_date = self._date_range(start, end)
+        return self.load_table().group_by(by, status, start_date, end_date, field)
+
+    @instrumented
+    def rollup(self, period="month", field="invoice_date", start=None, end=None):
+        """
+        Groups payments by month or quarter of a date field and by status.
+        Returns a list of (period, status, count, net total, gross total) sorted by period and status,
+        e.g. ("2024-Q1", "Pending", 12, 45000.0, 54000.0).
+        """
+        if period not in ("month", "quarter"):
+            raise ValueError(f"Unknown period: {period!r} (expected 'month' or 'quarter')")
+
+        groups = self.group_payments([period, "status"], start=start, end=end, field=field)
+        return [(bucket, status, count, net, gross) for bucket, status, count, _, gross, _, net in groups]
+
+    @instrumented
+    @exclusive
+    def migrate_dates(self):
+        """
+        Converts Submission and Invoice Dates stored as text (e.g. DD.MM.YYYY) into real dates.
+        Text that is not a recognisable date is left unchanged. Returns the number of cells converted.
         """
         wb = self.load_workbook()
         ws = wb.active
+        converted = 0
+
+        with phase("iterate"):
+            for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
+                for idx in DATE_COLUMNS:
+                    cell = row[idx]
+                    if isinstance(cell.value, str):
+                        parsed = parse_date(cell.value)
+                        if parsed is not None:
+                            cell.value = parsed
+                            cell.number_format = DATE_FORMAT
+                            converted += 1
+        metrics.add_rows(ws.max_row - 1)
+
+        if converted:
+            self.save_workbook(wb)
+            self._records = None  # Re-read the converted values
 
-        total_payments = 0
-        total_paid = 0
-        total_pending = 0
-        total_net_paid = 0  # Total Net Fee for Paid invoices
-        total_net_pending = 0  # Total Net Fee for Pending invoices
-        total_gross_paid = 0  # Total Gross Fee for Paid invoices
-        total_gross_pending = 0  # Total Gross Fee for Pending invoices
+        print(f"✅ {converted} date cell(s) converted to real dates.")
+        return converted
 
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row, values_only=True):
-            total_payments += 1
-            status = row[-1]  # Last column: Payment Status
-            gross_fee = row[3]  # Gross Fee (Column D)
-            net_fee = row[6]  # Net Fee (Column G)
+    @instrumented
+    @exclusive
+    def recompute_vat(self, rule, dry_run=False):
+        """
+        Recalculates VAT Amount and Net Fee (and sets the VAT rate, if the rule has one) for the
+        payments matched by a vat.VatRule, selecting and computing them with the columnar table.
+        Every change is written with a single save. Returns {"matched", "skipped", "changes"},
+        changes being a list of (old row, new row); with dry_run nothing is written.
+        """
+        summary = self.load_summary()
+        records = self.load_records()
+        table = self.load_table()
+
+        with phase("iterate"):
+            changes, matched, skipped = plan_changes(records, rule, table)
+        metrics.add_rows(matched)
+        result = {"matched": matched, "skipped": skipped, "changes": [(records[pos], row) for pos, row in changes]}
 
-            if status == "Paid":
-                total_paid += 1
-                total_net_paid += net_fee
-                total_gross_paid += gross_fee
-            elif status == "Pending":
-                total_pending += 1
-                total_net_pending += net_fee
-                total_gross_pending += gross_fee
+        if dry_run or not changes:
+            return result
 
-        wb.close()
+        ws = self._wb.active
+        for pos, row in changes:
+            for col_idx in (4, 5, 6):  # VAT (%), VAT Amount, Net Fee
+                ws.cell(row=pos + 2, column=col_idx + 1).value = row[col_idx]
+                self._track_width(summary, col_idx, row[col_idx])
+            self._summary_add(summary, records[pos], sign=-1)
+            self._summary_add(summary, row)
+            records[pos] = row
+        table.set_amounts(changes)
 
-        return total_payments, total_paid, total_net_paid, total_gross_paid, total_pending, total_net_pending, total_gross_pending
+        self.save_workbook(self._wb)
+        return result
 
-    def highlight_payments(self):
+    def payment_totals(self, start=None, end=None, field="invoice_date"):
+        """
+        Returns {"total": count, "statuses": {status: {"count", "net", "gross"}}}.
+        Without a period this is served from the running summary, so the cost does not depend
+        on the number of rows. With start/end only payments dated in that range are counted,
+        using the columnar table.
+        """
+        if start is None and end is None:
+            summary = self.load_summary()
+            return {"total": summary["total"], "statuses": summary["statuses"]}
+
+        summary = {"total": 0, "statuses": {}}
+        for status, count, _, gross, _, net in self.group_payments("status", start=start, end=end, field=field):
+            summary["total"] += count
+            summary["statuses"][status] = {"count": count, "net": net, "gross": gross}
+        return summary
+
+    @instrumented
+    def analyze_payments(self, start=None, end=None, field="invoice_date"):
+        """
+        Analyzes payments and calculates total numbers of paid and pending invoices.
+        Also provides total net and gross fees (see payment_totals).
+        """
+        summary = self.payment_totals(start, end, field)
+
+        empty = {"count": 0, "net": 0, "gross": 0}
+        paid = summary["statuses"].get("Paid", empty)
+        pending = summary["statuses"].get("Pending", empty)
+
+        return (summary["total"], paid["count"], paid["net"], paid["gross"],
+                pending["count"], pending["net"], pending["gross"])
+
+    @staticmethod
+    def _status_rules_range(ws):
+        """
+        Returns the range covered by the Payment Status rules (the whole status column below the header).
+        """
+        # Write-only sheets (used by import_payments) do not track max_column
+        col_letter = get_column_letter(ws.max_column if hasattr(ws, "max_column") else len(HEADERS))
+        return f"{col_letter}2:{col_letter}1048576"
+
+    def _has_status_rules(self, ws):
+        """
+        Checks whether the Paid/Pending conditional formatting rules are already installed.
+        """
+        target = self._status_rules_range(ws)
+
+        for conditional_format in ws.conditional_formatting:
+            if str(conditional_format.sqref) == target and any(
+                rule.formula == ['"Paid"'] for rule in conditional_format.rules
+            ):
+                return True
+
+        return False
+
+    @staticmethod
+    def _install_status_rules(ws):
+        """
+        Adds conditional formatting so Excel colours Paid cells green and Pending cells red.
+        """
+        target = ExcelManager._status_rules_range(ws)
+        ws.conditional_formatting.add(target, CellIsRule(
+            operator="equal", formula=['"Paid"'],
+            fill=PatternFill(start_color=PAID_COLOR, end_color=PAID_COLOR, fill_type="solid")
+        ))
+        ws.conditional_formatting.add(target, CellIsRule(
+            operator="equal", formula=['"Pending"'],
+            fill=PatternFill(start_color=PENDING_COLOR, end_color=PENDING_COLOR, fill_type="solid")
+        ))
+
+    @instrumented
+    @exclusive
+    def highlight_payments(self, conditional=True):
         """
         Highlights 'Paid' payments in green and 'Pending' payments in red in the Excel file.
+        By default this installs one conditional formatting rule pair on the Payment Status column,
+        so Excel colours the cells itself and status changes need no extra pass. Static fills left
+        by earlier versions are removed when the rules are installed. Once the rules exist this
+        is a no-op. With conditional=False every status cell gets a static fill instead.
         """
         wb = self.load_workbook()
         ws = wb.active
 
+        if conditional:
+            if self._has_status_rules(ws):
+                print("✅ Payment statuses are already highlighted by conditional formatting.")
+                return
+
+            # Migrate static fills written by earlier versions
+            with phase("iterate"):
+                for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=ws.max_column):
+                    status_cell = row[-1]
+                    if status_cell.fill.fill_type and str(status_cell.fill.fgColor.rgb)[-6:] in (PAID_COLOR, PENDING_COLOR):
+                        status_cell.fill = PatternFill()
+            metrics.add_rows(ws.max_row - 1)
+
+            self._install_status_rules(ws)
+            self.save_workbook(wb)
+            print("✅ Payment statuses highlighted in Excel (conditional formatting)!")
+            return
+
         # Define color fills
-        green_fill = PatternFill(start_color="C6E0B4", end_color="C6E0B4", fill_type="solid")  # Light green
-        red_fill = PatternFill(start_color="F4CCCC", end_color="F4CCCC", fill_type="solid")  # Light red
+        green_fill = PatternFill(start_color=PAID_COLOR, end_color=PAID_COLOR, fill_type="solid")  # Light green
+        red_fill = PatternFill(start_color=PENDING_COLOR, end_color=PENDING_COLOR, fill_type="solid")  # Light red
 
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
-            status_cell = row[-1]  # Payment Status column (last column)
+        with phase("iterate"):
+            for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
+                status_cell = row[-1]  # Payment Status column (last column)
 
-            if status_cell.value == "Paid":
-                status_cell.fill = green_fill  # Apply green fill
-            elif status_cell.value == "Pending":
-                status_cell.fill = red_fill  # Apply red fill
+                if status_cell.value == "Paid":
+                    status_cell.fill = green_fill  # Apply green fill
+                elif status_cell.value == "Pending":
+                    status_cell.fill = red_fill  # Apply red fill
+        metrics.add_rows(ws.max_row - 1)
 
-        wb.save(self.file_path)
-        wb.close()
-        print("✅ Payment statuses highlighted in Excel!")      
+        self.save_workbook(wb)
+        print("✅ Payment statuses highlighted in Excel!")
 
+    @instrumented
     def get_all_payments(self):
         """
         Retrieves all payment records from the Excel file.
-        Returns a list of tuples containing payment data.
+        Returns a PaymentBatch containing payment data.
         """
-        wb = self.load_workbook()
-        ws = wb.active
-        payments = []
-
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row, values_only=True):
-            payments.append(row)
-
-        wb.close()
-        return payments    
+        return PaymentBatch(self.iter_payments())
 
+    @instrumented
     def get_payment_counts(self):
         """
         Counts the number of Paid and Pending payments.
         Returns (total_paid, total_pending).
         """
-        wb = self.load_workbook()
-        ws = wb.active
-
-        total_paid = 0
-        total_pending = 0
+        statuses = self.load_summary()["statuses"]
+        total_paid = statuses.get("Paid", {}).get("count", 0)
+        total_pending = statuses.get("Pending", {}).get("count", 0)
 
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row, values_only=True):
-            if row[-1] == "Paid":
-                total_paid += 1
-            elif row[-1] == "Pending":
-                total_pending += 1
+        return total_paid, total_pending
 
-        wb.close()
-        return total_paid, total_pending  
-
-    def generate_payment_chart(self):
+    @instrumented
+    @exclusive
+    def generate_payment_chart(self, views=None, charts=None):
         """
-        Generates a pie chart showing the ratio of 'Paid' vs 'Pending' payments
-        and adds it to the Excel file.
+        Writes the payment charts (see charts.CHART_VIEWS; all views by default) to the
+        Payment Chart sheet of the Excel file, replacing the previous charts.
+        The chart data comes from the running summary and the grouped totals, and is remembered in
+        the summary sidecar: when nothing changed since the last run the file is not rewritten.
+        `charts` may supply {view: chart_data(...)} computed elsewhere (e.g. across partitions).
         """
-        wb = self.load_workbook()
-        ws = wb.active
-
-        # Count the number of 'Paid' and 'Pending' payments
-        total_paid = 0
-        total_pending = 0
-
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row, values_only=True):
-            if row[-1] == "Paid":
-                total_paid += 1
-            elif row[-1] == "Pending":
-                total_pending += 1
+        views = list(views or CHART_VIEWS)
+        charts = charts or {view: chart_data(self, view) for view in views}
 
         # If there are no payments, do not create a chart
-        if total_paid == 0 and total_pending == 0:
+        if not any(has_data(data) for data in charts.values()):
             print("⚠️ No payments found. Chart will not be created.")
-            wb.close()
             return
 
-        # Add data for the chart to a new sheet
-        chart_sheet = wb.create_sheet(title="Payment Chart")
-        chart_sheet.append(["Status", "Count"])
-        chart_sheet.append(["Paid", total_paid])
-        chart_sheet.append(["Pending", total_pending])
-
-        # Define chart data range
-        data = Reference(chart_sheet, min_col=2, min_row=2, max_row=3)
-        labels = Reference(chart_sheet, min_col=1, min_row=2, max_row=3)
-
-        # Create pie chart
-        pie_chart = PieChart()
-        pie_chart.add_data(data, titles_from_data=False)
-        pie_chart.set_categories(labels)
-
-        pie_chart.title = "Paid vs Pending Payments"
-        pie_chart.style = 2
-        
-
-        # Optimize chart layout
-        pie_chart.layout = Layout(
-            manualLayout=ManualLayout(
-                x=0.1, 
-                y=0.07,
-                w=0.8, 
-                h=0.8 
-            )
-        )
-
-        # Add chart to sheet
-        chart_sheet.add_chart(pie_chart, "E5")
+        summary = self.load_summary()
+        if summary.get("chart") == charts:
+            print("✅ Payment chart is already up to date.")
+            return
+
+        wb = self.load_workbook()
+        write_chart_sheet(wb, charts)
 
         # Save the workbook
-        wb.save(self.file_path)
-        wb.close()
+        self.save_workbook(wb)
+        summary["chart"] = charts
+        self._write_summary(summary)
         print("✅ Payment chart added to Excel!")
 
        
\ No newline at end of file
@@ -0,0 +1,218 @@
+import os
+import csv
+from datetime import datetime
+
+from openpyxl import load_workbook
+
+from models import FIELDS, Payment
+from search_index import fold
+
+# Column names recognised in import files, per Payment field (compared after folding, so
+# case, spacing and Turkish letters do not matter). The ledger's own headers always match.
+FIELD_ALIASES = {
+    "invoice_no": ["Invoice No", "Invoice", "Invoice Number", "Fatura No", "Fatura Numarası"],
+    "task_type": ["Task Type", "Task", "Görev Türü", "İş Türü"],
+    "tariff_fee": ["Tariff Fee", "Tariff", "Tarife Ücreti"],
+    "gross_fee": ["Gross Fee", "Gross", "Brüt Ücret"],
+    "vat_rate": ["VAT (%)", "VAT Rate", "VAT", "KDV (%)", "KDV Oranı"],
+    "case_details": ["Case Details", "Case", "Dosya Bilgileri", "Dosya"],
+    "submission_date": ["Submission Date", "Başvuru Tarihi"],
+    "invoice_date": ["Invoice Date", "Fatura Tarihi"],
+    "payment_status": ["Payment Status", "Status", "Ödeme Durumu", "Durum"],
+}
+# Fields the Add Payment dialog requires too; VAT Amount and Net Fee are always computed
+REQUIRED_FIELDS = ["invoice_no", "tariff_fee", "gross_fee", "vat_rate"]
+STATUS_ALIASES = {"paid": "Paid", "odendi": "Paid", "pending": "Pending", "bekliyor": "Pending", "": "Pending"}
+
+def _header_key(name):
+    return " ".join(fold(name).replace("_", " ").split()) if name is not None else ""
+
+def map_columns(headers, mapping=None):
+    """
+    Returns {field: column position} for an import file's header row.
+    `mapping` may name the source column for some fields explicitly ({field: header}).
+    Raises ValueError when a required field has no column.
+    """
+    positions = {_header_key(header): idx for idx, header in reversed(list(enumerate(headers)))}
+    columns = {}
+
+    for field in FIELDS:
+        names = [mapping[field]] if mapping and field in mapping else FIELD_ALIASES.get(field, []) + [field]
+        for name in names:
+            if _header_key(name) in positions:
+                columns[field] = positions[_header_key(name)]
+                break
+
+    missing = [field for field in REQUIRED_FIELDS if field not in columns]
+    if missing:
+        raise ValueError(f"Import file has no column for: {', '.join(missing)} (headers: {list(headers)})")
+
+    return columns
+
+def parse_amount(value):
+    """
+    Converts an amount cell to float. Accepts numbers and text such as "2292.00",
+    "2.292,00" or "2,292.00 TL"; raises ValueError for anything else.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"missing amount {value!r}")
+
+    text = value.replace("TL", "").replace("₺", "").replace("%", "").replace(" ", "").strip()
+    if "," in text and "." in text:
+        # The later separator is the decimal one
+        thousands = "." if text.rfind(",") > text.rfind(".") else ","
+        text = text.replace(thousands, "")
+    text = text.replace(",", ".")
+    return float(text)
+
+def read_rows(file_path):
+    """
+    Streams an import file and yields (line number, row values), starting with the header row.
+    CSV files may use comma or semicolon separators; xlsx files are read in read-only mode.
+    """
+    if os.path.splitext(file_path)[1].lower() in (".xlsx", ".xlsm"):
+        wb = load_workbook(file_path, read_only=True)
+        try:
+            for line_no, row in enumerate(wb.active.iter_rows(values_only=True), start=1):
+                yield line_no, row
+        finally:
+            wb.close()
+        return
+
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        for line_no, row in enumerate(csv.reader(f, dialect), start=1):
+            yield line_no, row
+
+class PaymentImport:
+    """
+    This class turns an import file into validated payment rows, chunk by chunk.
+    Rows that cannot be imported are written to a rejected-rows CSV report next to the
+    source file as they are found, so neither the input nor the report is held in memory.
+    """
+
+    def __init__(self, file_path, mapping=None, chunk_size=1000, report_path=None):
+        self.file_path = file_path
+        self.mapping = mapping
+        self.chunk_size = chunk_size
+        self.report_path = report_path or os.path.splitext(file_path)[0] + ".rejected.csv"
+        self.read = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self._report = None
+
+    def _reject(self, line_no, reason, row):
+        """
+        Appends a row to the rejected-rows report (created on the first rejection).
+        """
+        if self._report is None:
+            self._report_file = open(self.report_path, "w", newline="", encoding="utf-8-sig")
+            self._report = csv.writer(self._report_file)
+            self._report.writerow(["Line", "Reason", *self.headers])
+        self._report.writerow([line_no, reason, *("" if value is None else value for value in row)])
+        self.rejected += 1
+
+    def to_payment(self, row):
+        """
+        Builds a Payment from one source row; VAT Amount and Net Fee are computed the same way
+        as in the Add Payment dialog. Raises ValueError with the reason for invalid rows.
+        """
+        def get(field, default=None):
+            idx = self.columns.get(field)
+            value = row[idx] if idx is not None and idx < len(row) else None
+            return default if value is None or value == "" else value
+
+        status = get("payment_status", "")
+        status = STATUS_ALIASES.get(fold(status).strip(), status) if isinstance(status, str) else status
+
+        dates = []
+        for field in ("submission_date", "invoice_date"):
+            value = get(field)
+            dates.append(value if not isinstance(value, (int, float)) else datetime.fromordinal(
+                datetime(1899, 12, 30).toordinal() + int(value)))  # Unformatted Excel date serial
+
+        invoice_no = get("invoice_no")
+        if isinstance(invoice_no, float) and invoice_no.is_integer():
+            invoice_no = int(invoice_no)  # Numeric invoice cells, e.g. 1024.0
+
+        return Payment(
+            invoice_no, get("task_type", ""), parse_amount(get("tariff_fee")), parse_amount(get("gross_fee")),
+            parse_amount(get("vat_rate")), None, None, get("case_details", ""), dates[0], dates[1], status
+        )
+
+    def chunks(self, is_duplicate, progress=None, cancel=None):
+        """
+        Yields lists of up to chunk_size valid payment rows (tuples in ledger column order).
+        `is_duplicate(invoice_no)` checks the existing ledger; repeats within the file are caught too.
+        Duplicates are rejected and counted in both `duplicates` and `rejected`.
+        `progress(text)` is called after every chunk. Stops early when `cancel` (a threading.Event) is set.
+        """
+        seen = set()
+        chunk = []
+        rows = read_rows(self.file_path)
+
+        if os.path.exists(self.report_path):
+            os.remove(self.report_path)  # Report left by an earlier import of the same file
+
+        try:
+            _, self.headers = next(rows, (0, None))
+            if self.headers is None:
+                raise ValueError(f"Import file is empty: {self.file_path}")
+            self.headers = ["" if header is None else str(header) for header in self.headers]
+            self.columns = map_columns(self.headers, self.mapping)
+
+            for line_no, row in rows:
+                if all(value is None or value == "" for value in row):
+                    continue  # Blank line
+                self.read += 1
+
+                try:
+                    payment = self.to_payment(row)
+                except (ValueError, TypeError) as e:
+                    self._reject(line_no, str(e), row)
+                    continue
+
+                key = payment.invoice_no
+                if key in seen or is_duplicate(payment.invoice_no):
+                    self._reject(line_no, "duplicate Invoice No", row)
+                    self.duplicates += 1
+                    continue
+                seen.add(key)
+
+                chunk.append(payment.to_tuple())
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    self.imported += len(chunk)
+                    chunk = []
+                    if progress is not None:
+                        progress(self.status())
+                    if cancel is not None and cancel.is_set():
+                        return
+
+            if chunk:
+                yield chunk
+                self.imported += len(chunk)
+        finally:
+            rows.close()
+            if self._report is not None:
+                self._report_file.close()
+
+    def status(self):
+        return f"{self.read:,} rows read, {self.imported:,} imported, {self.rejected:,} rejected"
+
+    def result(self):
+        """
+        Returns the import counts and the rejected-rows report path (None if nothing was rejected).
+        """
+        return {
+            "read": self.read, "imported": self.imported, "duplicates": self.duplicates,
+            "rejected": self.rejected, "report": self.report_path if self.rejected else None,
+        }
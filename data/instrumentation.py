@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import inspect
+import cProfile
+import threading
+import functools
+from collections import deque
+from datetime import datetime
+
+import config
+
+class Metrics:
+    """
+    This class collects per-operation timings for the storage managers.
+    Each outermost call of an instrumented method becomes one record with its total time,
+    the time spent in the load / iterate / save phases, rows touched and bytes written.
+    """
+
+    def __init__(self, history=1000):
+        """
+        Keeps the last `history` operation records plus running totals per operation.
+        """
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Per-thread stack of running operations
+        self.recent = deque(maxlen=history)
+        self.totals = {}
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self):
+        """
+        Returns the record of the outermost operation running on this thread, or None.
+        """
+        stack = self._stack()
+        return stack[0] if stack else None
+
+    def start(self, name):
+        """
+        Starts an operation. Nested calls are folded into the outermost record.
+        Returns True if this call is the outermost one.
+        """
+        stack = self._stack()
+        record = {"operation": name, "started": time.perf_counter(),
+                  "phases": {}, "rows": 0, "bytes_written": 0}
+        stack.append(record)
+
+        if len(stack) == 1 and config.PROFILE_ENABLED:
+            record["profiler"] = cProfile.Profile()
+            record["profiler"].enable()
+
+        return len(stack) == 1
+
+    def finish(self, error=None):
+        """
+        Finishes the innermost running operation; outermost ones are stored.
+        """
+        record = self._stack().pop()
+
+        if self._stack():
+            return  # Nested call, accounted for by the outermost operation
+
+        record["seconds"] = time.perf_counter() - record.pop("started")
+        record["timestamp"] = datetime.now().isoformat(timespec="milliseconds")
+        if error is not None:
+            record["error"] = repr(error)
+
+        profiler = record.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(config.PROFILE_DIR, exist_ok=True)
+            record["profile"] = os.path.join(
+                config.PROFILE_DIR, f"{record['operation']}-{datetime.now():%Y%m%d-%H%M%S-%f}.prof"
+            )
+            profiler.dump_stats(record["profile"])
+
+        with self._lock:
+            self.recent.append(record)
+            totals = self.totals.setdefault(record["operation"], {
+                "calls": 0, "seconds": 0.0, "max_seconds": 0.0, "phases": {}, "rows": 0, "bytes_written": 0
+            })
+            totals["calls"] += 1
+            totals["seconds"] += record["seconds"]
+            totals["max_seconds"] = max(totals["max_seconds"], record["seconds"])
+            totals["rows"] += record["rows"]
+            totals["bytes_written"] += record["bytes_written"]
+            for phase, seconds in record["phases"].items():
+                totals["phases"][phase] = totals["phases"].get(phase, 0.0) + seconds
+
+        if config.METRICS_LOG:
+            with open(config.METRICS_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def add_phase(self, phase, seconds):
+        record = self.current()
+        if record is not None:
+            record["phases"][phase] = record["phases"].get(phase, 0.0) + seconds
+
+    def add_rows(self, count):
+        record = self.current()
+        if record is not None:
+            record["rows"] += count
+
+    def add_bytes(self, count):
+        record = self.current()
+        if record is not None:
+            record["bytes_written"] += count
+
+    def summary(self):
+        """
+        Returns {operation: totals} with average and per-phase times, for diagnostics views.
+        """
+        with self._lock:
+            summary = {}
+            for name, totals in self.totals.items():
+                summary[name] = dict(totals, phases=dict(totals["phases"]),
+                                     avg_seconds=totals["seconds"] / totals["calls"])
+            return summary
+
+    def reset(self):
+        with self._lock:
+            self.recent.clear()
+            self.totals.clear()
+
+    def dump(self, file_path):
+        """
+        Appends the recent operation records to a JSON lines file and returns the number written.
+        """
+        with self._lock:
+            records = list(self.recent)
+
+        with open(file_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+        return len(records)
+
+# Process-wide metrics shared by every manager instance
+metrics = Metrics()
+
+class phase:
+    """
+    Context manager that adds the elapsed time to a phase of the running operation:
+        with phase("save"): wb.save(path)
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        metrics.add_phase(self.name, time.perf_counter() - self.start)
+        return False
+
+def instrumented(method):
+    """
+    Decorator that records a method call as an operation named after the method.
+    Generator methods are timed from the first row until they are exhausted or closed.
+    """
+    name = method.__name__
+
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(*args, **kwargs):
+            metrics.start(name)
+            error = None
+            try:
+                yield from method(*args, **kwargs)
+            except BaseException as e:
+                if not isinstance(e, GeneratorExit):
+                    error = e
+                raise
+            finally:
+                metrics.finish(error)
+
+        return generator_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        metrics.start(name)
+        error = None
+        try:
+            return method(*args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            metrics.finish(error)
+
+    return wrapper
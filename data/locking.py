@@ -0,0 +1,145 @@
+import os
+import time
+import threading
+import functools
+
+import config
+from instrumentation import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+VERSION_WIDTH = 20  # The version is stored zero-padded, so it is always rewritten in place
+LOCK_OFFSET = 1 << 20  # Windows locks a byte range; lock one far past the version so readers are not blocked
+
+def lock_path(file_path):
+    """
+    Returns the path of the lock file of a ledger (payment_records.lock next to payment_records.xlsx).
+    """
+    return os.path.splitext(file_path)[0] + ".lock"
+
+def ledger_version(file_path):
+    """
+    Returns the write counter of a ledger, read without locking (0 if it was never written under a lock).
+    """
+    try:
+        with open(lock_path(file_path), "rb") as f:
+            return int(f.read(VERSION_WIDTH) or 0)
+    except (OSError, ValueError):
+        return 0
+
+class LedgerLock:
+    """
+    This class is an exclusive lock on a ledger shared by several processes (e.g. two GUIs on the
+    same network folder) and by the threads of one process. It is reentrant for the thread holding it.
+    The lock file also holds a version counter that every committed write increases, so other
+    processes notice a write even where file modification times are coarse.
+    Only writers take the lock; readers rely on atomic file replacement and never wait for it.
+    """
+
+    def __init__(self, file_path, timeout=None):
+        self.path = lock_path(file_path)
+        self.timeout = config.LOCK_TIMEOUT if timeout is None else timeout
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def _try_lock(self):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._file.seek(LOCK_OFFSET)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(LOCK_OFFSET)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def acquire(self):
+        """
+        Takes the lock, retrying until config.LOCK_TIMEOUT seconds have passed.
+        Raises TimeoutError if another process keeps holding it.
+        """
+        start = time.perf_counter()
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"The ledger is busy (locked by another task): {self.path}")
+
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, "a+b")
+                delay = 0.01
+                while not self._try_lock():
+                    if time.perf_counter() - start >= self.timeout:
+                        raise TimeoutError(f"The ledger is locked by another user, try again later: {self.path}")
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.25)  # Back off while another process writes
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+            metrics.add_phase("lock", time.perf_counter() - start)
+
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._unlock()
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    @property
+    def held(self):
+        """
+        True while a thread of this process holds the lock, so no other process can write.
+        """
+        return self._depth > 0
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+        return False
+
+    def bump(self):
+        """
+        Increases the version counter after a committed write (takes the lock if not already held).
+        """
+        with self, open(self.path, "r+b") as f:
+            try:
+                version = int(f.read(VERSION_WIDTH) or 0) + 1
+            except ValueError:
+                version = 1  # Unreadable counter; any change still tells readers to reload
+            f.seek(0)
+            f.write(f"{version:0{VERSION_WIDTH}d}".encode("ascii"))
+        return version
+
+def exclusive(method):
+    """
+    Decorator for manager methods that write the ledger: the method runs while holding self.lock,
+    so its read-check-write sequence cannot interleave with another writer.
+    Managers opened read-only refuse to write (and never create the lock file).
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(self, "read_only", False):
+            raise PermissionError(f"The ledger was opened read-only: {self.file_path}")
+        with self.lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
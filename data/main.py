@@ -1,8 +1,66 @@
-from excel_manager import ExcelManager
-from models import Payment
+import multiprocessing
+
+import config
+from instrumentation import metrics
+from storage import create_manager
+from models import Payment, PaymentBatch
+from consolidation import consolidate_ledgers, print_report
+from vat import VatRule, print_result, recompute_payments
+
+def prompt_payment():
+    """
+    Asks for the details of a single payment and returns a Payment object.
+    VAT Amount and Net Fee are computed by Payment; invalid input raises ValueError.
+    """
+    invoice_no = input("Enter Invoice No: ")
+    task_type = input("Enter Task Type: ")
+    tariff_fee = float(input("Enter Tariff Fee (TL): "))
+    gross_fee = float(input("Enter Gross Fee (TL): "))
+    vat_rate = float(input("Enter VAT Rate (%): "))
+    case_details = input("Enter Case Details: ")
+    submission_date = input("Enter Submission Date (DD.MM.YYYY): ")
+    invoice_date = input("Enter Invoice Date (DD.MM.YYYY): ")
+    payment_status = "Pending"
+
+    return Payment(invoice_no, task_type, tariff_fee, gross_fee, vat_rate,
+                   None, None, case_details, submission_date, invoice_date, payment_status)
+
+def prompt_vat_rule():
+    """
+    Asks which payments to recompute and at which VAT rate, and returns a VatRule.
+    Blank answers leave that part of the rule open; invalid input raises ValueError.
+    """
+    vat_rate = input("Enter new VAT Rate (%) (blank keeps each payment's rate): ").strip()
+    start = input("Enter first Invoice Date (DD.MM.YYYY, blank for all): ").strip()
+    end = input("Enter last Invoice Date (DD.MM.YYYY, blank for all): ").strip()
+    task_type = input("Enter Task Type (blank for all): ").strip()
+    status = input("Enter status (Paid/Pending, blank for all): ").strip()
+
+    return VatRule(float(vat_rate) if vat_rate else None, start, end, task_type=task_type, status=status or None)
+
+def show_diagnostics():
+    """
+    Prints per-operation timings collected during this session.
+    """
+    summary = metrics.summary()
+
+    if not summary:
+        print("ℹ️ No operations recorded yet.")
+        return
+
+    print(f"\n{'Operation':<25}{'Calls':>7}{'Avg ms':>10}{'Max ms':>10}{'Load ms':>10}{'Iter ms':>10}{'Save ms':>10}{'Lock ms':>10}{'Rows':>10}{'Bytes':>12}")
+    for name, totals in sorted(summary.items(), key=lambda item: -item[1]["seconds"]):
+        phases = totals["phases"]
+        print(f"{name:<25}{totals['calls']:>7}{totals['avg_seconds'] * 1000:>10.1f}{totals['max_seconds'] * 1000:>10.1f}"
+              f"{phases.get('load', 0) * 1000:>10.1f}{phases.get('iterate', 0) * 1000:>10.1f}{phases.get('save', 0) * 1000:>10.1f}"
+              f"{phases.get('lock', 0) * 1000:>10.1f}"
+              f"{totals['rows']:>10}{totals['bytes_written']:>12}")
+
+    count = metrics.dump(config.METRICS_DUMP_FILE)
+    print(f"✅ {count} operation records written to {config.METRICS_DUMP_FILE}")
 
 def main():
-    excel = ExcelManager()
+    excel = create_manager()  # ExcelManager or SQLiteManager, see config.py
 
     while True:
         print("\n🔹 Payment Management System")
@@ -12,28 +70,28 @@ def main():
         print("4️⃣ List All Payments")
         print("5️⃣ Analyze Payments")
         print("6️⃣ Generate Payment Chart")
+        print("7️⃣ Add Multiple Payments")
+        print("8️⃣ Update Multiple Payment Statuses")
+        if hasattr(excel, "export_to_excel"):
+            print("9️⃣ Export to Excel")
+        print("🔟 Show Diagnostics")
+        print("1️⃣1️⃣ Normalize Dates")
+        print("1️⃣2️⃣ Import Payments from CSV/Excel")
+        print("1️⃣3️⃣ Consolidated Report (several ledgers)")
+        print("1️⃣4️⃣ Recompute VAT")
         print("0️⃣ Exit")
 
         choice = input("Select an option: ")
 
         if choice == "1":
-            invoice_no = input("Enter Invoice No: ")
-            task_type = input("Enter Task Type: ")
-            tariff_fee = float(input("Enter Tariff Fee (TL): "))
-            gross_fee = float(input("Enter Gross Fee (TL): "))
-            vat_rate = float(input("Enter VAT Rate (%): "))
-            vat_amount = gross_fee * (vat_rate / 100)
-            net_fee = gross_fee - vat_amount
-            case_details = input("Enter Case Details: ")
-            submission_date = input("Enter Submission Date (DD.MM.YYYY): ")
-            invoice_date = input("Enter Invoice Date (DD.MM.YYYY): ")
-            payment_status = "Pending"
-
-            new_payment = Payment(invoice_no, task_type, tariff_fee, gross_fee, vat_rate,
-                                  vat_amount, net_fee, case_details, submission_date, invoice_date, payment_status)
-
-            excel.add_payment(new_payment.to_list())
-            print("✅ Payment added successfully.")
+            try:
+                new_payment = prompt_payment()
+            except ValueError as e:
+                print(f"❌ {e}")
+                continue
+
+            if excel.add_payment(new_payment):
+                print("✅ Payment added successfully.")
 
         elif choice == "2":
             invoice_no = input("Enter Invoice No to update: ")
@@ -53,7 +111,64 @@ def main():
         elif choice == "6":
             excel.generate_payment_chart()
 
+        elif choice == "7":
+            payments = PaymentBatch()
+
+            while True:
+                try:
+                    payments.append(prompt_payment())
+                except ValueError as e:
+                    print(f"❌ {e}")
+                if input("Add another payment? (y/n): ").strip().lower() != "y":
+                    break
+
+            # All payments are written with a single save
+            for invoice_no, result in excel.add_payments(payments):
+                print(f"{invoice_no}: {result}")
+
+        elif choice == "8":
+            invoice_nos = input("Enter Invoice Nos to update (comma separated): ")
+            new_status = input("Enter new status (Paid/Pending): ")
+            updates = {invoice_no.strip(): new_status for invoice_no in invoice_nos.split(",") if invoice_no.strip()}
+
+            for invoice_no, result in excel.update_payment_statuses(updates).items():
+                print(f"{invoice_no}: {result}")
+
+        elif choice == "9" and hasattr(excel, "export_to_excel"):
+            excel.export_to_excel()
+
+        elif choice == "10":
+            show_diagnostics()
+
+        elif choice == "11":
+            excel.migrate_dates()
+
+        elif choice == "12":
+            file_path = input("Enter the path of the CSV or Excel file: ").strip()
+            try:
+                excel.import_payments(file_path, progress=lambda status: print(f"⏳ {status}"))
+            except (OSError, ValueError) as e:
+                print(f"❌ {e}")
+
+        elif choice == "13":
+            paths = input("Enter ledger files or folders (comma separated): ")
+            try:
+                print_report(consolidate_ledgers([path.strip() for path in paths.split(",") if path.strip()]))
+            except (OSError, ValueError) as e:
+                print(f"❌ {e}")
+
+        elif choice == "14":
+            try:
+                rule = prompt_vat_rule()
+                print_result(rule, recompute_payments(excel, rule, dry_run=True), dry_run=True)
+                if input("Apply these changes? (y/n): ").strip().lower() == "y":
+                    print_result(rule, recompute_payments(excel, rule))
+            except (OSError, ValueError) as e:
+                print(f"❌ {e}")
+
         elif choice == "0":
+            if hasattr(excel, "compact"):
+                excel.compact()  # Fold journaled changes into the Excel file
             print("🚀 Exiting the system. See you later!")
             break
 
@@ -61,4 +176,5 @@ def main():
             print("❌ Invalid option! Please select a valid option.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    multiprocessing.freeze_support()  # The consolidated report starts worker processes, also from the built app
+    main()
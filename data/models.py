@@ -1,31 +1,208 @@
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from numbers import Real
+
+# Payment fields in Excel column order (HEADERS)
+FIELDS = (
+    "invoice_no", "task_type", "tariff_fee", "gross_fee", "vat_rate",
+    "vat_amount", "net_fee", "case_details", "submission_date",
+    "invoice_date", "payment_status"
+)
+PAYMENT_STATUSES = ("Paid", "Pending")
+KURUS = Decimal("0.01")
+
+def vat_split(gross_fee, vat_rate):
+    """
+    Returns (VAT Amount, Net Fee) for a gross fee and a VAT rate in percent, computed with decimal
+    arithmetic and rounded half-up to whole kuruş, so 2292 at 20% gives exactly 458.40 and 1833.60.
+    """
+    gross = Decimal(str(gross_fee)).quantize(KURUS, ROUND_HALF_UP)
+    vat_amount = (gross * Decimal(str(vat_rate)) / 100).quantize(KURUS, ROUND_HALF_UP)
+    return float(vat_amount), float(gross - vat_amount)
+
 class Payment:
     """
     A class representing a payment record.
+    Slotted to keep large ledgers small in memory. A Payment also behaves like a read-only row
+    (payment[0], payment[-1], iteration, len), so code written for row tuples keeps working.
     """
-    
+
+    __slots__ = FIELDS
+
     def __init__(self, invoice_no, task_type, tariff_fee, gross_fee, vat_rate,
-                 vat_amount, net_fee, case_details, submission_date, invoice_date, payment_status="Pending"):
+                 vat_amount=None, net_fee=None, case_details="", submission_date=None, invoice_date=None,
+                 payment_status="Pending"):
         """
-        Initializes a Payment object.
+        Initializes a Payment object and validates the entered values.
+        VAT Amount and Net Fee are computed from Gross Fee and VAT Rate when passed as None (see vat_split).
+        Dates may be datetime values or text such as DD.MM.YYYY. Raises ValueError for invalid input.
         """
+        invoice_no = str(invoice_no).strip() if invoice_no is not None else ""
+        if not invoice_no:
+            raise ValueError("Invoice No is required")
+
+        for name, value in (("Tariff Fee", tariff_fee), ("Gross Fee", gross_fee)):
+            if not isinstance(value, Real) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"{name} must be a non-negative number, got {value!r}")
+        if not isinstance(vat_rate, Real) or isinstance(vat_rate, bool) or not 0 <= vat_rate <= 100:
+            raise ValueError(f"VAT Rate must be a number between 0 and 100, got {vat_rate!r}")
+        if payment_status not in PAYMENT_STATUSES:
+            raise ValueError(f"Payment Status must be one of {', '.join(PAYMENT_STATUSES)}, got {payment_status!r}")
+
+        dates = []
+        for name, value in (("Submission Date", submission_date), ("Invoice Date", invoice_date)):
+            parsed = parse_date(value)
+            if parsed is None and value not in (None, ""):
+                raise ValueError(f"Invalid {name}: {value!r} (expected DD.MM.YYYY)")
+            dates.append(parsed)
+
         self.invoice_no = invoice_no
         self.task_type = task_type
         self.tariff_fee = tariff_fee
         self.gross_fee = gross_fee
         self.vat_rate = vat_rate
+        if vat_amount is None:
+            vat_amount, computed_net_fee = vat_split(gross_fee, vat_rate)
+            net_fee = computed_net_fee if net_fee is None else net_fee
         self.vat_amount = vat_amount
-        self.net_fee = net_fee
+        self.net_fee = gross_fee - vat_amount if net_fee is None else net_fee
         self.case_details = case_details
-        self.submission_date = submission_date
-        self.invoice_date = invoice_date
+        self.submission_date, self.invoice_date = dates
         self.payment_status = payment_status
 
+    @classmethod
+    def from_row(cls, row):
+        """
+        Wraps a stored payment row without validation (ledgers may hold older or hand-edited values).
+        """
+        payment = cls.__new__(cls)
+        for name, value in zip(FIELDS, row):
+            setattr(payment, name, value)
+        return payment
+
     def to_list(self):
         """
         Returns the payment details as a list.
         """
-        return [
-            self.invoice_no, self.task_type, self.tariff_fee, self.gross_fee,
-            self.vat_rate, self.vat_amount, self.net_fee, self.case_details,
-            self.submission_date, self.invoice_date, self.payment_status
-        ]
\ No newline at end of file
+        return [getattr(self, name) for name in FIELDS]
+
+    def to_tuple(self):
+        """
+        Returns the payment details as a tuple, ready for ws.append.
+        """
+        return tuple(getattr(self, name) for name in FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in FIELDS)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.to_tuple()[idx]
+        return getattr(self, FIELDS[idx])
+
+    def __eq__(self, other):
+        if isinstance(other, (Payment, tuple, list)):
+            return self.to_tuple() == tuple(other)
+        return NotImplemented
+
+    __hash__ = None  # Mutable, like the row lists it replaces
+
+    def __repr__(self):
+        return f"Payment({self.invoice_no!r}, {self.payment_status!r})"
+
+class PaymentBatch:
+    """
+    A container for many payments stored compactly as row tuples.
+    Iterating yields Payment views created on demand; rows() yields the stored tuples
+    directly, so a batch can be written with ws.append without copying each record.
+    """
+
+    __slots__ = ("_rows",)
+
+    def __init__(self, payments=()):
+        self._rows = [tuple(as_row(payment)) if not isinstance(payment, tuple) else payment for payment in payments]
+
+    def append(self, payment):
+        self._rows.append(tuple(as_row(payment)) if not isinstance(payment, tuple) else payment)
+
+    def extend(self, payments):
+        for payment in payments:
+            self.append(payment)
+
+    def rows(self):
+        """
+        Yields the stored row tuples (no per-record copies).
+        """
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return (Payment.from_row(row) for row in self._rows)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            batch = PaymentBatch()
+            batch._rows = self._rows[idx]
+            return batch
+        return Payment.from_row(self._rows[idx])
+
+    def __bool__(self):
+        return bool(self._rows)
+
+    def __repr__(self):
+        return f"PaymentBatch({len(self._rows)} payments)"
+
+def as_row(payment):
+    """
+    Returns a payment as a row list, accepting Payment objects or row sequences.
+    """
+    return payment.to_list() if isinstance(payment, Payment) else list(payment)
+
+# Column positions of the two dates in a payment row
+DATE_COLUMNS = [8, 9]  # Submission Date, Invoice Date
+DATE_FORMATS = ["%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S"]
+
+def parse_date(value):
+    """
+    Converts a date cell value (datetime, date or text such as DD.MM.YYYY) to a datetime at midnight.
+    Returns None if the value is blank or not a recognisable date.
+    """
+    if isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if not isinstance(value, str) or not value.strip():
+        return None
+
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), date_format)
+        except ValueError:
+            pass
+
+    return None
+
+def normalize_dates(row):
+    """
+    Returns the row with its date columns converted to datetime values.
+    Text that is not a recognisable date is kept as entered.
+    """
+    row = list(row)
+    for idx in DATE_COLUMNS:
+        parsed = parse_date(row[idx])
+        if parsed is not None:
+            row[idx] = parsed
+    return row
+
+def format_date(value):
+    """
+    Formats a date value as DD.MM.YYYY for display; other values are returned unchanged.
+    """
+    if isinstance(value, date):
+        return value.strftime("%d.%m.%Y")
+    return value
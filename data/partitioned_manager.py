@@ -0,0 +1,699 @@
+import os
+import json
+import heapq
+import functools
+from datetime import datetime
+from openpyxl import Workbook, load_workbook
+
+import config
+from instrumentation import instrumented, metrics
+from excel_manager import DATE_FIELDS, ExcelManager, HEADERS
+from importer import PaymentImport
+from locking import LedgerLock, ledger_version
+from charts import CHART_VIEWS, chart_data
+from models import PaymentBatch, as_row, normalize_dates, parse_date
+from payment_table import SUM_COLUMNS, _sort_label
+
+def exclusive_manifest(method):
+    """
+    Decorator for PartitionedExcelManager writes: the method runs holding the manifest lock, on the
+    manifest as last saved by any process, so partitions added or reopened elsewhere are seen and
+    no other process can change the manifest (or add the same Invoice No to another year) meanwhile.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            self._refresh_manifest(force=True)
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+class PartitionedExcelManager:
+    """
+    This class spreads the payments over one Excel file per year (payment_records_2024.xlsx, ...)
+    and offers the same methods as ExcelManager, so callers do not need to know about partitions.
+    A payment belongs to the year of its Invoice Date (its Submission Date, or the current year, if missing).
+
+    Past years without Pending payments are closed: their files are no longer written, and their
+    summary and Invoice Nos are cached next to the manifest, so totals and lookups do not open them.
+    Writes only load the partition that holds the payment, normally the current year.
+    Writes lock the manifest (payment_records.manifest.lock) and then the partition they change.
+    """
+
+    def __init__(self, records_dir=None, journal=None):
+        """
+        Constructor for the PartitionedExcelManager class.
+        Reads the manifest, splits an existing single-file ledger on first use, and closes finished years.
+        """
+        self.records_dir = records_dir or config.RECORDS_DIR
+
+        if not os.path.exists(self.records_dir):
+            os.makedirs(self.records_dir)  # Create the directory if it does not exist
+
+        self.manifest_path = os.path.join(self.records_dir, config.MANIFEST_FILE_NAME)
+        self.journal = journal
+        self._managers = {}  # Partition -> ExcelManager, opened on first use
+        self._keys = {}  # Closed partition -> set of Invoice Nos
+        self.lock = LedgerLock(self.manifest_path)
+        self.manifest = None
+        self._manifest_signature = None  # Manifest version the in-memory copy was read from
+        self._refresh_manifest()
+        print(f"✅ PARTITIONED LEDGER IS SAVED AT: {self.records_dir}")
+
+        legacy_path = os.path.join(self.records_dir, config.EXCEL_FILE_NAME)
+        with self.lock:
+            self._refresh_manifest(force=True)
+            if not self.manifest["partitions"] and os.path.exists(legacy_path):  # Not split by another process
+                self.split_ledger(legacy_path)
+
+        self.close_partitions()
+
+    # Manifest and partition bookkeeping
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"scheme": "year", "partitions": {}}
+
+    def _current_manifest_signature(self):
+        try:
+            stat = os.stat(self.manifest_path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size, stat.st_ino, ledger_version(self.manifest_path)]
+
+    def _refresh_manifest(self, force=False):
+        """
+        Re-reads the manifest if another process saved it since it was read.
+        Skipped while this process holds the lock (no other process can save it then),
+        unless `force`d right after taking the lock.
+        """
+        if self.lock.held and not force:
+            return
+
+        signature = self._current_manifest_signature()
+        if self.manifest is None or signature != self._manifest_signature:
+            self.manifest = self._load_manifest()
+            self._manifest_signature = signature
+            self._keys = {}  # Another process may have closed or reopened partitions
+
+    def _save_manifest(self):
+        """
+        Writes the manifest atomically, under the manifest lock.
+        """
+        with self.lock:
+            tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+            self.lock.bump()
+            self._manifest_signature = self._current_manifest_signature()
+
+    @staticmethod
+    def partition_of(row):
+        """
+        Returns the partition name (the year, as text) a payment row belongs to.
+        """
+        day = parse_date(row[9]) or parse_date(row[8]) or datetime.now()
+        return str(day.year)
+
+    def partitions(self):
+        """
+        Returns the partition names, oldest first, including partitions added by other processes.
+        """
+        self._refresh_manifest()
+        return sorted(self.manifest["partitions"])
+
+    def _file_path(self, name):
+        return os.path.join(self.records_dir, self.manifest["partitions"][name]["file"])
+
+    def _closed(self, name):
+        return self.manifest["partitions"][name].get("closed", False)
+
+    def _signature(self, name):
+        stat = os.stat(self._file_path(name))
+        return [stat.st_mtime_ns, stat.st_size, ledger_version(self._file_path(name))]
+
+    def _keys_path(self, name):
+        return os.path.splitext(self._file_path(name))[0] + ".keys.json"
+
+    def _manager(self, name):
+        """
+        Returns the ExcelManager of a partition, opening it on first use.
+        """
+        if name not in self._managers:
+            self._managers[name] = ExcelManager(self._file_path(name), journal=self.journal)
+        return self._managers[name]
+
+    def _writable(self, name):
+        """
+        Returns the ExcelManager of a partition that is about to be written.
+        New years are added to the manifest; a closed year is reopened (its caches are dropped).
+        """
+        partitions = self.manifest["partitions"]
+
+        if name not in partitions:
+            base, ext = os.path.splitext(config.EXCEL_FILE_NAME)
+            partitions[name] = {"file": f"{base}_{name}{ext}", "closed": False}
+            self._save_manifest()
+        elif self._closed(name):
+            print(f"🔓 Reopening the {name} partition for changes.")
+            partitions[name] = {"file": partitions[name]["file"], "closed": False}
+            self._keys.pop(name, None)
+            if os.path.exists(self._keys_path(name)):
+                os.remove(self._keys_path(name))
+            self._save_manifest()
+
+        return self._manager(name)
+
+    def _summary(self, name):
+        """
+        Returns the summary totals of a partition; closed partitions are answered from the manifest
+        as long as their file has not been changed outside the program.
+        """
+        entry = self.manifest["partitions"][name]
+        if entry.get("closed") and entry.get("signature") == self._signature(name):
+            return entry["summary"]
+        return self._manager(name).load_summary()
+
+    def _invoice_keys(self, name):
+        """
+        Returns the Invoice Nos of a partition: the cached key set for closed partitions,
+        the invoice index of the workbook for open ones.
+        """
+        if not self._closed(name):
+            return self._manager(name).load_index()
+
+        if name not in self._keys:
+            keys = None
+            try:
+                with open(self._keys_path(name), encoding="utf-8") as f:
+                    stored = json.load(f)
+                if stored["signature"] == self._signature(name):
+                    keys = set(stored["keys"])
+            except (OSError, ValueError, KeyError):
+                pass  # Missing or outdated, rebuilt below
+
+            if keys is None:
+                keys = set(self._manager(name).load_index())
+                self._write_keys(name, keys)
+            self._keys[name] = keys
+
+        return self._keys[name]
+
+    def _write_keys(self, name, keys):
+        with open(self._keys_path(name), "w", encoding="utf-8") as f:
+            json.dump({"signature": self._signature(name), "keys": sorted(keys)}, f)
+
+    def _find(self, invoice_no):
+        """
+        Returns the partition holding an Invoice No, or None. Open partitions are checked first.
+        """
+        key = ExcelManager._invoice_key(invoice_no)
+        for name in sorted(self.partitions(), key=self._closed):
+            if key in self._invoice_keys(name):
+                return name
+        return None
+
+    def _overlapping(self, start, end, field):
+        """
+        Returns the partitions that can hold payments dated between start and end.
+        Partitions follow the Invoice Date, so only that field allows skipping whole years.
+        """
+        start_date, end_date = ExcelManager._date_range(start, end)
+        if field != "invoice_date":
+            return self.partitions()
+        return [
+            name for name in self.partitions()
+            if (start_date is None or start_date.year <= int(name)) and (end_date is None or end_date.year >= int(name))
+        ]
+
+    @instrumented
+    @exclusive_manifest
+    def close_partitions(self):
+        """
+        Closes the partitions of past years that have no Pending payments left: their journal is
+        compacted, their summary and Invoice Nos are cached and their workbook is released.
+        """
+        current_year = str(datetime.now().year)
+
+        for name in self.partitions():
+            if name >= current_year or self._closed(name):
+                continue
+
+            summary = self._summary(name)
+            if summary["statuses"].get("Pending", {}).get("count", 0):
+                continue  # Still expecting payments
+
+            manager = self._manager(name)
+            manager.compact()
+            keys = set(manager.load_index())
+            self.manifest["partitions"][name].update(
+                closed=True, signature=self._signature(name),
+                summary={"total": summary["total"], "statuses": summary["statuses"]}
+            )
+            self._write_keys(name, keys)
+            self._keys[name] = keys
+            del self._managers[name]
+            print(f"🔒 The {name} partition is closed (all payments are Paid).")
+
+        self._save_manifest()
+
+    @instrumented
+    @exclusive_manifest
+    def split_ledger(self, file_path):
+        """
+        Splits a single-file ledger into yearly partitions, streaming it in read-only mode and
+        writing each year in write-only mode. The original file is kept as *.pre-partition.xlsx.
+        """
+        print("🔄 Splitting the ledger into yearly partitions...")
+        ledger = ExcelManager(file_path, journal=self.journal)
+        with ledger.lock:  # No other process may write the ledger while it is split
+            ledger.compact()  # Fold any journal into the file first
+
+            books = {}  # Partition -> (workbook, worksheet)
+            source = load_workbook(file_path, read_only=True)
+            try:
+                rows = source.active.iter_rows(values_only=True)
+                header = next(rows, None) or HEADERS
+                for row in rows:
+                    if all(value is None for value in row):
+                        continue
+                    row = normalize_dates(row)
+                    name = self.partition_of(row)
+                    if name not in books:
+                        wb = Workbook(write_only=True)
+                        ws = wb.create_sheet(title="Payment Records")
+                        ExcelManager._install_status_rules(ws)
+                        ws.append(header)
+                        books[name] = (wb, ws)
+                    books[name][1].append(ExcelManager._write_only_row(books[name][1], row))
+                    metrics.add_rows(1)
+            finally:
+                source.close()
+
+            base, ext = os.path.splitext(config.EXCEL_FILE_NAME)
+            for name, (wb, ws) in books.items():
+                wb.save(os.path.join(self.records_dir, f"{base}_{name}{ext}"))
+                self.manifest["partitions"][name] = {"file": f"{base}_{name}{ext}", "closed": False}
+
+            os.replace(file_path, os.path.splitext(file_path)[0] + ".pre-partition.xlsx")
+            for suffix in (".summary.json", ".journal"):
+                sidecar = os.path.splitext(file_path)[0] + suffix
+                if os.path.exists(sidecar):
+                    os.remove(sidecar)
+
+            self._save_manifest()
+            print(f"✅ Ledger split into {len(books)} partition(s): {', '.join(sorted(books))}")
+
+    # Writes
+
+    @instrumented
+    def add_payment(self, payment_data):
+        """
+        Adds a new payment record to its year's partition.
+        Returns False without writing if the Invoice No already exists in any partition.
+        """
+        invoice_no, result = self.add_payments([payment_data])[0]
+
+        if result == "duplicate":
+            print(f"⚠️ Invoice No {invoice_no} already exists. Payment not added.")
+            return False
+
+        print("✅ New payment record added.")
+        return True
+
+    @instrumented
+    @exclusive_manifest
+    def add_payments(self, payments):
+        """
+        Adds many payment records; each affected partition is written once.
+        Returns a list of (invoice_no, result) pairs in input order, where result is "added" or "duplicate".
+        """
+        if isinstance(payments, PaymentBatch):
+            payments = payments.rows()
+
+        results = []
+        batches = {}  # Partition -> [(position in results, row)]
+        seen = set()
+
+        for payment in payments:
+            row = normalize_dates(as_row(payment))
+            key = ExcelManager._invoice_key(row[0])
+            if key in seen or self._find(key) is not None:
+                results.append((row[0], "duplicate"))
+                continue
+            seen.add(key)
+            results.append(None)
+            batches.setdefault(self.partition_of(row), []).append((len(results) - 1, row))
+
+        for name, batch in batches.items():
+            added = self._writable(name).add_payments([row for _, row in batch])
+            for (pos, _), result in zip(batch, added):
+                results[pos] = result
+
+        return results
+
+    @instrumented
+    def update_payment_status(self, invoice_no, new_status):
+        """
+        Updates the payment status (Pending <-> Paid) in the partition holding the invoice.
+        """
+        return self.update_payment_statuses({invoice_no: new_status})[invoice_no] == "updated"
+
+    @instrumented
+    @exclusive_manifest
+    def update_payment_statuses(self, updates):
+        """
+        Updates many payment statuses; each affected partition is written once.
+        Returns {invoice_no: result}, where result is "updated" or "not found".
+        """
+        results = {}
+        batches = {}
+
+        for invoice_no, new_status in updates.items():
+            name = self._find(invoice_no)
+            if name is None:
+                results[invoice_no] = "not found"
+            else:
+                batches.setdefault(name, {})[invoice_no] = new_status
+
+        for name, batch in batches.items():
+            results.update(self._writable(name).update_payment_statuses(batch))
+
+        return {invoice_no: results[invoice_no] for invoice_no in updates}
+
+    @instrumented
+    @exclusive_manifest
+    def import_payments(self, file_path, mapping=None, progress=None, cancel=None):
+        """
+        Imports payments from a CSV or xlsx file into their yearly partitions (see importer.py).
+        Like ExcelManager.import_payments, every partition that receives rows is streamed into a
+        write-only copy when its first row arrives and replaced once at the end, so memory use stays
+        flat and nothing goes through the journal. Returns the import counts, or None if `cancel`
+        (a threading.Event) was set; no partition is changed then.
+        """
+        importer = PaymentImport(file_path, mapping)
+        rewrites = {}  # Partition -> (manager, workbook, sheet, summary)
+
+        try:
+            for chunk in importer.chunks(lambda invoice_no: self._find(invoice_no) is not None, progress, cancel):
+                for row in chunk:
+                    name = self.partition_of(row)
+                    if name not in rewrites:
+                        manager = self._writable(name)
+                        manager.lock.acquire()  # Held until the partition is replaced
+                        try:
+                            rewrites[name] = (manager, *manager._begin_rewrite()[:3])
+                        except BaseException:
+                            manager.lock.release()
+                            raise
+                    manager, _, ws, summary = rewrites[name]
+                    manager._rewrite_row(ws, summary, row)
+                metrics.add_rows(len(chunk))
+
+            if cancel is not None and cancel.is_set():
+                for _, _, ws, _ in rewrites.values():
+                    ws.close()  # Finish the half-written sheets; openpyxl removes their temporary files at exit
+                print("⚠️ Import cancelled, the ledger was not changed.")
+                return None
+
+            for manager, wb, _, summary in rewrites.values():
+                manager._finish_rewrite(wb, summary)
+        finally:
+            for manager, *_ in rewrites.values():
+                manager.lock.release()
+
+        result = importer.result()
+        print(f"✅ Import finished: {importer.status()}.")
+        if result["report"]:
+            print(f"⚠️ Rejected rows written to {result['report']}")
+        return result
+
+    @instrumented
+    def compact(self):
+        """
+        Folds the journal of every open partition into its Excel file.
+        """
+        for manager in self._managers.values():
+            manager.compact()
+
+    # Reads
+
+    @instrumented
+    def search_payment(self, invoice_no):
+        """
+        Searches for a payment by Invoice No in all partitions.
+        Returns the payment row (a tuple) if found, otherwise returns None. See get_payment for a Payment.
+        """
+        name = self._find(invoice_no)
+        return self._manager(name).search_payment(invoice_no) if name is not None else None
+
+    def get_payment(self, invoice_no):
+        """
+        Returns the payment with the given Invoice No as a Payment, or None if there is none.
+        """
+        name = self._find(invoice_no)
+        return self._manager(name).get_payment(invoice_no) if name is not None else None
+
+    @instrumented
+    def search_payments(self, query, limit=20):
+        """
+        Full-text search over Task Type and Case Details, newest partition first.
+        Returns a PaymentBatch of up to `limit` payments.
+        """
+        results = PaymentBatch()
+        for name in reversed(self.partitions()):
+            results.extend(self._manager(name).search_payments(query, limit - len(results)).rows())
+            if len(results) >= limit:
+                break
+        return results
+
+    @instrumented
+    def iter_payments(self, status=None, task_type=None, where=None, limit=None):
+        """
+        Lazily yields payment rows of all partitions, oldest year first (see ExcelManager.iter_payments).
+        """
+        for name in self.partitions():
+            if limit is not None and limit <= 0:
+                return
+            if status is not None and not self._summary(name)["statuses"].get(status, {}).get("count"):
+                continue  # Nothing to yield from this year
+            for row in self._manager(name).iter_payments(status, task_type, where, limit):
+                yield row
+                if limit is not None:
+                    limit -= 1
+
+    @instrumented
+    def get_payments_page(self, offset=0, limit=100, sort_by=None, descending=False, status=None):
+        """
+        Returns (PaymentBatch, total) for one page of payments across all partitions.
+        Unsorted pages only open the partitions the page falls into (counts come from the summaries);
+        sorted pages merge the sorted views of every partition.
+        """
+        counts = []
+        for name in self.partitions():
+            summary = self._summary(name)
+            counts.append(summary["total"] if status is None else summary["statuses"].get(status, {}).get("count", 0))
+        total = sum(counts)
+
+        if sort_by is None:
+            page = PaymentBatch()
+            for name, count in zip(self.partitions(), counts):
+                if offset >= count:
+                    offset -= count
+                    continue
+                rows, _ = self._manager(name).get_payments_page(offset, limit - len(page), None, False, status)
+                page.extend(rows.rows())
+                offset = 0
+                if len(page) >= limit:
+                    break
+            return page, total
+
+        views = [
+            self._manager(name).get_payments_page(0, count, sort_by, descending, status)[0].rows()
+            for name, count in zip(self.partitions(), counts) if count
+        ]
+        merged = heapq.merge(*views, key=lambda row: ExcelManager._sort_key(row[sort_by]), reverse=descending)
+        page = PaymentBatch(row for pos, row in zip(range(offset + limit), merged) if pos >= offset)
+        return page, total
+
+    @instrumented
+    def list_payments(self):
+        """
+        Displays all recorded payments in the console.
+        """
+        print("\n📌 Recorded Payments:")
+        print(tuple(HEADERS))
+        for row in self.iter_payments():
+            print(row)
+
+    @instrumented
+    def get_all_payments(self):
+        """
+        Retrieves all payment records from every partition.
+        Returns a PaymentBatch containing payment data.
+        """
+        return PaymentBatch(self.iter_payments())
+
+    @instrumented
+    def get_payment_counts(self):
+        """
+        Counts the number of Paid and Pending payments over all partitions.
+        Returns (total_paid, total_pending).
+        """
+        total_paid = total_pending = 0
+        for name in self.partitions():
+            statuses = self._summary(name)["statuses"]
+            total_paid += statuses.get("Paid", {}).get("count", 0)
+            total_pending += statuses.get("Pending", {}).get("count", 0)
+        return total_paid, total_pending
+
+    @instrumented
+    def analyze_payments(self, start=None, end=None, field="invoice_date"):
+        """
+        Analyzes payments over all partitions (see ExcelManager.analyze_payments).
+        Without a period the cached partition summaries are added up; with a period only
+        the years it overlaps are read.
+        """
+        if start is None and end is None:
+            totals = [0] * 7
+            for name in self.partitions():
+                summary = self._summary(name)
+                paid = summary["statuses"].get("Paid", {"count": 0, "net": 0, "gross": 0})
+                pending = summary["statuses"].get("Pending", {"count": 0, "net": 0, "gross": 0})
+                for idx, value in enumerate((summary["total"], paid["count"], paid["net"], paid["gross"],
+                                             pending["count"], pending["net"], pending["gross"])):
+                    totals[idx] += value
+            return tuple(totals)
+
+        totals = [0] * 7
+        for name in self._overlapping(start, end, field):
+            for idx, value in enumerate(self._manager(name).analyze_payments(start, end, field)):
+                totals[idx] += value
+        return tuple(totals)
+
+    @instrumented
+    def payments_between(self, start=None, end=None, field="invoice_date", status=None):
+        """
+        Returns the payments whose date field falls between start and end (inclusive), in date order.
+        """
+        results = [
+            self._manager(name).payments_between(start, end, field, status).rows()
+            for name in self._overlapping(start, end, field)
+        ]
+        return PaymentBatch(heapq.merge(*results, key=lambda row: parse_date(row[DATE_FIELDS[field]])))
+
+    @instrumented
+    def group_payments(self, by, status=None, start=None, end=None, field="invoice_date"):
+        """
+        Grouped totals over all partitions (see ExcelManager.group_payments); the per-year
+        results are added up, so only the years a date range overlaps are read.
+        """
+        width = 1 if isinstance(by, str) else len(by)
+        merged = {}
+
+        for name in self._overlapping(start, end, field):
+            for group in self._manager(name).group_payments(by, status, start, end, field):
+                totals = merged.setdefault(group[:width], [0] * (1 + len(SUM_COLUMNS)))
+                for idx, value in enumerate(group[width:]):
+                    totals[idx] += value
+
+        return [(*keys, *totals) for keys, totals in sorted(merged.items(), key=lambda item: tuple(_sort_label(label) for label in item[0]))]
+
+    @instrumented
+    def rollup(self, period="month", field="invoice_date", start=None, end=None):
+        """
+        Groups payments by month or quarter of a date field and by status, over all partitions.
+        Returns a list of (period, status, count, net total, gross total) sorted by period and status.
+        """
+        if period not in ("month", "quarter"):
+            raise ValueError(f"Unknown period: {period!r} (expected 'month' or 'quarter')")
+
+        groups = self.group_payments([period, "status"], start=start, end=end, field=field)
+        return [(bucket, status, count, net, gross) for bucket, status, count, _, gross, _, net in groups]
+
+    # Spreadsheet maintenance, applied to open partitions only (closed years are left untouched)
+
+    def _open_managers(self):
+        """
+        Returns the ExcelManagers of the partitions that are not closed.
+        """
+        return [self._manager(name) for name in self.partitions() if not self._closed(name)]
+
+    @instrumented
+    def migrate_dates(self):
+        """
+        Converts text dates to real dates in the open partitions.
+        """
+        for manager in self._open_managers():
+            manager.migrate_dates()
+
+    @instrumented
+    @exclusive_manifest
+    def recompute_vat(self, rule, dry_run=False):
+        """
+        Recalculates VAT Amount and Net Fee in the partitions the rule's dates can fall in
+        (see ExcelManager.recompute_vat). Closed partitions are only reopened if they change.
+        """
+        result = {"matched": 0, "skipped": 0, "changes": []}
+
+        for name in self._overlapping(rule.start, rule.end, rule.field):
+            partition = self._manager(name).recompute_vat(rule, dry_run=True)
+            if partition["changes"] and not dry_run:
+                partition = self._writable(name).recompute_vat(rule)
+            for key in result:
+                result[key] += partition[key]
+
+        return result
+
+    @instrumented
+    def adjust_excel_formatting(self, full=False):
+        """
+        Formats the open partitions (closed ones were formatted while they were open).
+        """
+        for manager in self._open_managers():
+            manager.adjust_excel_formatting(full)
+
+    @instrumented
+    def highlight_payments(self, conditional=True):
+        """
+        Highlights the Payment Status cells of the open partitions.
+        """
+        for manager in self._open_managers():
+            manager.highlight_payments(conditional)
+
+    @instrumented
+    @exclusive_manifest
+    def generate_payment_chart(self, views=None):
+        """
+        Writes the payment charts for all years to the current year's partition.
+        """
+        charts = {view: chart_data(self, view) for view in views or CHART_VIEWS}
+        self._writable(str(datetime.now().year)).generate_payment_chart(charts=charts)
+
+    def invalidate_cache(self):
+        """
+        Drops the cached workbooks of every partition and the cached Invoice No sets.
+        """
+        for manager in self._managers.values():
+            manager.invalidate_cache()
+        self._keys = {}
+
+    def cache_stats(self):
+        """
+        Returns the cache hit/miss counters added up over the open partitions.
+        """
+        stats = {"hits": 0, "misses": 0}
+        for manager in self._managers.values():
+            for counter, value in manager.cache_stats().items():
+                stats[counter] += value
+        return stats
+
+    def data_version(self):
+        """
+        Returns a value that changes whenever a partition is written, by this or another process.
+        """
+        return [self._signature(name) for name in self.partitions()]
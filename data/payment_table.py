@@ -0,0 +1,239 @@
+from datetime import datetime
+
+import numpy as np
+
+from models import parse_date
+
+# Amount columns kept as float arrays: name -> row column
+AMOUNT_COLUMNS = {"tariff_fee": 2, "gross_fee": 3, "vat_rate": 4, "vat_amount": 5, "net_fee": 6}
+# Categorical columns kept as integer codes: name -> row column
+CATEGORY_COLUMNS = {"task_type": 1, "payment_status": 10}
+DATE_COLUMNS = {"submission_date": 8, "invoice_date": 9}
+# Sums returned by group_by, after the group keys and the count
+SUM_COLUMNS = ["tariff_fee", "gross_fee", "vat_amount", "net_fee"]
+GROUP_KEYS = ["status", "task_type", "vat_rate", "month", "quarter", "year"]
+EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+NAT = np.iinfo(np.int64).min  # Integer representation of NaT in datetime64 arrays
+
+def _amount(value):
+    """
+    Returns a numeric cell value, treating blanks and text as 0 (like the running summary).
+    """
+    return value if isinstance(value, (int, float)) else 0
+
+def _day(value):
+    """
+    Returns a date cell value as days since 1970-01-01 (NAT for blanks and unparseable text).
+    Building datetime64 arrays from integers is much faster than from datetime objects.
+    """
+    if not isinstance(value, datetime):
+        value = parse_date(value)
+    return value.toordinal() - EPOCH_ORDINAL if value is not None else NAT
+
+def _sort_label(label):
+    """
+    Sort key that orders numbers numerically and everything else (including blanks) as text.
+    """
+    if isinstance(label, (int, float)):
+        return (0, label, "")
+    return (1, 0, str(label))
+
+class PaymentTable:
+    """
+    This class holds the ledger column by column for vectorised analytics:
+    float arrays for the fee, VAT and amount columns, datetime64 arrays for the dates and
+    integer codes (plus a list of labels) for Task Type and Payment Status.
+    Position i in every array is record i of the ledger, so status updates can be applied in place.
+    Appended rows are buffered and merged into the arrays on the next query.
+    """
+
+    def __init__(self, rows=()):
+        """
+        Builds the arrays with one pass per column over the payment rows.
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        self.categories = {name: [] for name in CATEGORY_COLUMNS}  # Column -> labels by code
+        self._codes = {name: {} for name in CATEGORY_COLUMNS}  # Column -> {label: code}
+        self._pending = []  # Rows appended since the arrays were last built
+        self._derived = {}  # (group key, date field) -> (codes, labels), valid until rows are added
+        self.columns = self._build(rows)
+
+    def __len__(self):
+        return len(self.columns["net_fee"]) + len(self._pending)
+
+    def _code(self, name, label):
+        codes = self._codes[name]
+        if label not in codes:
+            codes[label] = len(codes)
+            self.categories[name].append(label)
+        return codes[label]
+
+    def _build(self, rows):
+        """
+        Returns {column name: array} for a list of payment rows.
+        """
+        columns = {}
+        for name, col_idx in AMOUNT_COLUMNS.items():
+            columns[name] = np.fromiter((_amount(row[col_idx]) for row in rows), dtype=np.float64, count=len(rows))
+        for name, col_idx in DATE_COLUMNS.items():
+            days = np.fromiter((_day(row[col_idx]) for row in rows), dtype=np.int64, count=len(rows))
+            columns[name] = days.view("datetime64[D]")
+        for name, col_idx in CATEGORY_COLUMNS.items():
+            columns[name] = np.fromiter((self._code(name, row[col_idx]) for row in rows), dtype=np.int32, count=len(rows))
+        return columns
+
+    def append(self, row):
+        """
+        Adds a new payment row at the end of the table.
+        """
+        self._pending.append(row)
+
+    def set_status(self, pos, status):
+        """
+        Changes the Payment Status of the record at position pos.
+        """
+        self._flush()
+        self.columns["payment_status"][pos] = self._code("payment_status", status)
+
+    def set_amounts(self, changes):
+        """
+        Replaces the fee, VAT and amount columns of changed records, given as [(position, new row)].
+        """
+        self._flush()
+        positions = [pos for pos, _ in changes]
+        for name, col_idx in AMOUNT_COLUMNS.items():
+            self.columns[name][positions] = [_amount(row[col_idx]) for _, row in changes]
+
+    def _flush(self):
+        """
+        Merges buffered rows into the arrays with one concatenation per column.
+        """
+        if not self._pending:
+            return
+        added = self._build(self._pending)
+        self.columns = {name: np.concatenate([self.columns[name], added[name]]) for name in self.columns}
+        self._pending = []
+        self._derived = {}
+
+    def mask(self, status=None, start=None, end=None, field="invoice_date", task_type=None):
+        """
+        Returns a boolean array selecting the records with the given status, date range and task type,
+        or None when there is nothing to filter.
+        start and end are inclusive and must already be parsed (datetime or None).
+        """
+        self._flush()
+        if status is None and start is None and end is None and task_type is None:
+            return None
+
+        selected = np.ones(len(self.columns["net_fee"]), dtype=bool)
+
+        if status is not None:
+            code = self._codes["payment_status"].get(status)
+            if code is None:
+                return np.zeros_like(selected)
+            selected &= self.columns["payment_status"] == code
+        if task_type is not None:
+            code = self._codes["task_type"].get(task_type)
+            if code is None:
+                return np.zeros_like(selected)
+            selected &= self.columns["task_type"] == code
+        if start is not None or end is not None:
+            dates = self.columns[field]
+            selected &= ~np.isnat(dates)
+            if start is not None:
+                selected &= dates >= np.datetime64(start.date(), "D")
+            if end is not None:
+                selected &= dates <= np.datetime64(end.date(), "D")
+
+        return selected
+
+    def _key_codes(self, key, field):
+        """
+        Returns (codes, labels) for a group key over all records; records whose key is unknown
+        (no date) get code -1. Derived keys are cached until new rows are merged in.
+        """
+        if key == "status":
+            return self.columns["payment_status"], self.categories["payment_status"]
+        if key == "task_type":
+            return self.columns["task_type"], self.categories["task_type"]
+
+        cache_key = (key, field)
+        if cache_key in self._derived:
+            return self._derived[cache_key]
+
+        if key == "vat_rate":
+            labels, codes = np.unique(self.columns["vat_rate"], return_inverse=True)
+            self._derived[cache_key] = codes, labels.tolist()
+            return self._derived[cache_key]
+
+        dates = self.columns[field]
+        missing = np.isnat(dates)
+        if key == "year":
+            values = dates.astype("datetime64[Y]").view(np.int64) + 1970
+        else:
+            values = dates.astype("datetime64[M]").view(np.int64)  # Months since 1970-01
+            if key == "quarter":
+                values = values // 3
+
+        if missing.all():
+            self._derived[cache_key] = np.full(len(dates), -1), []
+            return self._derived[cache_key]
+
+        first = values[~missing].min()
+        codes = np.where(missing, -1, values - first)
+        count = int(codes.max()) + 1
+        if key == "year":
+            labels = [str(first + i) for i in range(count)]
+        elif key == "month":
+            labels = [f"{(first + i) // 12 + 1970}-{(first + i) % 12 + 1:02d}" for i in range(count)]
+        else:
+            labels = [f"{(first + i) // 4 + 1970}-Q{(first + i) % 4 + 1}" for i in range(count)]
+
+        self._derived[cache_key] = codes, labels
+        return codes, labels
+
+    def group_by(self, keys, status=None, start=None, end=None, field="invoice_date"):
+        """
+        Groups the records by one or more keys ("status", "task_type", "vat_rate", "month", "quarter", "year")
+        and returns a list of (*key labels, count, tariff fee, gross fee, VAT amount, net fee) sorted by the keys.
+        Month, quarter and year use the date `field`; records without a date are left out of those groupings.
+        """
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        for key in keys:
+            if key not in GROUP_KEYS:
+                raise ValueError(f"Unknown group key: {key!r} (expected one of {', '.join(GROUP_KEYS)})")
+
+        selected = self.mask(status, start, end, field)
+
+        # Combine the per-key codes into one group number, mixed-radix style
+        group = None
+        labels = []
+        for key in keys:
+            codes, key_labels = self._key_codes(key, field)
+            radix = max(len(key_labels), 1)
+            if key in ("month", "quarter", "year"):
+                # Records without a date are left out
+                dated = codes >= 0
+                selected = dated if selected is None else selected & dated
+            group = codes.astype(np.int64) if group is None else group * radix + codes
+            labels.append(key_labels)
+
+        if selected is not None:
+            group = group[selected]
+        size = int(np.prod([max(len(key_labels), 1) for key_labels in labels]))
+        counts = np.bincount(group, minlength=size)
+        sums = [
+            np.bincount(group, weights=self.columns[name] if selected is None else self.columns[name][selected], minlength=size)
+            for name in SUM_COLUMNS
+        ]
+
+        results = []
+        for number in np.flatnonzero(counts):
+            key_labels = []
+            rest = int(number)
+            for labels_of_key in reversed(labels):
+                rest, code = divmod(rest, max(len(labels_of_key), 1))
+                key_labels.append(labels_of_key[code])
+            results.append((*reversed(key_labels), int(counts[number]), *(float(column[number]) for column in sums)))
+
+        return sorted(results, key=lambda result: tuple(_sort_label(label) for label in result[:len(keys)]))
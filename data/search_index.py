@@ -0,0 +1,140 @@
+import re
+import heapq
+import bisect
+import unicodedata
+
+# Fields covered by the full-text search, with their ranking weight
+SEARCH_FIELDS = {"task_type": (1, 1), "case_details": (7, 2)}  # field: (row column, weight)
+
+# Turkish letters are folded to their plain Latin forms so "sahin" finds "Şahin" and "istanbul" finds "İSTANBUL"
+TURKISH_FOLD = str.maketrans({"İ": "i", "I": "ı", "ı": "i", "ç": "c", "ğ": "g", "ö": "o", "ş": "s", "ü": "u"})
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def fold(text):
+    """
+    Lower-cases text with Turkish rules (İ -> i, I -> ı) and strips accents,
+    so typed queries match regardless of case and keyboard layout.
+    """
+    text = str(text).translate(TURKISH_FOLD).lower().translate(TURKISH_FOLD)
+    return "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+
+def tokenize(text):
+    """
+    Returns the folded word tokens of a cell value (empty for blank cells).
+    """
+    if text is None:
+        return []
+    return TOKEN_PATTERN.findall(fold(text))
+
+class SearchIndex:
+    """
+    This class keeps an inverted index (token -> documents) over the Task Type and Case Details
+    of every payment. Documents are identified by the caller (record position or row id).
+    The sorted vocabulary allows prefix matching, so query words can be typed incompletely.
+    """
+
+    def __init__(self):
+        self.postings = {}  # Token -> {document: summed field weight}
+        self.terms = []  # Sorted vocabulary for prefix lookups
+        self.documents = {}  # Document -> {token: weight}, used to update a document in place
+
+    def __len__(self):
+        return len(self.documents)
+
+    @staticmethod
+    def _tokens(row):
+        """
+        Returns {token: weight} for the searchable fields of a payment row.
+        """
+        tokens = {}
+        for col_idx, weight in SEARCH_FIELDS.values():
+            for token in tokenize(row[col_idx]):
+                tokens[token] = tokens.get(token, 0) + weight
+        return tokens
+
+    def add(self, doc, row):
+        """
+        Indexes one payment row under the given document id.
+        """
+        self.update(doc, row)
+
+    def update(self, doc, row):
+        """
+        Re-indexes a document after its row changed. Rows whose searchable text is unchanged
+        (e.g. a status update) cost one tokenisation and no index writes.
+        """
+        tokens = self._tokens(row)
+        old_tokens = self.documents.get(doc, {})
+
+        if tokens == old_tokens and doc in self.documents:
+            return
+
+        for token in old_tokens:
+            if token not in tokens:
+                self._unlink(token, doc)
+
+        for token, weight in tokens.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                bisect.insort(self.terms, token)
+            posting[doc] = weight
+
+        self.documents[doc] = tokens
+
+    def remove(self, doc):
+        """
+        Drops a document from the index.
+        """
+        for token in self.documents.pop(doc, {}):
+            self._unlink(token, doc)
+
+    def _unlink(self, token, doc):
+        posting = self.postings[token]
+        posting.pop(doc, None)
+        if not posting:
+            del self.postings[token]
+            del self.terms[bisect.bisect_left(self.terms, token)]
+
+    def _expand(self, prefix):
+        """
+        Returns the vocabulary tokens starting with prefix.
+        """
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "￿", start)
+        return self.terms[start:end]
+
+    def search(self, query, limit=20):
+        """
+        Returns up to `limit` document ids matching every word of the query, best first.
+        Every query word also matches longer words it is a prefix of; whole-word matches
+        and matches in Case Details rank higher, ties go to the most recently added payment.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+
+        scores = None
+        # Most selective words first, so the candidate set shrinks quickly
+        for word in sorted(set(words), key=lambda word: len(self.postings.get(word, ())) or len(self.terms)):
+            matches = {}
+            for term in self._expand(word):
+                bonus = 2 if term == word else 1
+                posting = self.postings[term]
+                if scores is not None and len(scores) < len(posting):
+                    posting = {doc: posting[doc] for doc in scores if doc in posting}
+                for doc, weight in posting.items():
+                    if weight * bonus > matches.get(doc, 0):
+                        matches[doc] = weight * bonus
+
+            if scores is None:
+                scores = matches
+            else:
+                scores = {doc: score + matches[doc] for doc, score in scores.items() if doc in matches}
+
+            if not scores:
+                return []
+
+        # Partial selection instead of a full sort keeps broad one-letter queries fast
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [doc for doc, _ in ranked]
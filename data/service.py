@@ -0,0 +1,578 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+import ipaddress
+from http import HTTPStatus
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import config
+from instrumentation import metrics
+from storage import create_manager
+from excel_manager import ExcelManager
+from models import FIELDS, PAYMENT_STATUSES, Payment, as_row, format_date, normalize_dates
+from search_index import SearchIndex
+from payment_table import DATE_COLUMNS, SUM_COLUMNS, PaymentTable
+
+MAX_BODY = 10 * 1024 * 1024  # Largest request body accepted (about 20,000 payments in one bulk add)
+REQUIRED_FIELDS = ("invoice_no", "task_type", "tariff_fee", "gross_fee", "vat_rate")
+
+def invoice_key(invoice_no):
+    return ExcelManager._invoice_key(invoice_no)
+
+def payment_from_json(data):
+    """
+    Builds a validated Payment from a JSON object with the field names of models.FIELDS.
+    VAT Amount and Net Fee may be left out; they are computed from Gross Fee and VAT Rate.
+    Raises ValueError for missing, unknown or invalid fields.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("A payment must be a JSON object")
+
+    unknown = sorted(set(data) - set(FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown payment field(s): {', '.join(unknown)}")
+    missing = [name for name in REQUIRED_FIELDS if name not in data]
+    if missing:
+        raise ValueError(f"Missing payment field(s): {', '.join(missing)}")
+
+    return Payment(**data)
+
+def row_to_json(row):
+    """
+    Returns a payment row as a JSON object, with dates as DD.MM.YYYY text.
+    """
+    return {name: format_date(value) for name, value in zip(FIELDS, row)}
+
+def check_loopback(host):
+    """
+    Raises ValueError unless `host` is a loopback address: the service has no authentication,
+    so it must not be reachable from other computers.
+    """
+    try:
+        loopback = ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = host == "localhost"
+    if not loopback:
+        raise ValueError(f"The payment service only listens on localhost, not on {host!r}")
+
+class Snapshot:
+    """
+    This class is the in-memory copy of the ledger the service answers reads from:
+    the payment rows, an Invoice No index, the full-text index and the columnar table.
+    It is only changed by the writer task between two awaits, so readers on the event loop
+    always see a consistent state and never wait for a save.
+    """
+
+    def __init__(self, rows=(), version=None):
+        self.rows = [tuple(row) for row in rows]
+        self.version = version  # storage.data_version() the snapshot matches
+        self.index = {}
+        self.search_index = SearchIndex()
+        for pos, row in enumerate(self.rows):
+            self.index.setdefault(invoice_key(row[0]), pos)
+            self.search_index.add(pos, row)
+        self.table = PaymentTable(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, invoice_no):
+        pos = self.index.get(invoice_key(invoice_no))
+        return self.rows[pos] if pos is not None else None
+
+    def add(self, row):
+        """
+        Adds a payment row written by the service (ignored if its Invoice No is already present).
+        """
+        key = invoice_key(row[0])
+        if key in self.index:
+            return
+        row = tuple(row)
+        self.rows.append(row)
+        self.index[key] = len(self.rows) - 1
+        self.search_index.add(len(self.rows) - 1, row)
+        self.table.append(row)
+
+    def set_status(self, invoice_no, status):
+        pos = self.index.get(invoice_key(invoice_no))
+        if pos is None:
+            return
+        self.rows[pos] = self.rows[pos][:-1] + (status,)
+        self.search_index.update(pos, self.rows[pos])
+        self.table.set_status(pos, status)
+
+class ServiceMetrics:
+    """
+    This class collects the latency and throughput of the service: per route the request and
+    error counts and the latencies of the last `window` requests, plus the writer's batch sizes.
+    Storage-level timings are kept separately by instrumentation.metrics.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.started = time.perf_counter()
+        self.routes = {}  # Route -> {"requests", "errors", "latencies"}
+        self.completed = deque()  # Completion times of the requests of the last minute
+        self.writer = {"batches": 0, "requests": 0, "rows": 0, "max_batch": 0, "seconds": 0.0}
+        self.refreshes = 0  # Snapshots reloaded after another program changed the ledger
+
+    def record(self, route, seconds, status):
+        totals = self.routes.setdefault(route, {"requests": 0, "errors": 0, "latencies": deque(maxlen=self.window)})
+        totals["requests"] += 1
+        totals["errors"] += status >= 400
+        totals["latencies"].append(seconds)
+
+        now = time.perf_counter()
+        self.completed.append(now)
+        while self.completed and self.completed[0] < now - 60:
+            self.completed.popleft()
+
+    def record_batch(self, requests, rows, seconds):
+        self.writer["batches"] += 1
+        self.writer["requests"] += requests
+        self.writer["rows"] += rows
+        self.writer["max_batch"] = max(self.writer["max_batch"], requests)
+        self.writer["seconds"] += seconds
+
+    @staticmethod
+    def _percentile(ordered, fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        """
+        Returns the metrics as JSON-ready values, latencies in milliseconds.
+        """
+        uptime = time.perf_counter() - self.started
+        routes = {}
+        for route, totals in sorted(self.routes.items()):
+            ordered = sorted(totals["latencies"])
+            routes[route] = {
+                "requests": totals["requests"], "errors": totals["errors"],
+                "avg_ms": sum(ordered) / len(ordered) * 1000,
+                "p50_ms": self._percentile(ordered, 0.5) * 1000,
+                "p95_ms": self._percentile(ordered, 0.95) * 1000,
+                "p99_ms": self._percentile(ordered, 0.99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+
+        requests = sum(totals["requests"] for totals in self.routes.values())
+        batches = self.writer["batches"]
+        return {
+            "uptime_seconds": uptime,
+            "requests": requests,
+            "requests_per_second": requests / uptime if uptime else 0.0,
+            "requests_per_second_last_minute": len(self.completed) / min(max(uptime, 1e-9), 60),
+            "routes": routes,
+            "writer": dict(self.writer, avg_batch=self.writer["requests"] / batches if batches else 0.0,
+                           avg_save_ms=self.writer["seconds"] / batches * 1000 if batches else 0.0),
+            "snapshot_refreshes": self.refreshes,
+        }
+
+class PaymentService:
+    """
+    This class serves a payment storage (any backend of storage.create_manager) over a local
+    HTTP/JSON API, for scripts that record invoices without the GUI or the console menu.
+    The storage is only used from one thread: a single writer task sends it the queued write
+    requests in batches, so concurrent adds and status changes cost one save per batch.
+    Reads are answered from an in-memory Snapshot on the event loop and never wait for the writer.
+    """
+
+    ROUTES = [
+        ("GET", "/health", "health"),
+        ("GET", "/metrics", "show_metrics"),
+        ("GET", "/payments", "list_payments"),
+        ("POST", "/payments", "add_payment"),
+        ("POST", "/payments/bulk", "add_payments"),
+        ("GET", "/payments/{invoice_no}", "get_payment"),
+        ("POST", "/payments/{invoice_no}/status", "update_status"),
+        ("GET", "/search", "search"),
+        ("GET", "/analytics", "analytics"),
+    ]
+
+    def __init__(self, storage=None, backend=None):
+        """
+        `storage` defaults to create_manager(backend), opened on the storage thread when the service starts.
+        """
+        self.storage = storage
+        self.backend = backend
+        self.executor = ThreadPoolExecutor(max_workers=1)  # The storage thread
+        self.snapshot = Snapshot()
+        self.metrics = ServiceMetrics()
+        self._queue = None
+        self._server = None
+        self._writer_task = None
+        self._stopping = False
+
+    # Storage thread
+
+    def _open(self):
+        if self.storage is None:
+            self.storage = create_manager(self.backend)
+        return self._load_snapshot()
+
+    def _load_snapshot(self):
+        version = self.storage.data_version()  # Read first: a write during the scan is noticed next time
+        return Snapshot(self.storage.iter_payments(), version)
+
+    def _apply(self, rows, updates, version):
+        """
+        Writes one batch: every queued add with one add_payments call, then every queued status
+        change with one update_payment_statuses call. Returns (add results, status results,
+        new data version, reloaded Snapshot or None). The snapshot is reloaded instead of updated
+        when another program changed the ledger since `version`.
+        """
+        changed = self.storage.data_version() != version
+        added = self.storage.add_payments(rows) if rows else []
+        updated = self.storage.update_payment_statuses(updates) if updates else {}
+        snapshot = self._load_snapshot() if changed else None
+        return added, updated, self.storage.data_version(), snapshot
+
+    def _close(self):
+        if hasattr(self.storage, "compact"):
+            self.storage.compact()  # Fold journaled changes into the Excel file, like the GUI on exit
+        if hasattr(self.storage, "close"):
+            self.storage.close()
+
+    def _call(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    # Writer task
+
+    async def _writer(self):
+        get = None
+        while True:
+            get = get or asyncio.ensure_future(self._queue.get())
+            done, _ = await asyncio.wait({get}, timeout=config.SERVICE_REFRESH_SECONDS)
+            if not done:
+                await self._refresh()  # Idle: pick up changes made by the GUI or another service
+                continue
+
+            batch = [get.result()]
+            get = None
+            # Everything queued while the previous batch was saved goes into this one
+            while len(batch) < config.SERVICE_MAX_BATCH and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            batch = [item for item in batch if item is not None]  # None only wakes the writer up for stop()
+            if batch:
+                await self._write(batch)
+            if self._stopping and self._queue.empty():
+                return
+
+    async def _write(self, batch):
+        rows = [row for kind, payload, _ in batch if kind == "add" for row in payload]
+        updates = {payload[0]: payload[1] for kind, payload, _ in batch if kind == "status"}
+
+        start = time.perf_counter()
+        try:
+            added, updated, version, snapshot = await self._call(self._apply, rows, updates, self.snapshot.version)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            self.snapshot.version = None  # Part of the batch may be written; reload on the next refresh
+            return
+        self.metrics.record_batch(len(batch), len(rows), time.perf_counter() - start)
+
+        if snapshot is not None:
+            self.snapshot = snapshot
+            self.metrics.refreshes += 1
+        else:
+            for row, (_, result) in zip(rows, added):
+                if result == "added":
+                    self.snapshot.add(row)
+            for invoice_no, result in updated.items():
+                if result == "updated":
+                    self.snapshot.set_status(invoice_no, updates[invoice_no])
+            self.snapshot.version = version
+
+        results = iter(added)
+        for kind, payload, future in batch:
+            if future.done():
+                continue  # The client went away
+            if kind == "add":
+                future.set_result([next(results) for _ in payload])
+            else:
+                future.set_result(updated[payload[0]])
+
+    async def _refresh(self):
+        if await self._call(self.storage.data_version) != self.snapshot.version:
+            self.snapshot = await self._call(self._load_snapshot)
+            self.metrics.refreshes += 1
+
+    async def _submit(self, kind, payload):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((kind, payload, future))
+        return await future
+
+    # Handlers: each returns (HTTP status, JSON payload)
+
+    async def health(self, query, body):
+        return 200, {"status": "ok", "payments": len(self.snapshot), "queued_writes": self._queue.qsize()}
+
+    async def show_metrics(self, query, body):
+        return 200, {"service": self.metrics.summary(), "storage": metrics.summary()}
+
+    async def get_payment(self, query, body, invoice_no):
+        row = self.snapshot.get(invoice_no)
+        if row is None:
+            return 404, {"error": f"Invoice No {invoice_no} not found"}
+        return 200, row_to_json(row)
+
+    async def list_payments(self, query, body):
+        status = query.get("status")
+        task_type = query.get("task_type")
+        offset = self._int_param(query, "offset", 0)
+        limit = min(self._int_param(query, "limit", 100), 1000)
+
+        rows = self.snapshot.rows
+        if status is not None or task_type is not None:
+            rows = [row for row in rows
+                    if (status is None or row[-1] == status) and (task_type is None or row[1] == task_type)]
+
+        return 200, {"total": len(rows), "offset": offset, "payments": [row_to_json(row) for row in rows[offset:offset + limit]]}
+
+    async def search(self, query, body):
+        text = query.get("q", "")
+        limit = min(self._int_param(query, "limit", 20), 1000)
+        positions = self.snapshot.search_index.search(text, limit)
+        return 200, {"payments": [row_to_json(self.snapshot.rows[pos]) for pos in positions]}
+
+    async def analytics(self, query, body):
+        """
+        Grouped totals, e.g. /analytics?by=month,status&start=01.01.2024&end=31.12.2024.
+        """
+        keys = [key for key in query.get("by", "status").split(",") if key]
+        field = query.get("field", "invoice_date")
+        if field not in DATE_COLUMNS:
+            raise ValueError(f"Unknown date field: {field!r} (expected one of {', '.join(DATE_COLUMNS)})")
+        start, end = ExcelManager._date_range(query.get("start"), query.get("end"))
+
+        groups = []
+        totals = {"count": 0, **{name: 0.0 for name in SUM_COLUMNS}}
+        for group in self.snapshot.table.group_by(keys, query.get("status"), start, end, field):
+            labels, (count, *sums) = group[:len(keys)], group[len(keys):]
+            entry = {key: label for key, label in zip(keys, labels)}
+            entry["count"] = int(count)
+            for name, value in zip(SUM_COLUMNS, sums):
+                entry[name] = float(value)
+                totals[name] += float(value)
+            totals["count"] += int(count)
+            groups.append(entry)
+
+        return 200, {"by": keys, "groups": groups, "total": totals}
+
+    async def add_payment(self, query, body):
+        row = normalize_dates(as_row(payment_from_json(self._json(body))))
+        [(invoice_no, result)] = await self._submit("add", [row])
+        if result == "duplicate":
+            return 409, {"invoice_no": invoice_no, "result": result, "error": f"Invoice No {invoice_no} already exists"}
+        return 201, {"invoice_no": invoice_no, "result": result}
+
+    async def add_payments(self, query, body):
+        """
+        Adds a JSON list of payments. Nothing is written if any payment is invalid.
+        """
+        data = self._json(body)
+        if not isinstance(data, list):
+            raise ValueError("Expected a JSON list of payments")
+
+        rows = []
+        for position, item in enumerate(data, start=1):
+            try:
+                rows.append(normalize_dates(as_row(payment_from_json(item))))
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Payment {position}: {e}") from e
+
+        results = await self._submit("add", rows) if rows else []
+        return 200, {
+            "added": sum(result == "added" for _, result in results),
+            "results": [{"invoice_no": invoice_no, "result": result} for invoice_no, result in results],
+        }
+
+    async def update_status(self, query, body, invoice_no):
+        data = self._json(body)
+        status = data.get("status") if isinstance(data, dict) else None
+        if status not in PAYMENT_STATUSES:
+            raise ValueError(f"status must be one of {', '.join(PAYMENT_STATUSES)}, got {status!r}")
+
+        result = await self._submit("status", (invoice_no, status))
+        if result == "not found":
+            return 404, {"invoice_no": invoice_no, "result": result, "error": f"Invoice No {invoice_no} not found"}
+        return 200, {"invoice_no": invoice_no, "result": result}
+
+    @staticmethod
+    def _json(body):
+        try:
+            return json.loads(body or b"null")
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON: {e}") from e
+
+    @staticmethod
+    def _int_param(query, name, default):
+        value = query.get(name)
+        if value is None:
+            return default
+        if not value.isdigit():
+            raise ValueError(f"{name} must be a non-negative whole number, got {value!r}")
+        return int(value)
+
+    # HTTP
+
+    def _route(self, method, path):
+        """
+        Returns (route pattern, handler, path arguments), or (None, None, allowed methods).
+        """
+        parts = path.rstrip("/").split("/") or [""]
+        allowed = []
+        for route_method, pattern, handler in self.ROUTES:
+            pattern_parts = pattern.split("/")
+            if len(parts) != len(pattern_parts):
+                continue
+            args = []
+            for part, pattern_part in zip(parts, pattern_parts):
+                if pattern_part.startswith("{"):
+                    args.append(unquote(part))
+                elif part != pattern_part:
+                    break
+            else:
+                if route_method == method:
+                    return f"{method} {pattern}", getattr(self, handler), args
+                allowed.append(route_method)
+        return None, None, allowed
+
+    async def dispatch(self, method, target, body):
+        """
+        Runs the handler of a request and returns (HTTP status, JSON payload).
+        """
+        start = time.perf_counter()
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        route, handler, args = self._route(method, url.path)
+
+        if handler is None:
+            route = "unmatched"
+            status, payload = (405, {"error": f"Use {' or '.join(args)}"}) if args else (404, {"error": f"No such endpoint: {url.path}"})
+        else:
+            try:
+                status, payload = await handler(query, body, *args)
+            except ValueError as e:
+                status, payload = 400, {"error": str(e)}
+            except TimeoutError as e:
+                status, payload = 503, {"error": str(e)}  # Another program kept the ledger locked
+            except Exception as e:
+                status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        self.metrics.record(route, time.perf_counter() - start, status)
+        return status, payload
+
+    async def _handle(self, reader, writer):
+        """
+        Serves the requests of one connection (HTTP/1.1 with keep-alive).
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": f"Request body larger than {MAX_BODY} bytes"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.dispatch(method.upper(), target, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Client went away or sent a malformed request
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive=True):
+        data = json.dumps(payload, default=str).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    # Lifecycle
+
+    async def start(self, host=None, port=None):
+        """
+        Opens the storage, loads the snapshot and starts listening. Returns the port, so
+        port 0 (any free port) can be used by scripts that start their own service.
+        """
+        host = host or config.SERVICE_HOST
+        check_loopback(host)
+
+        self.snapshot = await self._call(self._open)
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer())
+        self._server = await asyncio.start_server(self._handle, host, config.SERVICE_PORT if port is None else port)
+        port = self._server.sockets[0].getsockname()[1]
+        print(f"✅ Payment service listening on http://{host}:{port} ({len(self.snapshot)} payments)")
+        return port
+
+    async def stop(self):
+        """
+        Stops listening, finishes the queued writes and closes the storage.
+        """
+        self._server.close()
+        await self._server.wait_closed()
+        self._stopping = True
+        await self._queue.put(None)
+        await self._writer_task
+        await self._call(self._close)
+        self.executor.shutdown()
+        print("✅ Payment service stopped.")
+
+    async def serve(self, host=None, port=None):
+        await self.start(host, port)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON service for recording and querying payments.")
+    parser.add_argument("--host", default=config.SERVICE_HOST, help="Loopback address to listen on")
+    parser.add_argument("--port", type=int, default=config.SERVICE_PORT, help="Port (0 picks a free one)")
+    parser.add_argument("--backend", choices=["excel", "sqlite"], help="Storage backend (default: config.STORAGE_BACKEND)")
+    args = parser.parse_args(argv)
+
+    try:
+        check_loopback(args.host)
+        asyncio.run(PaymentService(backend=args.backend).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
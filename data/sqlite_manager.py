@@ -0,0 +1,626 @@
+import os
+import sqlite3
+from datetime import datetime
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+import config
+from instrumentation import instrumented, metrics
+from excel_manager import (CURRENCY_COLUMNS, CURRENCY_STYLE, DATE_FIELDS, DATE_STYLE, TEXT_STYLE,
+                           ExcelManager, HEADERS)
+from models import DATE_COLUMNS, Payment, PaymentBatch, as_row, normalize_dates, parse_date
+from search_index import SearchIndex
+from importer import PaymentImport
+from charts import CHART_VIEWS, chart_data, has_data, write_chart_sheet
+from locking import LedgerLock
+from vat import plan_changes
+
+# Database columns, in the same order as the Excel columns (HEADERS)
+COLUMNS = [
+    "invoice_no", "task_type", "tariff_fee", "gross_fee", "vat_rate",
+    "vat_amount", "net_fee", "case_details", "submission_date",
+    "invoice_date", "payment_status"
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payments (
+    id INTEGER PRIMARY KEY,
+    invoice_no TEXT NOT NULL UNIQUE,
+    task_type TEXT,
+    tariff_fee REAL,
+    gross_fee REAL,
+    vat_rate REAL,
+    vat_amount REAL,
+    net_fee REAL,
+    case_details TEXT,
+    submission_date TEXT,
+    invoice_date TEXT,
+    payment_status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_payments_status ON payments (payment_status);
+CREATE INDEX IF NOT EXISTS idx_payments_submission_date ON payments (submission_date);
+CREATE INDEX IF NOT EXISTS idx_payments_invoice_date ON payments (invoice_date);
+"""
+
+class SQLiteManager:
+    """
+    This class stores payments in an SQLite database.
+    It offers the same methods as ExcelManager, and the spreadsheet is produced on request
+    with export_to_excel().
+    """
+
+    def __init__(self, file_path=None, export_path=None):
+        """
+        Constructor for the SQLiteManager class.
+        Opens (or creates) the database file and makes sure the schema exists.
+        """
+        if file_path is None:
+            file_path = os.path.join(config.RECORDS_DIR, config.SQLITE_FILE_NAME)
+
+        base_dir = os.path.dirname(os.path.abspath(file_path))
+
+        if not os.path.exists(base_dir):
+            os.makedirs(base_dir)  # Create the directory if it does not exist
+
+        self.file_path = file_path
+        self.export_path = export_path or os.path.join(base_dir, config.EXCEL_FILE_NAME)
+        print(f"✅ DATABASE FILE IS SAVED AT: {self.file_path}")
+
+        # The GUI calls the manager from one worker thread at a time, so the connection may be shared
+        self.conn = sqlite3.connect(self.file_path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._search_index = None  # Task Type / Case Details words -> row ids
+        self._search_version = None  # PRAGMA data_version the search index was built at
+        self._exported = {}  # Export path -> (data version, file mtime and size) of the last export
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        self.conn.close()
+
+    @staticmethod
+    def _invoice_key(invoice_no):
+        """
+        Normalises an Invoice No the same way ExcelManager does.
+        """
+        return ExcelManager._invoice_key(invoice_no)
+
+    @staticmethod
+    def _to_db(row):
+        """
+        Prepares a payment row for the database: dates are stored as sortable YYYY-MM-DD text.
+        """
+        row = normalize_dates(row)
+        for idx in DATE_COLUMNS:
+            if isinstance(row[idx], datetime):
+                row[idx] = row[idx].strftime("%Y-%m-%d")
+        return row
+
+    @staticmethod
+    def _from_db(row):
+        """
+        Converts a database row back to a payment tuple with datetime dates, like ExcelManager returns.
+        """
+        if row is None:
+            return None
+        return tuple(normalize_dates(row))
+
+    @instrumented
+    def add_payment(self, payment_data):
+        """
+        Adds a new payment record to the database.
+        Returns False without writing if the Invoice No already exists.
+        """
+        invoice_no, result = self.add_payments([payment_data])[0]
+
+        if result == "duplicate":
+            print(f"⚠️ Invoice No {invoice_no} already exists. Payment not added.")
+            return False
+
+        print("✅ New payment record added.")
+        return True
+
+    @instrumented
+    def add_payments(self, payments):
+        """
+        Adds many payment records in a single transaction.
+        Accepts a PaymentBatch or an iterable of Payment objects or row lists.
+        Returns a list of (invoice_no, result) pairs, where result is "added" or "duplicate".
+        """
+        insert = f"INSERT OR IGNORE INTO payments ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        results = []
+
+        if isinstance(payments, PaymentBatch):
+            payments = payments.rows()
+
+        with self.conn:
+            for payment in payments:
+                row = self._to_db(as_row(payment))
+                row[0] = self._invoice_key(row[0])
+                cursor = self.conn.execute(insert, row)
+                results.append((row[0], "added" if cursor.rowcount == 1 else "duplicate"))
+                if cursor.rowcount == 1 and self._search_index is not None:
+                    self._search_index.add(cursor.lastrowid, row)
+
+        return results
+
+    @instrumented
+    def update_payment_status(self, invoice_no, new_status):
+        """
+        Updates the payment status (Pending <-> Paid) in the database.
+        """
+        return self.update_payment_statuses({invoice_no: new_status})[invoice_no] == "updated"
+
+    @instrumented
+    def update_payment_statuses(self, updates):
+        """
+        Updates many payment statuses in a single transaction.
+        Returns {invoice_no: result}, where result is "updated" or "not found".
+        """
+        results = {}
+
+        with self.conn:
+            for invoice_no, new_status in updates.items():
+                cursor = self.conn.execute(
+                    "UPDATE payments SET payment_status = ? WHERE invoice_no = ?",
+                    (new_status, self._invoice_key(invoice_no))
+                )
+                results[invoice_no] = "updated" if cursor.rowcount else "not found"
+
+        return results
+
+    @instrumented
+    def import_payments(self, file_path, mapping=None, progress=None, cancel=None):
+        """
+        Imports payments from a CSV or xlsx file in a single transaction, see ExcelManager.import_payments.
+        Returns the import counts, or None if `cancel` (a threading.Event) was set (nothing is imported).
+        """
+        insert = f"INSERT INTO payments ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        importer = PaymentImport(file_path, mapping)
+
+        def is_duplicate(invoice_no):
+            return self.conn.execute(
+                "SELECT 1 FROM payments WHERE invoice_no = ?", (self._invoice_key(invoice_no),)
+            ).fetchone() is not None
+
+        with self.conn:
+            for chunk in importer.chunks(is_duplicate, progress, cancel):
+                self.conn.executemany(insert, [self._to_db(row) for row in chunk])
+                metrics.add_rows(len(chunk))
+
+            if cancel is not None and cancel.is_set():
+                self.conn.rollback()
+                print("⚠️ Import cancelled, the database was not changed.")
+                return None
+
+        self._search_index = None  # Rebuilt on the next search
+
+        result = importer.result()
+        print(f"✅ Import finished: {importer.status()}.")
+        if result["report"]:
+            print(f"⚠️ Rejected rows written to {result['report']}")
+        return result
+
+    @instrumented
+    def search_payment(self, invoice_no):
+        """
+        Searches for a payment by Invoice No.
+        Returns the payment row (a tuple) if found, otherwise returns None. See get_payment for a Payment.
+        """
+        return self._from_db(self.conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM payments WHERE invoice_no = ?",
+            (self._invoice_key(invoice_no),)
+        ).fetchone())
+
+    def get_payment(self, invoice_no):
+        """
+        Returns the payment with the given Invoice No as a Payment, or None if there is none.
+        """
+        row = self.search_payment(invoice_no)
+        return Payment.from_row(row) if row is not None else None
+
+    def data_version(self):
+        """
+        Returns a value that changes whenever another connection commits to the database.
+        """
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load_search_index(self):
+        """
+        Returns the full-text index over Task Type and Case Details, keyed by row id.
+        It is rebuilt when another connection has changed the database since it was built.
+        """
+        version = self.data_version()
+
+        if self._search_index is None or version != self._search_version:
+            search_index = SearchIndex()
+            for rowid, *row in self.conn.execute(f"SELECT rowid, {', '.join(COLUMNS)} FROM payments"):
+                search_index.add(rowid, row)
+            self._search_index = search_index
+            self._search_version = version
+
+        return self._search_index
+
+    @instrumented
+    def search_payments(self, query, limit=20):
+        """
+        Full-text search over Task Type and Case Details, see ExcelManager.search_payments.
+        Returns a PaymentBatch of up to `limit` payments, best match first.
+        """
+        rowids = self.load_search_index().search(query, limit)
+        if not rowids:
+            return PaymentBatch()
+
+        rows = {rowid: row for rowid, *row in self.conn.execute(
+            f"SELECT rowid, {', '.join(COLUMNS)} FROM payments WHERE rowid IN ({', '.join('?' * len(rowids))})",
+            rowids
+        )}
+        metrics.add_rows(len(rows))
+        return PaymentBatch(self._from_db(rows[rowid]) for rowid in rowids if rowid in rows)
+
+    @instrumented
+    def iter_payments(self, status=None, task_type=None, where=None, limit=None):
+        """
+        Lazily yields payment rows in insertion order, with the same filters as ExcelManager.iter_payments.
+        Status and task type filters run in SQL; `where(row)` is applied in Python.
+        """
+        if limit is not None and limit <= 0:
+            return
+
+        query = f"SELECT {', '.join(COLUMNS)} FROM payments"
+        conditions, params = [], []
+
+        if status is not None:
+            conditions.append("payment_status = ?")
+            params.append(status)
+        if task_type is not None:
+            conditions.append("task_type = ?")
+            params.append(task_type)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+        if limit is not None and where is None:
+            query += f" LIMIT {int(limit)}"
+
+        yielded = 0
+        for row in self.conn.execute(query, params):
+            row = self._from_db(row)
+            if where is not None and not where(row):
+                continue
+
+            metrics.add_rows(1)
+            yield row
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                break
+
+    @instrumented
+    def get_payments_page(self, offset=0, limit=100, sort_by=None, descending=False, status=None):
+        """
+        Returns (PaymentBatch, total) for one page of payments, sorted and filtered in SQL.
+        `sort_by` is a column index (see COLUMNS) and `status` filters on Payment Status.
+        """
+        where, params = "", []
+
+        if status is not None:
+            where = " WHERE payment_status = ?"
+            params.append(status)
+
+        order = f"{COLUMNS[sort_by]} {'DESC' if descending else 'ASC'}, id" if sort_by is not None else "id"
+        total = self.conn.execute(f"SELECT COUNT(*) FROM payments{where}", params).fetchone()[0]
+        rows = self.conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM payments{where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [int(limit), int(offset)]
+        ).fetchall()
+
+        return PaymentBatch(self._from_db(row) for row in rows), total
+
+    @instrumented
+    def list_payments(self):
+        """
+        Displays all recorded payments in the console.
+        """
+        print("\n📌 Recorded Payments:")
+        print(tuple(HEADERS))
+        for row in self.iter_payments():
+            print(row)
+
+    @instrumented
+    def get_all_payments(self):
+        """
+        Retrieves all payment records.
+        Returns a PaymentBatch containing payment data.
+        """
+        return PaymentBatch(self.iter_payments())
+
+    @staticmethod
+    def _date_conditions(start, end, field):
+        """
+        Returns (SQL conditions, params) restricting a date field to start..end (inclusive).
+        """
+        if field not in DATE_FIELDS:
+            raise KeyError(field)
+
+        conditions, params = [], []
+        for value, operator in ((start, ">="), (end, "<=")):
+            if value is None:
+                continue
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f"Invalid date: {value!r} (expected DD.MM.YYYY)")
+            conditions.append(f"{field} {operator} ?")
+            params.append(parsed.strftime("%Y-%m-%d"))
+        return conditions, params
+
+    @instrumented
+    def payments_between(self, start=None, end=None, field="invoice_date", status=None):
+        """
+        Returns the payments whose date field falls between start and end (inclusive), in date order.
+        Uses the date column index.
+        """
+        conditions, params = self._date_conditions(start, end, field)
+        conditions.append(f"{field} IS NOT NULL")
+
+        if status is not None:
+            conditions.append("payment_status = ?")
+            params.append(status)
+
+        rows = self.conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM payments WHERE {' AND '.join(conditions)} ORDER BY {field}, id",
+            params
+        ).fetchall()
+
+        return PaymentBatch(self._from_db(row) for row in rows)
+
+    @staticmethod
+    def _group_expression(key, field):
+        """
+        Returns the SQL expression for a group_payments key.
+        """
+        if key == "status":
+            return "payment_status"
+        if key in ("task_type", "vat_rate"):
+            return key
+        if key == "month":
+            return f"strftime('%Y-%m', {field})"
+        if key == "quarter":
+            return f"strftime('%Y', {field}) || '-Q' || ((CAST(strftime('%m', {field}) AS INTEGER) + 2) / 3)"
+        if key == "year":
+            return f"strftime('%Y', {field})"
+        raise ValueError(f"Unknown group key: {key!r} (expected one of status, task_type, vat_rate, month, quarter, year)")
+
+    @instrumented
+    def group_payments(self, by, status=None, start=None, end=None, field="invoice_date"):
+        """
+        Grouped totals in SQL, see ExcelManager.group_payments.
+        Returns a list of (*keys, count, tariff fee, gross fee, VAT amount, net fee) sorted by the keys.
+        """
+        keys = [by] if isinstance(by, str) else list(by)
+        expressions = [self._group_expression(key, field) for key in keys]
+        conditions, params = self._date_conditions(start, end, field)
+
+        for key, expression in zip(keys, expressions):
+            if key in ("month", "quarter", "year"):
+                conditions.append(f"{expression} IS NOT NULL")
+        if status is not None:
+            conditions.append("payment_status = ?")
+            params.append(status)
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        groups = ", ".join(f"g{idx}" for idx in range(len(keys)))
+        return self.conn.execute(
+            f"SELECT {', '.join(f'{expression} AS g{idx}' for idx, expression in enumerate(expressions))}, "
+            "COUNT(*), TOTAL(tariff_fee), TOTAL(gross_fee), TOTAL(vat_amount), TOTAL(net_fee) "
+            f"FROM payments{where} GROUP BY {groups} ORDER BY {groups}",
+            params
+        ).fetchall()
+
+    @instrumented
+    def rollup(self, period="month", field="invoice_date", start=None, end=None):
+        """
+        Groups payments by month or quarter of a date field and by status, in SQL.
+        Returns a list of (period, status, count, net total, gross total) sorted by period and status.
+        """
+        if period not in ("month", "quarter"):
+            raise ValueError(f"Unknown period: {period!r} (expected 'month' or 'quarter')")
+
+        groups = self.group_payments([period, "status"], start=start, end=end, field=field)
+        return [(bucket, status, count, net, gross) for bucket, status, count, _, gross, _, net in groups]
+
+    @instrumented
+    def migrate_dates(self):
+        """
+        Converts dates stored as DD.MM.YYYY text by older versions into YYYY-MM-DD.
+        Returns the number of values converted.
+        """
+        converted = 0
+
+        with self.conn:
+            for row_id, *dates in self.conn.execute(
+                "SELECT id, submission_date, invoice_date FROM payments"
+            ).fetchall():
+                new_dates = []
+                for value in dates:
+                    parsed = parse_date(value)
+                    new_value = parsed.strftime("%Y-%m-%d") if parsed is not None else value
+                    converted += new_value != value
+                    new_dates.append(new_value)
+                if new_dates != dates:
+                    self.conn.execute(
+                        "UPDATE payments SET submission_date = ?, invoice_date = ? WHERE id = ?",
+                        (*new_dates, row_id)
+                    )
+
+        print(f"✅ {converted} date value(s) converted.")
+        return converted
+
+    @instrumented
+    def recompute_vat(self, rule, dry_run=False):
+        """
+        Recalculates VAT Amount and Net Fee for the payments matched by a vat.VatRule,
+        see ExcelManager.recompute_vat. Every change is written in one transaction.
+        """
+        row_ids = []
+        rows = []
+        for row_id, *row in self.conn.execute(f"SELECT id, {', '.join(COLUMNS)} FROM payments ORDER BY id"):
+            row_ids.append(row_id)
+            rows.append(self._from_db(row))
+
+        changes, matched, skipped = plan_changes(rows, rule)
+        metrics.add_rows(matched)
+
+        if changes and not dry_run:
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE payments SET vat_rate = ?, vat_amount = ?, net_fee = ? WHERE id = ?",
+                    [(row[4], row[5], row[6], row_ids[pos]) for pos, row in changes]
+                )
+
+        return {"matched": matched, "skipped": skipped, "changes": [(rows[pos], row) for pos, row in changes]}
+
+    @instrumented
+    def analyze_payments(self, start=None, end=None, field="invoice_date"):
+        """
+        Analyzes payments and calculates total numbers of paid and pending invoices.
+        Also provides total net and gross fees, optionally for payments dated between start and end.
+        """
+        conditions, params = self._date_conditions(start, end, field)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        totals = {
+            status: (count, net, gross)
+            for status, count, net, gross in self.conn.execute(
+                "SELECT payment_status, COUNT(*), TOTAL(net_fee), TOTAL(gross_fee) "
+                f"FROM payments{where} GROUP BY payment_status", params
+            )
+        }
+        total_payments = sum(count for count, _, _ in totals.values())
+        total_paid, total_net_paid, total_gross_paid = totals.get("Paid", (0, 0, 0))
+        total_pending, total_net_pending, total_gross_pending = totals.get("Pending", (0, 0, 0))
+
+        return total_payments, total_paid, total_net_paid, total_gross_paid, total_pending, total_net_pending, total_gross_pending
+
+    @instrumented
+    def get_payment_counts(self):
+        """
+        Counts the number of Paid and Pending payments.
+        Returns (total_paid, total_pending).
+        """
+        _, total_paid, _, _, total_pending, _, _ = self.analyze_payments()
+        return total_paid, total_pending
+
+    @instrumented
+    def _column_widths(self):
+        """
+        Returns the longest value of every column (header included), counted in SQL, so the
+        column widths can be set before the rows of a write-only sheet are streamed.
+        """
+        lengths = ", ".join(f"MAX(LENGTH({column}))" for column in COLUMNS)
+        maxima = self.conn.execute(f"SELECT {lengths} FROM payments").fetchone()
+        widths = [max(len(header), length or 0) for header, length in zip(HEADERS, maxima)]
+        for idx in DATE_COLUMNS:
+            widths[idx] = max(len(HEADERS[idx]), len("DD.MM.YYYY"))  # Stored as YYYY-MM-DD, shown as DD.MM.YYYY
+        return widths
+
+    @staticmethod
+    def _export_row(ws, row):
+        """
+        Returns a row for the exported sheet with the cell styles of a formatted Excel ledger.
+        """
+        cells = []
+        for idx, value in enumerate(row):
+            cell = WriteOnlyCell(ws, value=value)
+            if idx in CURRENCY_COLUMNS and isinstance(value, (int, float)):
+                cell.style = CURRENCY_STYLE
+            elif idx in DATE_COLUMNS and isinstance(value, datetime):
+                cell.style = DATE_STYLE  # DD.MM.YYYY display
+            else:
+                cell.style = TEXT_STYLE
+            cells.append(cell)
+        return cells
+
+    @instrumented
+    def export_to_excel(self, file_path=None, cancel=None, views=None):
+        """
+        Writes every payment to an Excel file (payment_records.xlsx by default) in one streamed pass,
+        formatted like an Excel ledger: TL and DD.MM.YYYY cell styles, column widths, Paid/Pending
+        highlighting and the Payment Chart sheet (see charts.CHART_VIEWS; all views by default).
+        The file is written to a temporary path and swapped in while holding its lock, so neither a
+        crash nor an Excel-backend user of the same file ever sees half of it.
+        Returns the path of the written file, or None if `cancel` (a threading.Event) was set.
+        """
+        file_path = file_path or self.export_path
+        charts = {view: chart_data(self, view) for view in views or CHART_VIEWS}
+
+        wb = Workbook(write_only=True)
+        ExcelManager._register_styles(wb)
+        ws = wb.create_sheet(title="Payment Records")
+        for idx, max_length in enumerate(self._column_widths()):
+            col_letter = get_column_letter(idx + 1)
+            ws.column_dimensions[col_letter].width = 30 if col_letter == "B" else max_length + 2
+        ExcelManager._install_status_rules(ws)
+        ws.append(HEADERS)
+
+        for row in self.iter_payments():
+            if cancel is not None and cancel.is_set():
+                ws.close()  # Finish the half-written sheet; openpyxl removes its temporary file at exit
+                print("⚠️ Export cancelled.")
+                return None
+            ws.append(self._export_row(ws, row))
+
+        if any(has_data(data) for data in charts.values()):
+            write_chart_sheet(wb, charts)
+
+        lock = LedgerLock(file_path)
+        with lock:
+            tmp_path = os.path.splitext(file_path)[0] + ".tmp.xlsx"
+            wb.save(tmp_path)
+            os.replace(tmp_path, file_path)
+            lock.bump()  # Excel-backend users of the same file reload it
+
+        stat = os.stat(file_path)
+        self._exported[os.path.abspath(file_path)] = (self._export_version(), stat.st_mtime_ns, stat.st_size)
+        metrics.add_bytes(stat.st_size)
+        print(f"✅ Payments exported to Excel: {file_path}")
+        return file_path
+
+    def _export_version(self):
+        # data_version only counts other connections' commits; total_changes counts this one's
+        return self.data_version(), self.conn.total_changes
+
+    def _refresh_export(self, views=None):
+        """
+        Exports the payments unless the exported file is already up to date (same database
+        version, file untouched since). Used by the spreadsheet-only operations, which all
+        produce the same complete export, so one does not undo another.
+        """
+        exported = self._exported.get(os.path.abspath(self.export_path))
+        if views is None and exported is not None and os.path.exists(self.export_path):
+            stat = os.stat(self.export_path)
+            if exported == (self._export_version(), stat.st_mtime_ns, stat.st_size):
+                print(f"✅ Excel export is already up to date: {self.export_path}")
+                return self.export_path
+        return self.export_to_excel(views=views)
+
+    @instrumented
+    def adjust_excel_formatting(self, full=False):
+        """
+        Exports the payments to a formatted Excel file (see export_to_excel).
+        """
+        self._refresh_export()
+
+    @instrumented
+    def highlight_payments(self, conditional=True):
+        """
+        Exports the payments to Excel with the payment statuses highlighted (see export_to_excel).
+        """
+        self._refresh_export()
+
+    @instrumented
+    def generate_payment_chart(self, views=None):
+        """
+        Exports the payments to Excel with the payment charts (see export_to_excel).
+        The chart data is computed with SQL, so the exported file is not read again.
+        """
+        self._refresh_export(views)
@@ -0,0 +1,26 @@
+import config
+
+def create_manager(backend=None):
+    """
+    Returns the payment storage selected by config.STORAGE_BACKEND (or the given backend name).
+    The Excel backend is split into yearly files when config.PARTITION_SCHEME is "year".
+    Both backends expose the same methods: add_payment(s), update_payment_status(es), import_payments,
+    search_payment, get_payment, iter_payments, get_payments_page, list_payments, get_all_payments, analyze_payments,
+    search_payments, get_payment_counts, payments_between, rollup, group_payments, migrate_dates,
+    adjust_excel_formatting, highlight_payments, generate_payment_chart, recompute_vat and data_version.
+    """
+    backend = backend or config.STORAGE_BACKEND
+
+    if backend == "excel":
+        if config.PARTITION_SCHEME == "year":
+            from partitioned_manager import PartitionedExcelManager
+            return PartitionedExcelManager()
+        if config.PARTITION_SCHEME != "none":
+            raise ValueError(f"Unknown partition scheme: {config.PARTITION_SCHEME!r} (expected 'none' or 'year')")
+        from excel_manager import ExcelManager
+        return ExcelManager()
+    if backend == "sqlite":
+        from sqlite_manager import SQLiteManager
+        return SQLiteManager()
+
+    raise ValueError(f"Unknown storage backend: {backend!r} (expected 'excel' or 'sqlite')")
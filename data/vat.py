@@ -0,0 +1,208 @@
+import os
+import sys
+import csv
+import math
+import argparse
+from datetime import datetime
+from numbers import Real
+
+import numpy as np
+
+import config
+from models import PAYMENT_STATUSES, format_date, parse_date, vat_split
+from payment_table import DATE_COLUMNS, PaymentTable
+from storage import create_manager
+
+# Largest Gross Fee (in kuruş) recomputed with int64 arithmetic; larger amounts go through vat_split
+MAX_EXACT_KURUS = 10 ** 14
+
+REPORT_HEADERS = [
+    "Invoice No", "Task Type", "Invoice Date", "Payment Status", "Gross Fee (TL)",
+    "Old VAT (%)", "New VAT (%)", "Old VAT Amount (TL)", "New VAT Amount (TL)",
+    "Old Net Fee (TL)", "New Net Fee (TL)", "Net Fee Change (TL)"
+]
+
+def _is_number(value):
+    return isinstance(value, Real) and not isinstance(value, bool) and math.isfinite(value)
+
+def vat_columns(gross_fee, vat_rate):
+    """
+    vat_split over float arrays: returns (VAT Amount, Net Fee) arrays with the same rounding.
+    Amounts and rates with at most two decimals (practically every row) are computed exactly in
+    integer kuruş and hundredths of a percent; the few other rows go through vat_split.
+    """
+    gross = np.rint(gross_fee * 100)
+    rate = np.rint(vat_rate * 100)
+    exact = ((np.abs(gross_fee * 100 - gross) < 1e-6) & (np.abs(vat_rate * 100 - rate) < 1e-6)
+             & (np.abs(gross) < MAX_EXACT_KURUS))
+
+    gross = np.where(exact, gross, 0).astype(np.int64)
+    product = gross * np.where(exact, rate, 0).astype(np.int64)  # In 1/10000 kuruş
+    vat = np.sign(product) * ((np.abs(product) + 5000) // 10000)  # Half-up, away from zero like ROUND_HALF_UP
+    vat_amount = vat / 100
+    net_fee = (gross - vat) / 100
+
+    for pos in np.flatnonzero(~exact).tolist():
+        vat_amount[pos], net_fee[pos] = vat_split(gross_fee[pos], vat_rate[pos])
+
+    return vat_amount, net_fee
+
+class VatRule:
+    """
+    This class describes a VAT recomputation: the payments it applies to (a date range on the
+    Invoice or Submission Date, a Task Type and a status, all optional) and the VAT rate to give them.
+    Without a rate every payment keeps its own, which repairs amounts that were entered wrongly.
+    """
+
+    def __init__(self, vat_rate=None, start=None, end=None, field="invoice_date", task_type=None, status=None):
+        """
+        Dates may be datetime values or text such as DD.MM.YYYY. Raises ValueError for invalid values.
+        """
+        if vat_rate is not None and (not _is_number(vat_rate) or not 0 <= vat_rate <= 100):
+            raise ValueError(f"VAT Rate must be a number between 0 and 100, got {vat_rate!r}")
+        if field not in DATE_COLUMNS:
+            raise ValueError(f"Unknown date field: {field!r} (expected one of {', '.join(DATE_COLUMNS)})")
+        if status not in (None, *PAYMENT_STATUSES):
+            raise ValueError(f"Payment Status must be one of {', '.join(PAYMENT_STATUSES)}, got {status!r}")
+
+        bounds = []
+        for value in (start, end):
+            parsed = parse_date(value) if value not in (None, "") else None
+            if value not in (None, "") and parsed is None:
+                raise ValueError(f"Invalid date: {value!r} (expected DD.MM.YYYY)")
+            bounds.append(parsed)
+        if None not in bounds and bounds[0] > bounds[1]:
+            raise ValueError("The start date is after the end date")
+
+        self.vat_rate = vat_rate
+        self.start, self.end = bounds
+        self.field = field
+        self.task_type = task_type or None
+        self.status = status
+
+    def describe(self):
+        """
+        Returns the rule in words, e.g. "VAT 20% for Pending payments with Invoice Date from 01.07.2023".
+        """
+        text = f"VAT {self.vat_rate:g}%" if self.vat_rate is not None else "VAT at each payment's own rate"
+        text += f" for {self.status + ' ' if self.status else ''}payments"
+        if self.task_type:
+            text += f" of task type {self.task_type!r}"
+        if self.start or self.end:
+            text += f" with {self.field.replace('_', ' ').title()}"
+            text += f" from {format_date(self.start)}" if self.start else ""
+            text += f" to {format_date(self.end)}" if self.end else ""
+        return text
+
+def plan_changes(rows, rule, table=None):
+    """
+    Applies a VatRule to payment rows (in ledger column order) without changing them.
+    Rows are selected and recomputed with array operations on a PaymentTable of the rows
+    (pass the cached one if there is one). Returns (changes, matched, skipped), where changes is
+    a list of (position, new row) for the rows whose VAT rate, VAT Amount or Net Fee change by at
+    least one kuruş, and skipped counts matched rows without a numeric Gross Fee or VAT rate.
+    """
+    table = PaymentTable(rows) if table is None else table
+    selected = table.mask(rule.status, rule.start, rule.end, rule.field, rule.task_type)
+    matched = range(len(rows)) if selected is None else np.flatnonzero(selected).tolist()
+
+    positions = []
+    unset = []  # VAT Amount or Net Fee cell is blank or text
+    for pos in matched:
+        row = rows[pos]
+        if _is_number(row[3]) and (rule.vat_rate is not None or _is_number(row[4])):
+            positions.append(pos)
+            unset.append(not _is_number(row[5]) or not _is_number(row[6]))
+    if not positions:
+        return [], len(matched), len(matched)
+
+    columns = table.columns
+    gross = columns["gross_fee"][positions]
+    old_rate = columns["vat_rate"][positions]
+    rate = np.full(len(positions), float(rule.vat_rate)) if rule.vat_rate is not None else old_rate
+    vat_amount, net_fee = vat_columns(gross, rate)
+
+    # Compared in whole kuruş, so float noise such as 458.40000000000003 is not a change
+    changed = (np.array(unset) | (rate != old_rate)
+               | (np.rint(vat_amount * 100) != np.rint(columns["vat_amount"][positions] * 100))
+               | (np.rint(net_fee * 100) != np.rint(columns["net_fee"][positions] * 100)))
+
+    changes = []
+    for idx in np.flatnonzero(changed).tolist():
+        row = tuple(rows[positions[idx]])
+        new_rate = row[4] if rule.vat_rate is None else rule.vat_rate
+        changes.append((positions[idx], row[:4] + (new_rate, float(vat_amount[idx]), float(net_fee[idx])) + row[7:]))
+
+    return changes, len(matched), len(matched) - len(positions)
+
+def write_report(changes, report_path):
+    """
+    Writes the diff report of a recomputation, one line per changed payment, as CSV.
+    `changes` is a list of (old row, new row).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+    with open(report_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_HEADERS)
+        for old, new in changes:
+            change = round(new[6] - old[6], 2) if _is_number(old[6]) else ""
+            writer.writerow([
+                old[0], old[1], format_date(old[9]), old[10], old[3],
+                old[4], new[4], old[5], new[5], old[6], new[6], change
+            ])
+    return report_path
+
+def recompute_payments(storage, rule, dry_run=False, report_path=None):
+    """
+    Recomputes VAT Amount and Net Fee for the payments matched by `rule` (a VatRule) with one batched
+    pass and a single save, and writes a diff report. With dry_run the ledger is not changed and the
+    report is a preview. `storage` is any manager returned by storage.create_manager.
+    Returns {"matched", "changed", "skipped", "net_change", "report"}.
+    """
+    result = storage.recompute_vat(rule, dry_run)
+    changes = result.pop("changes")
+    result["changed"] = len(changes)
+    result["net_change"] = round(sum(new[6] - old[6] for old, new in changes if _is_number(old[6])), 2)
+    result["report"] = None
+
+    if changes:
+        if report_path is None:
+            name = f"vat_{'preview' if dry_run else 'changes'}_{datetime.now():%Y%m%d_%H%M%S}.csv"
+            report_path = os.path.join(config.RECORDS_DIR, name)
+        result["report"] = write_report(changes, report_path)
+
+    return result
+
+def print_result(rule, result, dry_run=False):
+    """
+    Prints the outcome of recompute_payments.
+    """
+    print(f"\n🧮 {rule.describe()}")
+    print(f"{result['matched']:,} payment(s) matched, {result['changed']:,} "
+          f"{'would change' if dry_run else 'changed'}, {result['skipped']:,} skipped (no numeric Gross Fee or VAT rate)")
+    if result["changed"]:
+        print(f"Net Fee change: {result['net_change']:+,.2f} TL")
+        print(f"{'📄 Preview' if dry_run else '✅ Changes'} written to {result['report']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute VAT Amount and Net Fee for many payments at once.")
+    parser.add_argument("--rate", type=float, help="New VAT rate in percent (default: keep each payment's rate)")
+    parser.add_argument("--start", help="First date to include (DD.MM.YYYY)")
+    parser.add_argument("--end", help="Last date to include (DD.MM.YYYY)")
+    parser.add_argument("--field", default="invoice_date", choices=list(DATE_COLUMNS))
+    parser.add_argument("--task-type", help="Only payments of this Task Type")
+    parser.add_argument("--status", choices=list(PAYMENT_STATUSES), help="Only Paid or Pending payments")
+    parser.add_argument("--dry-run", action="store_true", help="Only write the preview report")
+    parser.add_argument("--report", help="Path of the CSV diff report")
+    args = parser.parse_args(argv)
+
+    try:
+        rule = VatRule(args.rate, args.start, args.end, args.field, args.task_type, args.status)
+        print_result(rule, recompute_payments(create_manager(), rule, args.dry_run, args.report), args.dry_run)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
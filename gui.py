@@ -1,30 +1,195 @@
+import time
+
+STARTED = time.perf_counter()  # Taken before the imports so --startup-timing can report them separately
+
 import sys
 import os
-from tkinter import Toplevel, Label, Entry, Button, messagebox, ttk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import Toplevel, Label, Entry, Button, messagebox, ttk, filedialog
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "data"))) 
 
-from excel_manager import ExcelManager
-from models import Payment
+import config
+from instrumentation import metrics
+from storage import create_manager
+from models import Payment, parse_date, format_date
+from charts import CHART_VIEWS, chart_data, draw_chart, has_data
 import tkinter as tk
 
+IMPORTED = time.perf_counter()
+
+class BackgroundJob:
+    """
+    Cancellation flag and progress text shared between a worker task and the Tk thread.
+    """
+
+    def __init__(self):
+        self.cancel_event = threading.Event()
+        self.status = ""
+        self.on_error = None  # Optional callback(exception), run on the Tk thread; returning True skips the error box
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def report(self, status):
+        """
+        Called from the worker thread; the progress window picks the text up on its next poll.
+        """
+        self.status = status
+
+def chart_modules():
+    """
+    Imports matplotlib on first use (it is the slowest import of the application) and returns
+    (Figure, FigureCanvasTkAgg). Safe to call again; later calls return the loaded modules.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    return Figure, FigureCanvasTkAgg
+
 class PaymentGUI:
-    def __init__(self, root):
+    def __init__(self, root, on_ready=None):
+        """
+        Builds the main window. The ledger is opened afterwards on the worker thread,
+        so the window appears before any file is touched; on_ready() is called once it is open.
+        """
         self.root = root
         self.root.title("Payment Management System")
-        self.excel = ExcelManager()
+        self.excel = None  # ExcelManager or SQLiteManager (see data/config.py), set by open_ledger
+
+        self.chart = None  # Chart window widgets, see generate_chart_gui
+        self.figure = None  # matplotlib figure reused by every chart window
+        self.figure_key = None  # (view, data) currently drawn on the figure
+
+        # Storage calls run on a single worker thread so they never overlap and never block the Tk loop
+        self.executor = ThreadPoolExecutor(max_workers=1)
 
         tk.Label(root, text="Payment Management System", font=("Arial", 14, "bold")).pack(pady=10)
+        self.status_label = tk.Label(root, text="Opening ledger...", fg="gray")
+        self.status_label.pack()
 
         tk.Button(root, text="Add New Payment", command=self.add_payment, width=20).pack(pady=5)
         tk.Button(root, text="Update Payment Status", command=self.update_payment_status, width=20).pack(pady=5)
+        tk.Button(root, text="Bulk Update Status", command=self.bulk_update_status, width=20).pack(pady=5)
+        tk.Button(root, text="Import Payments", command=self.import_payments, width=20).pack(pady=5)
+        tk.Button(root, text="Recompute VAT", command=self.recompute_vat, width=20).pack(pady=5)
         tk.Button(root, text="Search Payment", command=self.search_payment, width=20).pack(pady=5)
+        tk.Button(root, text="Find Cases", command=self.find_cases, width=20).pack(pady=5)
         tk.Button(root, text="List All Payments", command=self.list_payments, width=20).pack(pady=5)
         tk.Button(root, text="Analyze Payments", command=self.analyze_payments_gui, width=20).pack(pady=5)
         tk.Button(root, text="Generate Payment Chart", command=self.generate_chart_gui, width=20).pack(pady=5)
-        tk.Button(root, text="Exit", command=root.quit, width=20, bg="red", fg="black").pack(pady=5)
+        self.export_button = tk.Button(root, text="Export to Excel", command=self.export_to_excel, width=20)
+        self.diagnostics_button = tk.Button(root, text="Diagnostics", command=self.show_diagnostics, width=20)
+        self.diagnostics_button.pack(pady=5)
+        tk.Button(root, text="Exit", command=self.exit_app, width=20, bg="red", fg="black").pack(pady=5)
+        self.root.protocol("WM_DELETE_WINDOW", self.exit_app)
+
+        # Submitted once the Tk loop is idle, i.e. after the window has been drawn
+        self.root.after_idle(self.open_ledger, on_ready)
+
+    def open_ledger(self, on_ready=None):
+        """
+        Creates the storage manager on the worker thread. Tasks submitted meanwhile queue
+        behind it on the same thread, so buttons can be used right away.
+        """
+        def open_manager(job):
+            self.excel = create_manager()
+
+        def on_opened(_):
+            self.status_label.config(text="")
+            if hasattr(self.excel, "export_to_excel"):
+                self.export_button.pack(pady=5, before=self.diagnostics_button)
+            if on_ready is not None:
+                on_ready()
+
+        job = self.run_in_background(open_manager, on_opened, "Opening ledger...")
+        job.on_error = lambda e: self.status_label.config(text=f"Ledger could not be opened: {e}", fg="red")
+
+    def exit_app(self):
+        """
+        Folds any journaled changes into the Excel file and closes the application.
+        """
+        def finish(_):
+            self.executor.shutdown(wait=False)
+            self.root.quit()
+
+        def failed(e):
+            # Journaled changes are already on disk and are folded in the next time the ledger is opened
+            if messagebox.askyesno("Error", f"Changes could not be saved: {e}\n\n"
+                                            "They are kept and applied the next time the ledger is opened. Exit anyway?"):
+                finish(None)
+            return True
+
+        # Runs after any queued task, including the ledger still being opened
+        job = self.run_in_background(lambda job: self.excel.compact() if hasattr(self.excel, "compact") else None,
+                                     finish, "Saving changes...")
+        job.on_error = failed
+
+    def run_in_background(self, task, on_done, message="Working...", cancellable=False, progress_delay=300):
+        """
+        Runs task(job) on the worker thread.
+        If the task takes longer than `progress_delay` ms, a progress window is shown.
+        on_done(result) is called on the Tk thread via root.after; errors are shown in a message box.
+        If the user cancels, the job's cancel flag is set and the result is discarded.
+        """
+        job = BackgroundJob()
+        future = self.executor.submit(task, job)
+        progress = {}  # Progress window widgets, created lazily
+        waited = [0]
+
+        def cancel():
+            job.cancel()
+            progress["window"].destroy()
+
+        def show_progress():
+            progress_window = Toplevel(self.root)
+            progress_window.title("Please Wait")
+            progress_window.geometry("300x120")
+            progress_window.transient(self.root)
+
+            status_label = Label(progress_window, text=message)
+            status_label.pack(pady=5)
+            progress_bar = ttk.Progressbar(progress_window, mode="indeterminate", length=250)
+            progress_bar.pack(pady=5)
+            progress_bar.start(10)
+
+            if cancellable:
+                Button(progress_window, text="Cancel", command=cancel).pack(pady=5)
+            progress_window.protocol("WM_DELETE_WINDOW", cancel if cancellable else lambda: None)
+            progress.update(window=progress_window, label=status_label)
+
+        def poll():
+            if not future.done():
+                waited[0] += 50
+                if not progress and waited[0] >= progress_delay and not job.cancelled:
+                    show_progress()
+                if job.status and progress and progress["window"].winfo_exists():
+                    progress["label"].config(text=f"{message}\n{job.status}")
+                self.root.after(50, poll)
+                return
+
+            if progress and progress["window"].winfo_exists():
+                progress["window"].destroy()
+            if job.cancelled:
+                return
+
+            try:
+                result = future.result()
+            except Exception as e:
+                if job.on_error is not None and job.on_error(e):
+                    return
+                messagebox.showerror("Error", str(e))
+                return
+
+            on_done(result)
+
+        self.root.after(50, poll)
+        return job
 
     def add_payment(self):
         """
@@ -71,21 +236,25 @@ class PaymentGUI:
             Saves the entered payment details into the Excel file.
             """
             invoice_no = invoice_entry.get()
-            task_type = task_entry.get()
-            tariff_fee = float(tariff_entry.get())
-            gross_fee = float(gross_entry.get())
-            vat_rate = float(vat_entry.get())
-            vat_amount = gross_fee * (vat_rate / 100)
-            net_fee = gross_fee - vat_amount
-            case_details = case_entry.get()
-            submission_date = submission_entry.get()
-            invoice_date = invoice_date_entry.get()
-
-            new_payment = Payment(invoice_no, task_type, tariff_fee, gross_fee, vat_rate, vat_amount, net_fee, case_details, submission_date, invoice_date)
-            self.excel.add_payment(new_payment.to_list())
-
-            messagebox.showinfo("Success", "New payment added successfully!")
-            add_window.destroy()
+
+            # Payment validates the values and computes VAT Amount and Net Fee
+            try:
+                new_payment = Payment(invoice_no, task_entry.get(), float(tariff_entry.get()), float(gross_entry.get()),
+                                      float(vat_entry.get()), None, None, case_entry.get(),
+                                      submission_entry.get(), invoice_date_entry.get())
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+
+            def on_saved(added):
+                if not added:
+                    messagebox.showerror("Error", f"Invoice No {invoice_no} already exists!")
+                    return
+
+                messagebox.showinfo("Success", "New payment added successfully!")
+                add_window.destroy()
+
+            self.run_in_background(lambda job: self.excel.add_payment(new_payment), on_saved, "Saving payment...")
 
         Button(add_window, text="Save Payment", command=save_payment).pack(pady=10)
 
@@ -118,17 +287,131 @@ class PaymentGUI:
                 messagebox.showerror("Error", "Please enter an Invoice No!")
                 return
 
-            success = self.excel.update_payment_status(invoice_no, new_status)
+            def on_updated(success):
+                if success:
+                    messagebox.showinfo("Success", f"Payment status updated to {new_status}!")
+                else:
+                    messagebox.showerror("Error", "Invoice No not found!")
 
-            if success:
-                messagebox.showinfo("Success", f"Payment status updated to {new_status}!")
-            else:
-                messagebox.showerror("Error", "Invoice No not found!")
+                update_window.destroy()
 
-            update_window.destroy()
+            self.run_in_background(lambda job: self.excel.update_payment_status(invoice_no, new_status),
+                                   on_updated, "Updating status...")
 
         Button(update_window, text="Update Status", command=save_status).pack(pady=10)
 
+    def bulk_update_status(self):
+        """
+        Opens a window to update the status of many invoices at once.
+        """
+        bulk_window = Toplevel(self.root)
+        bulk_window.title("Bulk Update Status")
+        bulk_window.geometry("350x350")
+
+        Label(bulk_window, text="Enter Invoice Nos (one per line):").pack()
+        invoices_text = tk.Text(bulk_window, height=10, width=30)
+        invoices_text.pack()
+
+        status_var = tk.StringVar()
+        status_var.set("Paid")  # Default selection
+
+        Label(bulk_window, text="Select New Status:").pack()
+        status_dropdown = tk.OptionMenu(bulk_window, status_var, "Paid", "Pending")
+        status_dropdown.pack()
+
+        def save_statuses():
+            invoice_nos = [line.strip() for line in invoices_text.get("1.0", "end").splitlines() if line.strip()]
+            new_status = status_var.get()
+
+            if not invoice_nos:
+                messagebox.showerror("Error", "Please enter at least one Invoice No!")
+                return
+
+            def on_updated(results):
+                not_found = [invoice_no for invoice_no, result in results.items() if result == "not found"]
+                updated = len(results) - len(not_found)
+
+                if not_found:
+                    messagebox.showwarning("Partially Updated",
+                                           f"{updated} payment(s) updated to {new_status}.\n"
+                                           f"Not found: {', '.join(not_found)}")
+                else:
+                    messagebox.showinfo("Success", f"{updated} payment(s) updated to {new_status}!")
+
+                bulk_window.destroy()
+
+            # All statuses are written with a single save
+            updates = {invoice_no: new_status for invoice_no in invoice_nos}
+            self.run_in_background(lambda job: self.excel.update_payment_statuses(updates), on_updated, "Updating statuses...")
+
+        Button(bulk_window, text="Update Statuses", command=save_statuses).pack(pady=10)
+
+    def recompute_vat(self):
+        """
+        Opens a window to recompute VAT Amount and Net Fee for many payments, e.g. after a rate change.
+        The changes are previewed first and only written once confirmed.
+        """
+        from vat import VatRule, recompute_payments  # Kept out of the start-up imports; NumPy is loaded with the ledger
+
+        vat_window = Toplevel(self.root)
+        vat_window.title("Recompute VAT")
+        vat_window.geometry("350x350")
+
+        Label(vat_window, text="New VAT (%) (blank keeps each payment's rate):").pack()
+        rate_entry = Entry(vat_window)
+        rate_entry.pack()
+
+        Label(vat_window, text="First Invoice Date (blank for all):").pack()
+        start_entry = Entry(vat_window)
+        start_entry.pack()
+
+        Label(vat_window, text="Last Invoice Date (blank for all):").pack()
+        end_entry = Entry(vat_window)
+        end_entry.pack()
+
+        Label(vat_window, text="Task Type (blank for all):").pack()
+        task_entry = Entry(vat_window)
+        task_entry.pack()
+
+        status_var = tk.StringVar()
+        status_var.set("All")  # Default selection
+
+        Label(vat_window, text="Payment Status:").pack()
+        status_dropdown = tk.OptionMenu(vat_window, status_var, "All", "Paid", "Pending")
+        status_dropdown.pack()
+
+        def preview():
+            try:
+                vat_rate = rate_entry.get().strip()
+                rule = VatRule(float(vat_rate) if vat_rate else None, start_entry.get().strip(), end_entry.get().strip(),
+                               task_type=task_entry.get().strip(), status=None if status_var.get() == "All" else status_var.get())
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+
+            def on_applied(result):
+                messagebox.showinfo("Success", f"{result['changed']} payment(s) recomputed.\n"
+                                               f"Changes written to {result['report']}")
+                vat_window.destroy()
+
+            def on_previewed(result):
+                if not result["changed"]:
+                    messagebox.showinfo("Recompute VAT", f"{result['matched']} payment(s) matched; none would change.")
+                    return
+
+                if messagebox.askyesno("Confirm", f"{rule.describe()}\n\n"
+                                                  f"{result['matched']} payment(s) matched, {result['changed']} would change "
+                                                  f"({result['skipped']} skipped).\n"
+                                                  f"Net Fee change: {result['net_change']:+,.2f} TL\n"
+                                                  f"Preview: {result['report']}\n\nApply these changes?"):
+                    # All changes are written with a single save
+                    self.run_in_background(lambda job: recompute_payments(self.excel, rule), on_applied, "Recomputing VAT...")
+
+            self.run_in_background(lambda job: recompute_payments(self.excel, rule, dry_run=True), on_previewed,
+                                   "Previewing VAT changes...")
+
+        Button(vat_window, text="Preview", command=preview).pack(pady=10)
+
     def search_payment(self):
         """
         Opens a window to search for a payment by Invoice No.
@@ -148,8 +431,9 @@ class PaymentGUI:
                 messagebox.showerror("Error", "Please enter an Invoice No!")
                 return
 
-            payment_data = self.excel.search_payment(invoice_no)
+            self.run_in_background(lambda job: self.excel.search_payment(invoice_no), show_payment, "Searching...")
 
+        def show_payment(payment_data):
             if payment_data:
                 details = f"""
                 Invoice No: {payment_data[0]}
@@ -160,8 +444,8 @@ class PaymentGUI:
                 VAT Amount: {payment_data[5]:,.3f} TL
                 Net Fee: {payment_data[6]:,.3f} TL
                 Case Details: {payment_data[7]}
-                Submission Date: {payment_data[8]}
-                Invoice Date: {payment_data[9]}
+                Submission Date: {format_date(payment_data[8])}
+                Invoice Date: {format_date(payment_data[9])}
                 Payment Status: {payment_data[10]}
                 """
                 messagebox.showinfo("Payment Found", details)
@@ -172,9 +456,64 @@ class PaymentGUI:
 
         Button(search_window, text="Search", command=find_payment).pack(pady=10)
 
+    def find_cases(self):
+        """
+        Opens a search-as-you-type window over Task Type and Case Details.
+        Results are refreshed shortly after each keystroke; replies to older queries are dropped.
+        """
+        find_window = Toplevel(self.root)
+        find_window.title("Find Cases")
+        find_window.geometry("900x400")
+
+        Label(find_window, text="Search client, case or task type:").pack()
+        query_var = tk.StringVar()
+        query_entry = Entry(find_window, textvariable=query_var, width=50)
+        query_entry.pack()
+        query_entry.focus_set()
+        result_label = Label(find_window, text="")
+        result_label.pack()
+
+        columns = ("Invoice No", "Task Type", "Case Details", "Invoice Date", "Gross Fee", "Payment Status")
+        tree = ttk.Treeview(find_window, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=250 if col == "Case Details" else 110)
+        tree.pack(fill="both", expand=True)
+
+        state = {"pending": None, "sequence": 0}
+
+        def run_query():
+            state["pending"] = None
+            state["sequence"] += 1
+            sequence = state["sequence"]
+            query = query_var.get()
+            # Only the first search (which builds the index) may take long enough to show a progress window
+            self.run_in_background(lambda job: self.excel.search_payments(query, 50),
+                                   lambda rows: show_results(sequence, rows), "Building search index...")
+
+        def show_results(sequence, rows):
+            if not find_window.winfo_exists() or sequence != state["sequence"]:
+                return  # Window closed, or the user has typed more since this query
+
+            tree.delete(*tree.get_children())
+            for row in rows:
+                gross = f"{row[3]:,.3f}" if isinstance(row[3], (int, float)) else row[3]
+                tree.insert("", "end", values=(row[0], row[1], row[7], format_date(row[9]), gross, row[10]))
+            result_label.config(text=f"{len(rows)} match(es)" if query_var.get().strip() else "")
+
+        def on_key(*args):
+            # Debounce: wait for a short pause in typing before querying
+            if state["pending"] is not None:
+                find_window.after_cancel(state["pending"])
+            state["pending"] = find_window.after(150, run_query)
+
+        query_var.trace_add("write", on_key)
+
     def list_payments(self):
         """
         Opens a window to display all payments in a table format.
+        Only the visible page is fetched from storage; sorting (click a column heading)
+        and the status filter are applied by the storage layer.
         """
         list_window = Toplevel(self.root)
         list_window.title("All Payments")
@@ -183,6 +522,24 @@ class PaymentGUI:
         columns = ("Invoice No", "Task Type", "Tariff Fee", "Gross Fee", "VAT (%)",
                 "VAT Amount", "Net Fee", "Case Details", "Submission Date",
                 "Invoice Date", "Payment Status")
+        page_size = 100
+        view = {"page": 0, "sort_by": None, "descending": False, "total": 0}
+
+        controls = tk.Frame(list_window)
+        controls.pack(fill="x")
+
+        Label(controls, text="Status:").pack(side="left")
+        status_var = tk.StringVar(value="All")
+        status_filter = ttk.Combobox(controls, textvariable=status_var, values=("All", "Paid", "Pending"),
+                                     state="readonly", width=10)
+        status_filter.pack(side="left", padx=5)
+
+        next_button = Button(controls, text="Next ▶")
+        next_button.pack(side="right")
+        page_label = Label(controls, text="")
+        page_label.pack(side="right", padx=5)
+        prev_button = Button(controls, text="◀ Prev")
+        prev_button.pack(side="right")
 
         tree = ttk.Treeview(list_window, columns=columns, show="headings")
 
@@ -192,63 +549,324 @@ class PaymentGUI:
 
         tree.pack(fill="both", expand=True)
 
-        payments = self.excel.get_all_payments()
+        def load_page():
+            status = None if status_var.get() == "All" else status_var.get()
+            offset = view["page"] * page_size
+            self.run_in_background(
+                lambda job: self.excel.get_payments_page(offset, page_size, view["sort_by"], view["descending"], status),
+                show_page, "Loading payments..."
+            )
+
+        def show_page(page):
+            if not list_window.winfo_exists():
+                return  # Window was closed while loading
+
+            rows, view["total"] = page
+            tree.delete(*tree.get_children())
+            for payment in rows:
+                payment = list(payment)
+                payment[8], payment[9] = format_date(payment[8]), format_date(payment[9])
+                tree.insert("", "end", values=payment)
+
+            pages = max(1, -(-view["total"] // page_size))
+            page_label.config(text=f"Page {view['page'] + 1} of {pages} ({view['total']:,} payments)")
+            prev_button.config(state="normal" if view["page"] > 0 else "disabled")
+            next_button.config(state="normal" if view["page"] + 1 < pages else "disabled")
+
+        def change_page(step):
+            view["page"] += step
+            load_page()
+
+        def sort_by(col_idx):
+            if view["sort_by"] == col_idx:
+                view["descending"] = not view["descending"]
+            else:
+                view["sort_by"], view["descending"] = col_idx, False
+            for idx, col in enumerate(columns):
+                arrow = (" ▼" if view["descending"] else " ▲") if idx == col_idx else ""
+                tree.heading(col, text=col + arrow)
+            view["page"] = 0
+            load_page()
 
-        for payment in payments:
-            tree.insert("", "end", values=payment)
+        def change_filter(event):
+            view["page"] = 0
+            load_page()
+
+        for idx, col in enumerate(columns):
+            tree.heading(col, command=lambda idx=idx: sort_by(idx))
+        prev_button.config(command=lambda: change_page(-1))
+        next_button.config(command=lambda: change_page(1))
+        status_filter.bind("<<ComboboxSelected>>", change_filter)
+
+        load_page()
 
     def analyze_payments_gui(self):
         """
         Opens a window to display payment analysis statistics.
-        Shows total net and gross fee instead of average.
+        Shows total net and gross fee instead of average, for all time or a chosen period,
+        plus a monthly or quarterly breakdown of the same period.
         """
         analysis_window = Toplevel(self.root)
         analysis_window.title("Payment Analysis")
-        analysis_window.geometry("400x300")
+        analysis_window.geometry("600x500")
+
+        controls = tk.Frame(analysis_window)
+        controls.pack(fill="x", pady=5)
+
+        period_var = tk.StringVar(value="All time")
+        ttk.Combobox(controls, textvariable=period_var, state="readonly", width=12,
+                     values=("All time", "This month", "This quarter", "This year", "Custom")).pack(side="left", padx=5)
+        Label(controls, text="From:").pack(side="left")
+        start_entry = Entry(controls, width=11)
+        start_entry.pack(side="left")
+        Label(controls, text="To:").pack(side="left")
+        end_entry = Entry(controls, width=11)
+        end_entry.pack(side="left")
+        group_var = tk.StringVar(value="month")
+        ttk.Combobox(controls, textvariable=group_var, values=("month", "quarter"),
+                     state="readonly", width=8).pack(side="left", padx=5)
+        apply_button = Button(controls, text="Apply")
+        apply_button.pack(side="left")
+
+        totals_frame = tk.Frame(analysis_window)
+        totals_frame.pack(fill="x")
+
+        columns = ("Period", "Status", "Count", "Net Fee", "Gross Fee")
+        tree = ttk.Treeview(analysis_window, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=100)
+        tree.pack(fill="both", expand=True)
+
+        def period_range():
+            """
+            Returns (start, end) dates for the selected quick period, or the typed range for Custom.
+            """
+            today = date.today()
+            period = period_var.get()
+            if period == "This month":
+                return today.replace(day=1), today
+            if period == "This quarter":
+                return today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1), today
+            if period == "This year":
+                return today.replace(month=1, day=1), today
+            if period == "Custom":
+                bounds = []
+                for text in (start_entry.get(), end_entry.get()):
+                    value = parse_date(text)
+                    if value is None and text.strip():
+                        raise ValueError(text)
+                    bounds.append(value)
+                return bounds
+            return None, None
+
+        def apply():
+            try:
+                start, end = period_range()
+            except ValueError:
+                messagebox.showerror("Error", "Invalid date, use DD.MM.YYYY")
+                return
 
-        # Get analysis results from excel_manager.py
-        total_payments, total_paid, total_net_paid, total_gross_paid, total_pending, total_net_pending, total_gross_pending = self.excel.analyze_payments()
+            group = group_var.get()
+            self.run_in_background(
+                lambda job: (self.excel.analyze_payments(start, end), self.excel.rollup(group, start=start, end=end)),
+                lambda results: self.show_analysis(analysis_window, totals_frame, tree, *results),
+                "Analyzing payments..."
+            )
+
+        apply_button.config(command=apply)
+        apply()
+
+    def show_analysis(self, analysis_window, totals_frame, tree, results, rollup):
+        """
+        Fills the analysis window with the results of analyze_payments() and rollup().
+        """
+        if not analysis_window.winfo_exists():
+            return  # Window was closed while analyzing
+
+        total_payments, total_paid, total_net_paid, total_gross_paid, total_pending, total_net_pending, total_gross_pending = results
+
+        for widget in totals_frame.winfo_children():
+            widget.destroy()
 
         # Display results in the GUI
-        Label(analysis_window, text=f"Total Payments: {total_payments}").pack()
-        Label(analysis_window, text=f"Total Paid: {total_paid}").pack()
-        Label(analysis_window, text=f"Total Pending: {total_pending}").pack()
+        Label(totals_frame, text=f"Total Payments: {total_payments}").pack()
+        Label(totals_frame, text=f"Total Paid: {total_paid}").pack()
+        Label(totals_frame, text=f"Total Pending: {total_pending}").pack()
 
         # Show total net and gross fee amounts
-        Label(analysis_window, text=f"Total Net Paid: {total_net_paid:,.3f} TL").pack()
-        Label(analysis_window, text=f"Total Gross Paid: {total_gross_paid:,.3f} TL").pack()
-        Label(analysis_window, text=f"Total Net Pending: {total_net_pending:,.3f} TL").pack()
-        Label(analysis_window, text=f"Total Gross Pending: {total_gross_pending:,.3f} TL").pack()
+        Label(totals_frame, text=f"Total Net Paid: {total_net_paid:,.3f} TL").pack()
+        Label(totals_frame, text=f"Total Gross Paid: {total_gross_paid:,.3f} TL").pack()
+        Label(totals_frame, text=f"Total Net Pending: {total_net_pending:,.3f} TL").pack()
+        Label(totals_frame, text=f"Total Gross Pending: {total_gross_pending:,.3f} TL").pack()
+
+        tree.delete(*tree.get_children())
+        for bucket, status, count, net, gross in rollup:
+            tree.insert("", "end", values=(bucket, status, count, f"{net:,.3f}", f"{gross:,.3f}"))
 
     def generate_chart_gui(self):
         """
-        Opens a window to display a pie chart of Paid vs Pending payments.
+        Opens the chart window, or brings it to the front and refreshes it if it is already open.
+        The views (Paid vs Pending, monthly trend, by task type) are built from the summary and
+        grouped totals, so switching views does not rescan the payments.
         """
+        if self.chart is not None and self.chart["window"].winfo_exists():
+            self.chart["window"].lift()
+            self.refresh_chart()
+            return
+
         chart_window = Toplevel(self.root)
         chart_window.title("Payment Chart")
-        chart_window.geometry("500x400")
+        chart_window.geometry("650x500")
+
+        controls = tk.Frame(chart_window)
+        controls.pack(fill="x", pady=5)
+
+        views = {title: view for view, title in CHART_VIEWS.items()}
+        view_var = tk.StringVar(value=CHART_VIEWS["status"])
+        Label(controls, text="View:").pack(side="left", padx=5)
+        view_box = ttk.Combobox(controls, textvariable=view_var, values=list(views), state="readonly", width=25)
+        view_box.pack(side="left")
+        view_box.bind("<<ComboboxSelected>>", lambda event: self.refresh_chart())
+
+        self.chart = {"window": chart_window, "view": lambda: views[view_var.get()], "canvas": None}
+        self.refresh_chart()
+
+    def refresh_chart(self):
+        """
+        Fetches the data of the selected chart view on the worker thread and draws it.
+        """
+        view = self.chart["view"]()
+
+        def load_chart_data(job):
+            chart_modules()  # Load matplotlib on the worker thread too, so the window does not freeze
+            return chart_data(self.excel, view)
 
-        # Get payment data from Excel
-        total_paid, total_pending = self.excel.get_payment_counts()
+        self.run_in_background(load_chart_data, lambda data: self.show_chart(view, data), "Loading chart...")
 
-        if total_paid == 0 and total_pending == 0:
+    def show_chart(self, view, data):
+        """
+        Draws a chart view into the chart window. The same matplotlib figure is reused for the
+        whole session, and it is only redrawn when the view or its data changed.
+        """
+        chart = self.chart
+        if chart is None or not chart["window"].winfo_exists():
+            return  # Window was closed while loading
+
+        if not has_data(data):
             messagebox.showwarning("No Data", "No payments recorded to generate a chart.")
-            chart_window.destroy()
+            if chart["canvas"] is None:
+                chart["window"].destroy()
             return
 
-        labels = ["Paid", "Pending"]
-        sizes = [total_paid, total_pending]
-        colors = ["green", "red"]
+        Figure, FigureCanvasTkAgg = chart_modules()
+        if self.figure is None:
+            self.figure = Figure(figsize=(6.5, 4.5))
+
+        changed = self.figure_key != (view, data)
+        if changed:
+            draw_chart(self.figure, view, data)
+            self.figure_key = (view, data)
 
-        fig, ax = plt.subplots()
-        ax.pie(sizes, labels=labels, autopct="%1.1f%%", colors=colors, startangle=90)
-        ax.set_title("Paid vs Pending Payments")
+        if chart["canvas"] is None:
+            chart["canvas"] = FigureCanvasTkAgg(self.figure, master=chart["window"])
+            chart["canvas"].get_tk_widget().pack(fill="both", expand=True)
+            chart["canvas"].draw()
+        elif changed:
+            chart["canvas"].draw()
 
-        canvas = FigureCanvasTkAgg(fig, master=chart_window)
-        canvas.get_tk_widget().pack()
-        canvas.draw()
+    def import_payments(self):
+        """
+        Imports historic payments from a CSV or Excel file chosen by the user.
+        """
+        file_path = filedialog.askopenfilename(
+            title="Import Payments",
+            filetypes=[("CSV or Excel files", "*.csv *.xlsx"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+
+        def on_imported(result):
+            if result is None:
+                return  # Cancelled, nothing was imported
+
+            message = (f"Rows read: {result['read']:,}\n"
+                       f"Imported: {result['imported']:,}\n"
+                       f"Rejected: {result['rejected']:,} ({result['duplicates']:,} duplicate Invoice Nos)")
+            if result["report"]:
+                message += f"\n\nRejected rows were written to:\n{result['report']}"
+            messagebox.showinfo("Import Complete", message)
+
+        self.run_in_background(
+            lambda job: self.excel.import_payments(file_path, progress=job.report, cancel=job.cancel_event),
+            on_imported, "Importing payments...", cancellable=True
+        )
+
+    def export_to_excel(self):
+        """
+        Writes the database contents to payment_records.xlsx (SQLite backend only).
+        """
+        def on_exported(file_path):
+            if file_path:
+                messagebox.showinfo("Export Complete", f"Payments exported to:\n{file_path}")
+
+        self.run_in_background(lambda job: self.excel.export_to_excel(cancel=job.cancel_event),
+                               on_exported, "Exporting to Excel...", cancellable=True)
+
+    def show_diagnostics(self):
+        """
+        Opens a window with per-operation timings collected during this session.
+        """
+        diagnostics_window = Toplevel(self.root)
+        diagnostics_window.title("Diagnostics")
+        diagnostics_window.geometry("990x350")
+
+        columns = ("Operation", "Calls", "Avg ms", "Max ms", "Load ms", "Iterate ms", "Save ms", "Lock ms", "Rows", "Bytes Written")
+        tree = ttk.Treeview(diagnostics_window, columns=columns, show="headings")
+
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=90)
+
+        tree.pack(fill="both", expand=True)
+        cache_label = Label(diagnostics_window, text="")
+        cache_label.pack()
+
+        def refresh():
+            tree.delete(*tree.get_children())
+            for name, totals in sorted(metrics.summary().items(), key=lambda item: -item[1]["seconds"]):
+                phases = totals["phases"]
+                tree.insert("", "end", values=(
+                    name, totals["calls"], f"{totals['avg_seconds'] * 1000:.1f}", f"{totals['max_seconds'] * 1000:.1f}",
+                    f"{phases.get('load', 0) * 1000:.1f}", f"{phases.get('iterate', 0) * 1000:.1f}",
+                    f"{phases.get('save', 0) * 1000:.1f}", f"{phases.get('lock', 0) * 1000:.1f}", totals["rows"], totals["bytes_written"]
+                ))
+            if hasattr(self.excel, "cache_stats"):
+                cache_label.config(text="Workbook cache: {hits} hits, {misses} misses".format(**self.excel.cache_stats()))
+
+        def dump():
+            count = metrics.dump(config.METRICS_DUMP_FILE)
+            messagebox.showinfo("Diagnostics", f"{count} operation records written to:\n{config.METRICS_DUMP_FILE}")
+
+        Button(diagnostics_window, text="Refresh", command=refresh).pack(side="left", padx=10, pady=5)
+        Button(diagnostics_window, text="Save to File", command=dump).pack(side="left", pady=5)
+        refresh()
+
+def report_startup(app, shown):
+    """
+    Prints where the start-up time went (for --startup-timing) and closes the application.
+    """
+    ready = time.perf_counter()
+    print(f"⏱️ Startup: imports {(IMPORTED - STARTED) * 1000:.0f} ms, "
+          f"window {(shown - IMPORTED) * 1000:.0f} ms, "
+          f"ledger open {(ready - shown) * 1000:.0f} ms "
+          f"(window shown after {(shown - STARTED) * 1000:.0f} ms, ready after {(ready - STARTED) * 1000:.0f} ms)")
+    app.exit_app()
 
 if __name__ == "__main__":
+    timing = "--startup-timing" in sys.argv or config.STARTUP_TIMING
     root = tk.Tk()
-    app = PaymentGUI(root)
+    app = PaymentGUI(root, on_ready=lambda: report_startup(app, shown) if timing else None)
+    root.update_idletasks()  # Draw the main window; the ledger is opened once the loop is idle
+    shown = time.perf_counter()
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+
+from openpyxl import load_workbook
+
+import config
+from excel_manager import ExcelManager
+from locking import ledger_version
+from models import Payment
+
+def payment(i, status="Pending"):
+    return Payment(f"INV-{i}", "Rent", 100, 1200, 20, submission_date="05.01.2026", payment_status=status)
+
+def file_rows(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        return [row for row in wb.active.iter_rows(min_row=2, values_only=True) if row[0] is not None]
+    finally:
+        wb.close()
+
+def test_writes_go_to_the_journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "JOURNAL_COMPACT_THRESHOLD", 100)
+    path = str(tmp_path / "payment_records.xlsx")
+    excel = ExcelManager(path, journal=True)
+
+    excel.add_payment(payment(1))
+    excel.update_payment_status("INV-1", "Paid")
+
+    assert file_rows(path) == []
+    assert os.path.getsize(excel.journal_path) > 0
+    assert excel.search_payment("INV-1")[-1] == "Paid"
+
+def test_leftover_journal_is_replayed_on_open_not_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "JOURNAL_COMPACT_THRESHOLD", 100)
+    path = str(tmp_path / "payment_records.xlsx")
+    writer = ExcelManager(path, journal=True)
+    writer.add_payments([payment(1), payment(2)])
+    writer.update_payment_status("INV-2", "Paid")
+    journal_size = os.path.getsize(writer.journal_path)
+
+    reader = ExcelManager(path, journal=True)
+
+    assert os.path.getsize(reader.journal_path) == journal_size
+    assert file_rows(path) == []
+    assert [row[-1] for row in reader.get_all_payments().rows()] == ["Pending", "Paid"]
+    assert [row[-1] for row in reader.iter_payments()] == ["Pending", "Paid"]  # Streamed read merges it too
+
+def test_compact_folds_the_journal_into_the_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "JOURNAL_COMPACT_THRESHOLD", 100)
+    path = str(tmp_path / "payment_records.xlsx")
+    excel = ExcelManager(path, journal=True)
+    excel.add_payments([payment(1), payment(2)])
+    excel.update_payment_status("INV-1", "Paid")
+    version = ledger_version(path)
+
+    excel.compact()
+
+    assert os.path.getsize(excel.journal_path) == 0
+    assert [(row[0], row[-1]) for row in file_rows(path)] == [("INV-1", "Paid"), ("INV-2", "Pending")]
+    assert ledger_version(path) > version
+    assert ExcelManager(path, journal=True).search_payment("INV-1")[-1] == "Paid"
+
+def test_journal_is_compacted_at_the_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "JOURNAL_COMPACT_THRESHOLD", 3)
+    path = str(tmp_path / "payment_records.xlsx")
+    excel = ExcelManager(path, journal=True)
+
+    excel.add_payment(payment(1))
+    excel.add_payment(payment(2))
+    assert os.path.getsize(excel.journal_path) > 0
+
+    excel.add_payment(payment(3))
+    assert os.path.getsize(excel.journal_path) == 0
+    assert [row[0] for row in file_rows(path)] == ["INV-1", "INV-2", "INV-3"]
+
+def test_other_manager_sees_journal_appends(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "JOURNAL_COMPACT_THRESHOLD", 100)
+    path = str(tmp_path / "payment_records.xlsx")
+    first = ExcelManager(path, journal=True)
+    second = ExcelManager(path, journal=True)
+    first.add_payment(payment(1))
+    assert second.search_payment("INV-1") is not None  # Loads the file and replays the journal
+
+    first.add_payment(payment(2))
+    second.update_payment_status("INV-1", "Paid")  # Applies only the new journal tail before writing
+
+    assert [(row[0], row[-1]) for row in first.iter_payments()] == [("INV-1", "Paid"), ("INV-2", "Pending")]
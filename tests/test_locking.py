@@ -0,0 +1,41 @@
+import threading
+
+from locking import LedgerLock, ledger_version
+
+def test_bump_increases_version(tmp_path):
+    ledger = str(tmp_path / "payment_records.xlsx")
+    assert ledger_version(ledger) == 0
+
+    lock = LedgerLock(ledger)
+    assert lock.bump() == 1
+    assert lock.bump() == 2
+    assert ledger_version(ledger) == 2
+    assert LedgerLock(ledger).bump() == 3  # Another lock on the same ledger shares the counter
+
+def test_bump_inside_held_lock_is_reentrant(tmp_path):
+    lock = LedgerLock(str(tmp_path / "payment_records.xlsx"))
+    with lock:
+        assert lock.held
+        assert lock.bump() == 1
+        assert lock.held
+    assert not lock.held
+
+def test_bump_repairs_unreadable_counter(tmp_path):
+    ledger = str(tmp_path / "payment_records.xlsx")
+    (tmp_path / "payment_records.lock").write_bytes(b"garbage")
+    assert LedgerLock(ledger).bump() == 1
+
+def test_concurrent_bumps_are_not_lost(tmp_path):
+    ledger = str(tmp_path / "payment_records.xlsx")
+    locks = [LedgerLock(ledger) for _ in range(4)]  # Separate lock file handles, like separate processes
+
+    def bump(lock):
+        for _ in range(25):
+            lock.bump()
+
+    threads = [threading.Thread(target=bump, args=(lock,)) for lock in locks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert ledger_version(ledger) == 100
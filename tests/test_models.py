@@ -0,0 +1,22 @@
+from models import Payment, vat_split
+
+def test_vat_split_exact_kurus():
+    assert vat_split(2292, 20) == (458.40, 1833.60)
+
+def test_vat_split_rounds_half_up():
+    # 10.25 * 10% = 1.025; binary floats and banker's rounding would both give 1.02
+    assert vat_split(10.25, 10) == (1.03, 9.22)
+    assert vat_split(0.05, 10) == (0.01, 0.04)
+
+def test_vat_split_rounds_gross_to_kurus():
+    assert vat_split(100.005, 0) == (0.0, 100.01)
+
+def test_vat_split_parts_add_up():
+    for gross in (0.01, 99.99, 1234.56, 1e6 + 0.07):
+        for rate in (1, 8, 10, 18, 20):
+            vat_amount, net_fee = vat_split(gross, rate)
+            assert round(vat_amount + net_fee, 2) == round(gross, 2)
+
+def test_payment_computes_vat_with_vat_split():
+    payment = Payment("INV-1", "Rent", 100, 10.25, 10)
+    assert (payment.vat_amount, payment.net_fee) == (1.03, 9.22)
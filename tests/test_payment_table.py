@@ -0,0 +1,68 @@
+import random
+from collections import defaultdict
+from datetime import datetime
+
+import pytest
+
+from payment_table import PaymentTable
+
+def make_rows(count=500, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        gross = round(rng.uniform(10, 5000), 2)
+        vat_amount = round(gross * 0.2, 2)
+        invoice_date = datetime(2024 + rng.randrange(2), rng.randrange(1, 13), rng.randrange(1, 29))
+        rows.append((
+            f"INV-{i}", rng.choice(["Rent", "Danışmanlık", "Audit"]), round(rng.uniform(0, 100), 2), gross,
+            20, vat_amount, gross - vat_amount, "", invoice_date,
+            invoice_date if rng.random() > 0.1 else None,  # Some payments are not invoiced yet
+            rng.choice(["Paid", "Pending"]),
+        ))
+    return rows
+
+def plain_group_by(rows, key):
+    groups = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0.0])
+    for row in rows:
+        group = groups[key(row)]
+        group[0] += 1
+        for i, col_idx in enumerate((2, 3, 5, 6), start=1):
+            group[i] += row[col_idx]
+    return {label: tuple(sums) for label, sums in groups.items()}
+
+def test_group_by_status_matches_python_sums():
+    rows = make_rows()
+    expected = plain_group_by(rows, lambda row: row[10])
+    result = PaymentTable(rows).group_by("status")
+
+    assert [label for label, *_ in result] == sorted(expected)
+    for label, count, *sums in result:
+        assert count == expected[label][0]
+        assert sums == pytest.approx(expected[label][1:])
+
+def test_group_by_task_type_and_month_skips_undated():
+    rows = make_rows()
+    dated = [row for row in rows if row[9] is not None]
+    expected = plain_group_by(dated, lambda row: (row[1], row[9].strftime("%Y-%m")))
+    result = PaymentTable(rows).group_by(["task_type", "month"])
+
+    assert sorted((task_type, month) for task_type, month, *_ in result) == sorted(expected)
+    for task_type, month, count, *sums in result:
+        assert count == expected[task_type, month][0]
+        assert sums == pytest.approx(expected[task_type, month][1:])
+
+def test_group_by_sees_appended_rows_and_status_changes():
+    rows = make_rows(50)
+    table = PaymentTable(rows[:40])
+    for row in rows[40:]:
+        table.append(row)
+    table.set_status(0, "Paid" if rows[0][10] == "Pending" else "Pending")
+    rows[0] = rows[0][:10] + (table.categories["payment_status"][table.columns["payment_status"][0]],)
+
+    expected = plain_group_by(rows, lambda row: row[10])
+    assert {label: count for label, count, *_ in table.group_by("status")} == \
+        {label: sums[0] for label, sums in expected.items()}
+
+def test_group_by_rejects_unknown_key():
+    with pytest.raises(ValueError):
+        PaymentTable(make_rows(5)).group_by("client")
@@ -0,0 +1,24 @@
+from search_index import SearchIndex, fold, tokenize
+
+def test_fold_turkish_capitals():
+    assert fold("İSTANBUL") == "istanbul"
+    assert fold("IRMAK") == "irmak"
+    assert fold("ırmak") == "irmak"
+
+def test_fold_turkish_letters():
+    assert fold("Şahin Çağlar Öztürk Güneş") == "sahin caglar ozturk gunes"
+
+def test_fold_strips_other_accents():
+    assert fold("Café Müller") == "cafe muller"
+
+def test_tokenize_turkish_text():
+    assert tokenize("Kira – AĞUSTOS, İzmir/Karşıyaka") == ["kira", "agustos", "izmir", "karsiyaka"]
+    assert tokenize(2024) == ["2024"]
+    assert tokenize(None) == []
+
+def test_search_matches_plain_latin_query():
+    index = SearchIndex()
+    index.add(0, ("INV-1", "Danışmanlık", 0, 0, 0, 0, 0, "Şahin Ltd. İstanbul"))
+    index.add(1, ("INV-2", "Kira", 0, 0, 0, 0, 0, "Ankara ofis"))
+    assert index.search("sahin istanbul") == [0]
+    assert index.search("danis") == [0]